@@ -1,29 +1,165 @@
 #!/usr/bin/env python3
 """
 Audio management for Portal Runner
+
+All mixer work (importing pygame, opening the device, loading music,
+decoding sound effects, starting playback) happens on a dedicated audio
+thread. The game only puts requests on a queue, which never blocks, so no
+mixer call can stall a frame.
 """
 
 import os
-import pygame
+import queue
+import threading
+import time
+
+import numpy as np
+
+from constants import AUDIO_DRIVER, SFX_CHANNELS, SOUND_EFFECTS
+
+# Tones used when a sound effect file is missing: name -> (frequencies in Hz, seconds per note)
+SYNTH_EFFECTS = {
+    "coin": ((988, 1319), 0.06),
+    "portal": ((330, 440, 554, 659), 0.08),
+    "game_over": ((392, 330, 262), 0.15),
+}
 
 
 class AudioManager:
-    def __init__(self):
-        # Initialize pygame mixer
+    def __init__(self, driver=AUDIO_DRIVER, num_channels=SFX_CHANNELS):
+        # SDL reads the driver from the environment; "dummy" runs without a sound device
+        if driver:
+            os.environ["SDL_AUDIODRIVER"] = driver
+
+        # None until the audio thread has opened the mixer, then True or False
+        self.initialized = None
+        self.num_channels = num_channels
+        # Set once sound effects are preloaded, or right away if there is no audio
+        self.ready = threading.Event()
+
+        self.music_playing = False
+        self.sounds = {}
+        self.channels = []
+        self._next_channel = 0
+        self._started = []  # time.perf_counter() of the last sound started on each channel
+
+        # Requests from the game to the audio thread; put() never blocks
+        self._requests = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+        self._thread.start()
+
+    def _init_mixer(self):
+        """Import pygame and open the mixer; runs on the audio thread"""
         try:
+            import pygame
             pygame.mixer.init()
-            self.initialized = True
-        except:
+        except Exception:
             print("Warning: Could not initialize audio. Game will run without sound.")
-            self.initialized = False
+            return False
 
-        self.music_playing = False
+        # A fixed pool of channels reserved for sound effects
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), self.num_channels))
+        pygame.mixer.set_reserved(self.num_channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.num_channels)]
+        self._started = [0.0] * self.num_channels
+        return True
+
+    def _run(self):
+        """Audio thread: open the mixer, then execute requests in order until shutdown"""
+        self.initialized = self._init_mixer()
+        if not self.initialized:
+            self.ready.set()
+            return
+
+        handlers = {
+            'preload': self._preload_sound_effects,
+            'music': self._load_and_play_music,
+            'sfx': self._play_sound_effect,
+            'stop_music': self._stop_music,
+        }
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            kind, args = request
+            try:
+                handlers[kind](*args)
+            except Exception as e:
+                print(f"Audio error ({kind}): {e}")
+
+    def preload_sound_effects(self, sound_files=SOUND_EFFECTS):
+        """Decode sound effects into Sound buffers on the audio thread"""
+        if self.initialized is not False:
+            self._requests.put(('preload', (dict(sound_files),)))
+
+    def wait_until_ready(self, timeout=None):
+        """Block until preload_sound_effects has finished; returns False on timeout"""
+        return self.ready.wait(timeout)
+
+    def _preload_sound_effects(self, sound_files):
+        try:
+            self._load_sound_effects(sound_files)
+        finally:
+            self.ready.set()
+
+    def _load_sound_effects(self, sound_files):
+        import pygame
+        for name, filename in sound_files.items():
+            if os.path.exists(filename):
+                try:
+                    self.sounds[name] = pygame.mixer.Sound(filename)
+                    continue
+                except Exception as e:
+                    print(f"Error loading sound {filename}: {e}")
+            if name in SYNTH_EFFECTS:
+                sound = self._synthesize(*SYNTH_EFFECTS[name])
+                if sound is not None:
+                    self.sounds[name] = sound
+
+    def _synthesize(self, frequencies, note_length):
+        """Build a short square-ish tone sequence matching the mixer's sample format"""
+        import pygame
+        frequency, sample_format, channels = pygame.mixer.get_init()
+        if sample_format != -16:
+            return None
+
+        samples_per_note = int(frequency * note_length)
+        t = np.arange(samples_per_note) / frequency
+        envelope = np.linspace(1.0, 0.0, samples_per_note)
+        notes = [np.sign(np.sin(2 * np.pi * f * t)) * envelope for f in frequencies]
+        wave = (np.concatenate(notes) * 0.25 * 32767).astype(np.int16)
+
+        interleaved = np.repeat(wave[:, None], channels, axis=1)
+        return pygame.mixer.Sound(buffer=interleaved.tobytes())
+
+    def play_sound_effect(self, name):
+        """Queue a sound effect; returns immediately"""
+        if self.initialized is not False:
+            self._requests.put(('sfx', (name,)))
+
+    def _play_sound_effect(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            return
+
+        # Prefer an idle channel; when all are busy, cut off the oldest one
+        count = len(self.channels)
+        for _ in range(count):
+            index = self._next_channel
+            self._next_channel = (index + 1) % count
+            if not self.channels[index].get_busy():
+                break
+        else:
+            index = min(range(count), key=self._started.__getitem__)
+        self._started[index] = time.perf_counter()
+        self.channels[index].play(sound)
 
     def load_background_music(self, filename):
-        """Load background music"""
+        """Load background music (blocking; the game uses load_background_music_async)"""
         if not self.initialized:
             return False
 
+        import pygame
         if os.path.exists(filename):
             try:
                 pygame.mixer.music.load(filename)
@@ -34,11 +170,23 @@ class AudioManager:
             print(f"Music file not found: {filename}")
         return False
 
+    def load_background_music_async(self, filename, loop=True):
+        """Load and start background music on the audio thread"""
+        if self.initialized is not False:
+            self._requests.put(('music', (filename, loop)))
+
+    def _load_and_play_music(self, filename, loop):
+        if self.load_background_music(filename):
+            self.play_background_music(loop)
+        else:
+            print("No background music found. Create a 'music' folder and add 'background.mp3'")
+
     def play_background_music(self, loop=True):
         """Play background music"""
         if not self.initialized:
             return
 
+        import pygame
         if pygame.mixer.music.get_busy():
             return
 
@@ -50,8 +198,18 @@ class AudioManager:
 
     def stop_background_music(self):
         """Stop background music"""
-        if not self.initialized:
-            return
+        if self.initialized is not False:
+            self._requests.put(('stop_music', ()))
 
+    def _stop_music(self):
+        import pygame
         pygame.mixer.music.stop()
-        self.music_playing = False
\ No newline at end of file
+        self.music_playing = False
+
+    def shutdown(self):
+        """Stop the audio thread after the queued requests"""
+        if self._thread is not None:
+            if self.initialized is not False:
+                self._requests.put(None)
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for Portal Runner's simulation and rendering hot paths.
+
+Every benchmark seeds the random generator with the same value, so each run
+measures the same worlds. Each benchmark produces a list of samples (seconds
+per operation). Results are written as JSON along with a fingerprint of the
+machine. When a baseline file exists, every benchmark is compared against it
+with a two-sided Mann-Whitney U test. A difference is only reported as
+faster or slower when it is statistically significant.
+
+Renderer and texture upload benchmarks use a headless EGL context (see
+headless_gl.py) and are skipped when none can be created.
+
+Usage: python benchmarks.py [--quick] [--filter NAME] [--output FILE]
+                            [--baseline FILE] [--save-baseline] [--alpha 0.01]
+"""
+
+import headless_gl  # Must come before anything imports OpenGL
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from constants import (BENCHMARK_BASELINE_PATH, BENCHMARK_OUTPUT_PATH, CAMERA_DISTANCE, CHUNK_LENGTH,
+                       TEXTURE_FILES, WorldType)
+from player import Player
+from quality import LEVELS
+from simulation import RenderSnapshot
+from world import WorldManager
+
+SEED = 1234
+CHUNK_COUNTS = (8, 32, 128)
+WORLD_RUN_DISTANCE = 1_000_000
+WORLD_RUN_SEGMENT = 20_000  # Units of the world run timed as one sample
+
+BENCHMARKS = []  # (name, function(scale) -> (samples, unit))
+
+# Set by set_up_gl() when a headless context could be created
+GL_AVAILABLE = False
+RENDER_SETUP = {}
+
+
+def benchmark(name):
+    """Register a benchmark; the function returns (seconds per operation samples, unit)"""
+    def register(function):
+        BENCHMARKS.append((name, function))
+        return function
+    return register
+
+
+def time_samples(operation, ops_per_sample, sample_count, reset=None):
+    """Run operation(i) ops_per_sample times per sample; returns seconds per operation.
+
+    reset, if given, runs before each sample outside the timed region.
+    """
+    operation(0)  # Warm-up
+    samples = []
+    for _ in range(sample_count):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        for i in range(ops_per_sample):
+            operation(i)
+        samples.append((time.perf_counter() - start) / ops_per_sample)
+    return samples
+
+
+def seeded_world(chunk_count):
+    """A WorldManager holding chunk_count chunks, generated from SEED"""
+    random.seed(SEED)
+    world_manager = WorldManager()
+    world_manager.platform_chunks = [world_manager.generate_chunk(-i * CHUNK_LENGTH)
+                                     for i in range(chunk_count)]
+    return world_manager
+
+
+def player_positions(world_manager, count):
+    """Deterministic player positions spread along the world, in all three lanes"""
+    rng = random.Random(SEED)
+    length = len(world_manager.platform_chunks) * CHUNK_LENGTH
+    positions = []
+    for _ in range(count):
+        player = Player()
+        player.x = rng.choice((-2.5, 0.0, 2.5))
+        player.z = -rng.uniform(0, length)
+        player.jump_height = rng.choice((0.0, 0.0, 0.8))
+        positions.append(player)
+    return positions
+
+
+@benchmark("chunk_generation")
+def bench_chunk_generation(scale):
+    """Generating a chunk the way the game does: refilling the one that was just left behind"""
+    random.seed(SEED)
+    world_manager = WorldManager()
+
+    def generate(i):
+        world_manager.discard_chunk(world_manager.generate_chunk(-i * CHUNK_LENGTH))
+
+    return time_samples(generate, max(10, int(200 * scale)), 20), "chunk"
+
+
+def _query_benchmark(check, chunk_count, scale, resets_coins=False):
+    world_manager = seeded_world(chunk_count)
+    players = player_positions(world_manager, 500)
+    coins = [coin for chunk in world_manager.platform_chunks for coin in chunk.coins]
+
+    def reset():
+        for coin in coins:
+            coin['collected'] = False
+
+    return time_samples(lambda i: check(world_manager, players[i % len(players)]),
+                        max(50, int(1000 * scale)), 20, reset if resets_coins else None), "call"
+
+
+for _chunks in CHUNK_COUNTS:
+    benchmark(f"platform_collision[{_chunks}]")(
+        lambda scale, chunks=_chunks: _query_benchmark(WorldManager.check_platform_collision, chunks, scale))
+    benchmark(f"coin_collection[{_chunks}]")(
+        lambda scale, chunks=_chunks: _query_benchmark(WorldManager.check_coin_collection, chunks, scale,
+                                                       resets_coins=True))
+    benchmark(f"portal_interaction[{_chunks}]")(
+        lambda scale, chunks=_chunks: _query_benchmark(WorldManager.check_portal_interaction, chunks, scale))
+
+
+@benchmark("world_update_run")
+def bench_world_update_run(scale):
+    """WorldManager.update over a long run at the game's own speed curve, one sample per segment"""
+    random.seed(SEED)
+    world_manager = WorldManager()
+    world_manager.reset()
+    distance = max(WORLD_RUN_SEGMENT, int(WORLD_RUN_DISTANCE * scale))
+
+    samples = []
+    player_z = 0.0
+    while -player_z < distance:
+        segment_end = player_z - WORLD_RUN_SEGMENT
+        updates = 0
+        start = time.perf_counter()
+        while player_z > segment_end:
+            player_z -= world_manager.get_current_speed()
+            world_manager.update(player_z)
+            updates += 1
+        samples.append((time.perf_counter() - start) / updates)
+    return samples, "update"
+
+
+@benchmark("snapshot_capture")
+def bench_snapshot_capture(scale):
+    """Copying the chunks in view into a render snapshot, as every simulation tick does"""
+    world_manager = seeded_world(CHUNK_COUNTS[0])
+    snapshot = RenderSnapshot()
+    return time_samples(lambda i: snapshot.capture_world(world_manager, -CHUNK_LENGTH),
+                        max(50, int(1000 * scale)), 20), "tick"
+
+
+@benchmark("texture_decode")
+def bench_texture_decode(scale):
+    from textures import decode_texture
+
+    files = [path for path in TEXTURE_FILES.values() if os.path.exists(path)]
+    if not files:
+        return None, "texture"
+    return time_samples(lambda i: decode_texture(files[i % len(files)]), len(files), 10), "texture"
+
+
+@benchmark("procedural_textures")
+def bench_procedural_textures(scale):
+    from procedural_textures import PROCEDURAL_TEXTURES, THEME_COLORS, generate_texture
+
+    names = list(THEME_COLORS) + list(PROCEDURAL_TEXTURES)
+    return time_samples(lambda i: generate_texture(names[i % len(names)]), len(names), 10), "texture"
+
+
+@benchmark("texture_pack_read")
+def bench_texture_pack_read(scale):
+    """Open a pack and map every image in it, as startup does"""
+    from texture_pack import TexturePack
+    from textures import build_texture_pack
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pack_path = os.path.join(tmp, "bench.pack")
+        build_texture_pack(pack_path)
+
+        def read(i):
+            pack = TexturePack(pack_path)
+            for name in pack.names():
+                if pack.get_atlas(name) is None:  # Sprites are read as part of their atlas
+                    pack.get_image(name)
+            pack.close()
+
+        return time_samples(read, 20, 10), "pack"
+
+
+@benchmark("texture_upload")
+def bench_texture_upload(scale):
+    """Upload a 256x256 RGB texture with its mip chain, then delete it"""
+    if not GL_AVAILABLE:
+        return None, "texture"
+    from procedural_textures import color_pattern
+    from texture_pack import generate_mip_levels
+    from textures import TextureManager
+
+    texture_manager = TextureManager()
+    image = color_pattern((200, 100, 50))
+    image['mipmaps'] = generate_mip_levels(image)
+
+    def upload(i):
+        texture_manager.textures["bench"] = texture_manager.upload_texture(image, "bench")
+        texture_manager.unload_texture("bench")
+
+    return time_samples(upload, 20, 10), "texture"
+
+
+def _draw_benchmark(chunk_count, scale, level=0, lod=True, baked_lighting=True):
+    """CPU time to issue the GL commands of one world frame; the GPU finishes outside the timing"""
+    if not GL_AVAILABLE:
+        return None, "frame"
+    from OpenGL.GL import glFinish
+
+    renderer = RENDER_SETUP["renderer"]
+    world_manager = seeded_world(chunk_count)
+    player = Player()
+    player.z = -CHUNK_LENGTH  # Inside the drawn range of the first chunks
+    snapshot = RenderSnapshot()
+    snapshot.world = world_manager.current_world
+    snapshot.player_z = player.z
+    snapshot.capture_world(world_manager, player.z)
+    renderer.set_quality(LEVELS[level])
+    renderer.lod = lod
+    renderer.baked_lighting = baked_lighting
+    renderer.setup_3d_projection(800, 600)
+    camera_z = player.z + CAMERA_DISTANCE
+
+    samples = []
+    renderer.draw_world(snapshot, camera_z)  # Warm-up
+    for _ in range(max(3, int(10 * scale))):
+        glFinish()
+        start = time.perf_counter()
+        renderer.draw_world(snapshot, camera_z)
+        renderer.draw_player(*player.get_position())
+        samples.append(time.perf_counter() - start)
+    glFinish()
+    renderer.set_quality(LEVELS[0])
+    renderer.lod = True
+    renderer.baked_lighting = True
+    return samples, "frame"
+
+
+for _chunks in CHUNK_COUNTS[:2]:
+    benchmark(f"draw_world[{_chunks}]")(lambda scale, chunks=_chunks: _draw_benchmark(chunks, scale))
+
+# Every chunk in full detail, for comparison with draw_world[...]
+benchmark(f"draw_world_no_lod[{CHUNK_COUNTS[1]}]")(
+    lambda scale: _draw_benchmark(CHUNK_COUNTS[1], scale, lod=False))
+
+# GL lighting instead of baked shades
+benchmark(f"draw_world_lit[{CHUNK_COUNTS[1]}]")(
+    lambda scale: _draw_benchmark(CHUNK_COUNTS[1], scale, baked_lighting=False))
+
+# Each quality level on the larger world; draw_world[...] above is level 0
+for _level in range(1, len(LEVELS)):
+    benchmark(f"draw_world_level[{_level}]")(
+        lambda scale, level=_level: _draw_benchmark(CHUNK_COUNTS[1], scale, level))
+
+
+def _scene_benchmark(render_scale, scale):
+    """Wall time of a whole 3D pass at a render scale, GPU included, upscaled to the 800x600 surface"""
+    if not GL_AVAILABLE:
+        return None, "frame"
+    from OpenGL.GL import GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT, glClear, glFinish, glLoadIdentity
+    from OpenGL.GLU import gluLookAt
+
+    renderer = RENDER_SETUP["renderer"]
+    world_manager = seeded_world(CHUNK_COUNTS[1])
+    player = Player()
+    player.z = -CHUNK_LENGTH
+    snapshot = RenderSnapshot()
+    snapshot.world = world_manager.current_world
+    snapshot.player_z = player.z
+    snapshot.capture_world(world_manager, player.z)
+    renderer.resize(800, 600)
+    renderer.scene.resize(800, 600, render_scale)
+
+    def frame(_):
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        renderer.begin_scene()
+        renderer.setup_3d_projection(800, 600)
+        glLoadIdentity()
+        x, y, z = player.get_position()
+        gluLookAt(x, y + 2.5, z + CAMERA_DISTANCE, x, y, z - 10, 0, 1, 0)
+        renderer.draw_world(snapshot, z + CAMERA_DISTANCE)
+        renderer.draw_player(x, y, z)
+        renderer.end_scene()
+        glFinish()
+
+    samples = time_samples(frame, 1, max(3, int(10 * scale)))  # The warm-up allocates the framebuffer
+    renderer.resize(800, 600)
+    return samples, "frame"
+
+
+for _render_scale in (1.0, 0.5):
+    benchmark(f"scene_pass[{_render_scale}]")(
+        lambda scale, render_scale=_render_scale: _scene_benchmark(render_scale, scale))
+
+
+def set_up_gl():
+    """Create the headless context and the renderer; returns the GL renderer name or None"""
+    global GL_AVAILABLE
+    try:
+        headless_gl.create_context()
+    except RuntimeError as e:
+        print(f"Skipping GL benchmarks: {e}")
+        return None
+
+    from gl_state import GLStateCache
+    from renderer import Renderer
+    from textures import TextureManager
+
+    state = GLStateCache()
+    texture_manager = TextureManager(state)
+    renderer = Renderer(texture_manager, state)
+    renderer.init_gl()
+    texture_manager.init_all_textures(WorldType.DESERT)
+    RENDER_SETUP["renderer"] = renderer
+    GL_AVAILABLE = True
+    return headless_gl.renderer_name()
+
+
+def machine_fingerprint(gl_renderer):
+    """What results depend on, so runs from different machines are not compared blindly"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import OpenGL
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "numpy": np.__version__,
+        "pyopengl": OpenGL.__version__,
+        "gl_renderer": gl_renderer,
+        "commit": commit,
+    }
+
+
+def summarize(samples):
+    values = np.array(samples)
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    return {"median": median, "iqr": q3 - q1, "min": values.min(), "ops_per_second": 1.0 / median}
+
+
+def mann_whitney_u(a, b):
+    """Two-sided Mann-Whitney U test with tie correction (normal approximation); returns (U, p)"""
+    n1, n2 = len(a), len(b)
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    n = n1 + n2
+
+    # Average ranks over ties
+    ranks = [0.0] * n
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (abs(u - mean) - 0.5) / math.sqrt(variance)  # With continuity correction
+    return u, math.erfc(max(0.0, z) / math.sqrt(2))
+
+
+def compare(results, baseline, alpha):
+    """Print how each benchmark changed against the baseline; returns the names that got slower"""
+    if baseline["fingerprint"] != results["fingerprint"]:
+        changed = [key for key in results["fingerprint"]
+                   if key != "commit" and baseline["fingerprint"].get(key) != results["fingerprint"][key]]
+        if changed:
+            print(f"Warning: baseline was recorded with a different {', '.join(changed)}")
+
+    slower = []
+    print(f"\n{'benchmark':<28}{'baseline':>12}{'current':>12}{'change':>9}  {'p':>8}  verdict")
+    for name, result in results["benchmarks"].items():
+        old = baseline["benchmarks"].get(name)
+        if old is None or result.get("samples") is None or old.get("samples") is None:
+            continue
+        _, p = mann_whitney_u(old["samples"], result["samples"])
+        change = result["median"] / old["median"] - 1
+        if p >= alpha:
+            verdict = "no significant change"
+        elif change < 0:
+            verdict = "faster"
+        else:
+            verdict = "SLOWER"
+            slower.append(name)
+        print(f"{name:<28}{format_time(old['median']):>12}{format_time(result['median']):>12}"
+              f"{change * 100:+8.1f}%  {p:8.4f}  {verdict}")
+    return slower
+
+
+def format_time(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.2f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portal Runner benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads (1/10th)")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", default=BENCHMARK_OUTPUT_PATH)
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="also store this run as the baseline")
+    parser.add_argument("--alpha", type=float, default=0.01, help="significance level")
+    args = parser.parse_args()
+
+    scale = 0.1 if args.quick else 1.0
+    selected = [(name, function) for name, function in BENCHMARKS
+                if not args.filter or args.filter in name]
+    needs_gl = any(name.startswith(("draw_", "scene_", "texture_upload")) for name, _ in selected)
+    gl_renderer = set_up_gl() if needs_gl else None
+
+    results = {
+        "fingerprint": machine_fingerprint(gl_renderer),
+        "seed": SEED,
+        "scale": scale,
+        "timestamp": time.time(),
+        "benchmarks": {},
+    }
+    for name, function in selected:
+        gc.collect()
+        samples, unit = function(scale)
+        if samples is None:
+            print(f"{name:<28} skipped")
+            continue
+        summary = summarize(samples)
+        results["benchmarks"][name] = dict(summary, unit=unit, samples=samples)
+        print(f"{name:<28}{format_time(summary['median']):>12} per {unit:<8} "
+              f"(IQR {format_time(summary['iqr'])}, {len(samples)} samples)")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {args.output}")
+
+    slower = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != scale:
+            print(f"Warning: baseline was recorded with scale {baseline.get('scale')}, this run used {scale}")
+        slower = compare(results, baseline, args.alpha)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+
+    sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ class GameState(Enum):
     PLAYING = 1
     GAME_OVER = 2
     PORTAL_TRANSITION = 3
+    LOADING = 4
 
 class WorldType(Enum):
     DESERT = 0
@@ -30,6 +31,98 @@ WINDOW_HEIGHT = 600
 CHUNK_LENGTH = 50
 TRANSITION_DURATION = 2.0
 CAMERA_DISTANCE = 5
+SKY_COLOR = (0.5, 0.7, 1.0, 1.0)  # Background, and the fog that hides the far plane
+
+# Audio
+AUDIO_DRIVER = None  # SDL audio driver override, e.g. "dummy" for headless runs
+SFX_CHANNELS = 4  # Mixer channels reserved for sound effects
+SOUND_EFFECTS = {
+    "coin": "sounds/coin.wav",
+    "portal": "sounds/portal.wav",
+    "game_over": "sounds/game_over.wav",
+}
+
+# Debugging
+GL_STATE_DEBUG = False  # Report redundant GL calls dropped by the state cache
+INPUT_LATENCY_REPORT = False  # Print input callback-to-tick latency at every game over
+INPUT_LATENCY_WINDOW = 1000  # Recent input events kept for latency percentiles
+LATENCY_BUCKET_MS = 5  # Histogram bucket width of the input-to-photon report (see latency.py)
+LATENCY_MAX_MS = 200  # Slower presses are counted in the last bucket
+
+# Frame profiler (see profiler.py); F3 shows the overlay, F4 exports a Chrome trace
+PROFILER_FRAMES = 600  # Frames kept in the ring buffer
+PROFILER_TRACE_PATH = "frame_trace.json"
+PROFILER_LOG_HITCHES = False  # Print every hitch with its slowest phase
+HITCH_MS = 33.3  # Update plus render longer than this counts as a hitch
+
+# Benchmark suite (see benchmarks.py)
+BENCHMARK_OUTPUT_PATH = "benchmark_results.json"
+BENCHMARK_BASELINE_PATH = "benchmark_baseline.json"
+
+# Runtime metrics (see metrics.py)
+METRICS_PORT = 9464  # Prometheus endpoint on 127.0.0.1; None disables it
+METRICS_LOG = "metrics.jsonl"  # Periodic snapshots, one JSON object per line; None disables them
+METRICS_INTERVAL = 5.0  # Seconds between snapshots
+METRICS_WINDOW = 600  # Frames in the frame-time percentiles
+METRICS_LOG_MAX_BYTES = 16 * 1024 * 1024  # The log is rotated to METRICS_LOG + ".1" beyond this
+
+# Simulation thread (see simulation.py); False runs the simulation on the GLUT thread,
+# one tick per frame
+SIMULATION_THREAD = True
+SIM_TICK_RATE = 60  # Ticks per second; speeds and jump heights are per tick
+SIM_MAX_CATCH_UP = 5  # Late ticks run back to back up to this many; the rest are dropped
+SIM_SWITCH_INTERVAL = 0.001  # sys.setswitchinterval while both threads run, so a tick starts on time
+
+# Adaptive rendering quality (see quality.py)
+QUALITY_ADAPTIVE = True  # False keeps the best level
+QUALITY_TARGET_FPS = 60
+QUALITY_WINDOW = 30  # Frames averaged for each decision
+QUALITY_DOWN_MARGIN = 0.15  # Step down when frames take this much longer than the target
+QUALITY_UP_HEADROOM = 0.5  # Step up when drawing takes less than this fraction of a frame...
+QUALITY_UP_FRAMES = 180  # ...for this many frames in a row
+QUALITY_UP_FRAMES_MAX = 3600  # Upper bound of the wait after upgrades that did not hold
+FOG_START_FRACTION = 0.7  # Fog starts at this fraction of the draw distance and hides the far plane
+# Best first. view: draw distance ahead; sides: platform faces besides top and front (2 all,
+# 1 no back face, 0 none); beyond coin_distance only every coin_stride-th coin is drawn;
+# rings and segments: circles of the portal transition; scale: of the 3D pass's resolution
+QUALITY_LEVELS = (
+    {"view": 100, "sides": 2, "coin_distance": 100, "coin_stride": 1, "rings": 20, "segments": 32,
+     "scale": 1.0},
+    {"view": 100, "sides": 1, "coin_distance": 60, "coin_stride": 2, "rings": 16, "segments": 24,
+     "scale": 0.9},
+    {"view": 80, "sides": 0, "coin_distance": 40, "coin_stride": 2, "rings": 12, "segments": 20,
+     "scale": 0.8},
+    {"view": 65, "sides": 0, "coin_distance": 30, "coin_stride": 3, "rings": 8, "segments": 16,
+     "scale": 0.7},
+    {"view": 50, "sides": 0, "coin_distance": 20, "coin_stride": 4, "rings": 6, "segments": 12,
+     "scale": 0.6},
+)
+
+# Resolution of the 3D pass; the HUD is always drawn at window resolution (see framebuffer.py)
+RENDER_SCALE = 1.0  # Fraction of the window's width and height, per install
+RENDER_MAX_PIXELS = 1920 * 1080  # Larger windows render the scene at this many pixels; None for no cap
+RENDER_SCALE_MIN = 0.35
+
+# Level of detail per chunk, by the distance from the camera to the chunk's near end. Nearer than
+# LOD_MID_DISTANCE a chunk is drawn in full. Beyond it, its platforms are one batch of top and
+# front faces, with touching platforms merged; beyond LOD_FAR_DISTANCE only the top faces, and
+# coins are single points
+LOD_ENABLED = True
+LOD_MID_DISTANCE = 25
+LOD_FAR_DISTANCE = 60
+
+# One light follows the player at LIGHT_OFFSET. With BAKED_LIGHTING, the world is not lit by GL:
+# each face carries the shade the light would give it, from tables baked at startup (see renderer.py)
+LIGHT_OFFSET = (5.0, 10.0, 5.0)
+LIGHT_AMBIENT = 0.4
+LIGHT_DIFFUSE = 0.8
+LIGHT_MODEL_AMBIENT = 0.3
+BAKED_LIGHTING = True
+
+# Garbage collection: what is loaded at startup is frozen out of collections, and during a
+# run the collector only runs at safe points (starting a run, portal transitions, game over)
+GC_SAFE_POINTS = True
+GC_FORCE_THRESHOLD = 50_000  # Net new container objects that force a young collection mid-run
 
 # Player Settings
 PLAYER_SPEED = 0.15  # Not used for lane movement anymore
@@ -62,6 +155,27 @@ WORLD_TEXTURES = {
     WorldType.FOREST: "forest_platform"
 }
 
+# Texture sources and the pre-baked pack built from them (see texture_pack.py)
+TEXTURE_FILES = {
+    "desert_platform": "textures/desert_sand.jpg",
+    "ice_platform": "textures/ice_surface.jpg",
+    "forest_platform": "textures/forest_grass.jpg",
+    "coin": "textures/coin.png",
+    "portal": "textures/portal.png",
+    "player": "textures/player.png",
+}
+TEXTURE_PACK_PATH = "textures/textures.pack"
+TEXTURE_MEMORY_BUDGET = 48 * 1024 * 1024  # Bytes of texture memory, mip levels included
+MIN_TEXTURE_SIZE = 64  # Textures are never downscaled below this to fit the budget
+TEXTURE_MEMORY_REPORT = False  # Print resident textures at startup and on world changes
+
+# Small sprites share one atlas texture so drawing them needs a single bind
+SPRITE_ATLAS = "sprites"
+ATLAS_SPRITES = ("coin", "portal", "player")
+
+# Portals closer than this start loading the next world's textures
+PORTAL_PREFETCH_DISTANCE = 60.0
+
 # Generation Parameters
 PORTAL_CHANCE = 0.3  # 30% chance per chunk
 COIN_CHANCE = 0.7    # 70% chance per platform
@@ -76,6 +190,26 @@ MAX_PLATFORM_LENGTH = 15.0
 COIN_SCORE = 10
 PORTAL_SCORE = 50
 
+# High scores: a snapshot plus an append-only log of newer entries (see scores.py)
+HIGH_SCORE_FILE = "high_scores.json"
+HIGH_SCORE_LOG = "high_scores.log"
+HIGH_SCORE_COUNT = 5  # Entries kept and shown
+SCORE_FSYNC_INTERVAL = 0.5  # Seconds the writer waits to batch entries into one fsync
+SCORE_COMPACT_EVERY = 64  # Log entries before the log is folded into the snapshot
+
+# Every run is also recorded in an SQLite leaderboard (see leaderboard.py)
+LEADERBOARD_DB = "leaderboard.db"
+LEADERBOARD_REFRESH_INTERVAL = 1.0  # Seconds between checks for new scores while a board is shown
+
+# Remote leaderboard service (see leaderboard_client.py); None keeps scores local
+LEADERBOARD_ADDRESS = None  # e.g. ("scores.example.com", LEADERBOARD_PORT)
+LEADERBOARD_PORT = 7878
+LEADERBOARD_SPOOL = "leaderboard_spool.log"  # Scores not yet acknowledged by the service
+LEADERBOARD_BATCH_SIZE = 50  # Scores per submission
+LEADERBOARD_BATCH_INTERVAL = 2.0  # Seconds a partial batch waits for more scores
+LEADERBOARD_RETRY_MAX = 60.0  # Longest backoff between attempts while the service is down
+
 # Physics
 GROUND_LEVEL = 0
-COLLISION_TOLERANCE = 0.6
\ No newline at end of file
+COLLISION_TOLERANCE = 0.6
+PLAYER_HALF_SIZE = 0.4  # Half the width and depth of the player's bounding box
\ No newline at end of file
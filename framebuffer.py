@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Offscreen framebuffer for the 3D pass of Portal Runner.
+
+On large displays, filling every pixel of the window costs more than
+anything else in a frame. The 3D scene is drawn into a framebuffer object
+with a fraction of the window's pixels and then stretched over the window
+with a linear-filtered blit. The HUD is drawn afterwards, straight into
+the window, so text stays sharp at any scale.
+
+The scale comes from three places, multiplied together:
+
+- RENDER_SCALE, set per install
+- RENDER_MAX_PIXELS, a cap on the pixels of the 3D pass, so a 4K window
+  renders about as many as a 1080p one
+- the scale of the current quality level (see quality.py), so the quality
+  governor can trade resolution for frame rate
+
+At a scale of 1, or where framebuffer objects are unavailable, the scene
+is drawn straight into the window and nothing changes.
+"""
+
+import math
+
+from OpenGL.GL import *
+
+from constants import RENDER_MAX_PIXELS, RENDER_SCALE, RENDER_SCALE_MIN
+
+
+def render_scale(width, height, level_scale=1.0):
+    """Fraction of the window's width and height the 3D pass is drawn at"""
+    scale = RENDER_SCALE
+    if RENDER_MAX_PIXELS is not None and width * height * scale * scale > RENDER_MAX_PIXELS:
+        scale = math.sqrt(RENDER_MAX_PIXELS / (width * height))
+    return min(1.0, max(RENDER_SCALE_MIN, scale * level_scale))
+
+
+class SceneFramebuffer:
+    """Color and depth renderbuffers for the scaled 3D pass"""
+
+    def __init__(self):
+        self.supported = None  # Known once a context is current
+        self.framebuffer = None
+        self.color = None
+        self.depth = None
+        self.window_width = self.window_height = 0
+        self.width = self.height = 0  # Of the renderbuffers
+        self.scale = 1.0  # Of the 3D pass in use; 1 when drawing straight into the window
+        self.active = False  # The 3D pass goes through the framebuffer
+
+    def resize(self, window_width, window_height, scale):
+        """Match the window size and render scale; reallocates only what changed. GL thread only"""
+        if self.supported is None:
+            self.supported = bool(glGenFramebuffers) and bool(glBlitFramebuffer)
+        self.window_width, self.window_height = window_width, window_height
+        width = max(1, round(window_width * scale))
+        height = max(1, round(window_height * scale))
+        self.active = self.supported and (width, height) != (window_width, window_height)
+        self.scale = scale if self.active else 1.0
+        if not self.active or (width, height) == (self.width, self.height):
+            return
+
+        if self.framebuffer is None:
+            self.framebuffer = glGenFramebuffers(1)
+            self.color, self.depth = glGenRenderbuffers(2)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            print(f"Scene framebuffer incomplete (status {status:#x}); rendering at window resolution")
+            self.supported = self.active = False
+            self.scale = 1.0
+            return
+        self.width, self.height = width, height
+
+    def begin(self):
+        """Direct drawing into the framebuffer and clear it"""
+        if not self.active:
+            return
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glViewport(0, 0, self.width, self.height)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    def present(self):
+        """Stretch the scene over the window and draw into the window again"""
+        if not self.active:
+            return
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.framebuffer)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        glBlitFramebuffer(0, 0, self.width, self.height, 0, 0, self.window_width, self.window_height,
+                          GL_COLOR_BUFFER_BIT, GL_LINEAR)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(0, 0, self.window_width, self.window_height)
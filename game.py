@@ -2,8 +2,11 @@
 """
 Main Game class for Portal Runner
 """
+import atexit
+import gc
 import os
 import random
+import sys
 import time
 from OpenGL.GL import *
 from OpenGL.GLU import *
@@ -12,45 +15,22 @@ from audio import AudioManager
 from constants import *
 from player import Player
 from world import WorldManager
-from textures import TextureManager
+from textures import TextureManager, shared_texture_files
 from renderer import Renderer
+from gl_state import GLStateCache
+from loader import StagedLoader
+from scores import ScoreStore
+from leaderboard import Leaderboard
+from leaderboard_client import LeaderboardClient
+from input_queue import InputQueue, KEY, MOUSE, SPECIAL
+from latency import MARKER_SIZE
+from metrics import GameMetrics
+from quality import QualityGovernor
+from profiler import (COINS, COLLISION, DRAW_PLAYER, DRAW_WORLD, PLAYER, PORTALS, RENDER_PHASES,
+                      SIMULATION_PHASES, SNAPSHOT, UI, WORLD, FrameProfiler, export_chrome_trace)
+from simulation import SimulationThread, SnapshotBuffer
 
-import json
 
-
-# Add these methods to the PortalRunner class
-def load_high_scores(self):
-    """Load high scores from JSON file"""
-    self.high_scores = []
-    try:
-        with open("high_scores.json", "r") as f:
-            self.high_scores = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Create a new high scores file if it doesn't exist
-        self.high_scores = []
-        self.save_high_scores()
-
-
-def save_high_scores(self):
-    """Save high scores to JSON file"""
-    with open("high_scores.json", "w") as f:
-        json.dump(self.high_scores, f)
-
-
-def add_high_score(self, name, score):
-    """Add a new high score"""
-    # Add the new score
-    new_entry = {"name": name, "score": score}
-    self.high_scores.append(new_entry)
-
-    # Sort high scores (highest first)
-    self.high_scores.sort(key=lambda x: x["score"], reverse=True)
-
-    # Keep only top 5 scores
-    self.high_scores = self.high_scores[:5]
-
-    # Save to file
-    self.save_high_scores()
 class PortalRunner:
     def __init__(self, width=WINDOW_WIDTH, height=WINDOW_HEIGHT):
         self.coyote_time = 0.08
@@ -64,115 +44,267 @@ class PortalRunner:
         self.player_name = ""
         self.input_active = False
 
+        # Input from the GLUT callbacks, applied at the start of each update
+        self.input_queue = InputQueue()
+        self.tick = 0
+        self.latency_tracker = None  # LatencyTracker while measuring input-to-photon latency
+        self.profiler = FrameProfiler("frame", RENDER_PHASES, tid=1)
+        self.tick_profiler = FrameProfiler("tick", SIMULATION_PHASES, tid=2)
+        self.trace_requested = False  # F4; the render thread writes the trace, not a tick
+        self.metrics = GameMetrics(self.metric_gauges)
+
+        # After loading, update() runs on the simulation thread and render() only draws
+        # the snapshots it publishes (see simulation.py)
+        self.snapshots = SnapshotBuffer()
+        self.simulation = None  # SimulationThread once started; None while loading or single-threaded
+        self.drawn = None  # Snapshot of the last frame drawn
+        self.snapshot_age = 0.0  # Seconds between publishing that snapshot and drawing it
+        self.rendered_world = None  # World whose textures the render thread made resident
+        self.prefetch_world = None  # World the simulation expects next; its textures load ahead
+        self.quality = QualityGovernor()  # Trades detail for frame rate; see quality.py
+
+        # Seconds for coyote time and portal transitions; soak.py substitutes a simulated clock
+        self.clock = time.time
+        self.invulnerable = False  # Never game over (soak runs)
+        self.show_hud = True  # HUD and on-screen text; GLUT fonts are unavailable headless
+
         # Game objects
         self.player = Player()
         self.world_manager = WorldManager()
-        self.texture_manager = TextureManager()
-        self.renderer = Renderer(self.texture_manager)
+        self.gl_state = GLStateCache(debug=GL_STATE_DEBUG)
+        self.texture_manager = TextureManager(self.gl_state)
+        self.renderer = Renderer(self.texture_manager, self.gl_state)
 
         # Audio
         self.audio_manager = AudioManager()
 
+        # Staged loader, set up by init()
+        self.loader = None
+
         # Portal transition variables
         self.transition_start_time = 0
+        self.transition_progress = 0.0
         self.next_world = None
 
-        # Load high scores
-        self.load_high_scores()
-
-    def load_high_scores(self):
-        """Load high scores from JSON file"""
-        self.high_scores = []
-        try:
-            with open("high_scores.json", "r") as f:
-                self.high_scores = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            # Create a new high scores file if it doesn't exist
-            self.high_scores = []
-            self.save_high_scores()
-
-    def save_high_scores(self):
-        """Save high scores to JSON file"""
-        with open("high_scores.json", "w") as f:
-            json.dump(self.high_scores, f)
-
-    def add_high_score(self, name, score):
-        """Add a new high score"""
-        # Add the new score
-        new_entry = {"name": name, "score": score}
-        self.high_scores.append(new_entry)
-
-        # Sort high scores (highest first)
-        self.high_scores.sort(key=lambda x: x["score"], reverse=True)
-
-        # Keep only top 5 scores
-        self.high_scores = self.high_scores[:5]
-
-        # Save to file
-        self.save_high_scores()
+        # Finished runs are persisted by the store's writer thread, which also
+        # records them in the leaderboard
+        self.leaderboard = Leaderboard()
+        self.leaderboard_client = None
+        if LEADERBOARD_ADDRESS is not None:
+            # Also submitted to the shared service, from its own thread
+            self.leaderboard_client = LeaderboardClient(LEADERBOARD_ADDRESS)
+            atexit.register(self.leaderboard_client.close)
+        self.score_store = ScoreStore(sink=self.record_scores)
+        atexit.register(self.score_store.close)
+        if self.leaderboard.count() == 0:
+            # First run with the leaderboard: carry over the existing high scores
+            self.leaderboard.add_scores(self.score_store.top())
+        self.ranked_entry = None  # Score store id of the last finished run
+        self.recorded_rank = None  # (id, (rank, runs)) of the newest run recorded; score writer thread
+        self.last_gc_pause = 0.0  # Seconds taken by the last safe-point collection
 
     def init(self):
-        """Initialize the game"""
+        """Initialize GL and start loading; the game shows a loading screen until update() finishes it"""
         self.renderer.init_gl()
-        self.texture_manager.init_all_textures()
-        self.world_manager.reset()
+        self.renderer.resize(self.width, self.height)
 
-        # Initialize audio
+        # Audio requests are queued first so the audio thread starts on them right away
         os.makedirs("music", exist_ok=True)
-        if self.audio_manager.load_background_music("music/background.mp3"):
-            self.audio_manager.play_background_music(loop=True)
-        else:
-            print("No background music found. Create a 'music' folder and add 'background.mp3'")
+        self.audio_manager.preload_sound_effects()
+        self.audio_manager.load_background_music_async("music/background.mp3", loop=True)
+
+        # Decoding, world generation and sound loading run concurrently; only the
+        # texture uploads come back to this thread, a few per frame
+        self.game_state = GameState.LOADING
+        self.loader = StagedLoader()
+        self.loader.add_stage("Textures", self.load_textures, self.texture_upload_steps)
+        self.loader.add_stage("World", self.world_manager.reset)
+        self.loader.add_stage("Audio", self.audio_manager.wait_until_ready, required=False)
+
+    def load_textures(self):
+        """Loader thread: pixel data of the shared textures and the first world's platform"""
+        texture_manager = self.texture_manager
+        jobs = texture_manager.prepare_shared_textures(shared_texture_files())
+        try:
+            world_image = texture_manager.load_world_image(WORLD_TEXTURES[self.world_manager.current_world])
+        except Exception as e:
+            print(f"Error loading world texture: {e}")
+            world_image = None
+        return jobs, world_image
+
+    def texture_upload_steps(self, result):
+        """GL thread: one upload per step so the loading screen keeps updating"""
+        jobs, world_image = result
+        steps = [lambda job=job: self.texture_manager.install_texture(job) for job in jobs]
+        steps.append(lambda: self.texture_manager.install_world_texture(
+            self.world_manager.current_world, world_image))
+        return steps
+
+    def update_loading(self):
+        """Advance loading; switch to the menu once everything is in place"""
+        if not self.loader.step():
+            return
+        print(f"Loaded in {self.loader.total_time() * 1000:.0f} ms")
+        # Everything loaded so far lives for the whole session; later collections skip it
+        gc.collect()
+        gc.freeze()
+        if TEXTURE_MEMORY_REPORT:
+            self.texture_manager.print_memory_report()
+        self.game_state = GameState.MENU
 
-    def init_audio(self):
-        """Initialize audio"""
-        # Check if music file exists, if not, we'll just proceed without music
-        if self.audio_manager.load_background_music("music/background.mp3"):
-            self.audio_manager.play_background_music(loop=True)
-        else:
-            print("Background music not found, continuing without music")
-            # Try to create music directory for future use
-            os.makedirs("music", exist_ok=True)
+    def start_simulation(self):
+        """Move the simulation to its own thread; call from the GL thread once loading is done"""
+        # A sleeping tick waits for the GIL at most this long while the render thread is busy
+        sys.setswitchinterval(SIM_SWITCH_INTERVAL)
+        self.simulation = SimulationThread(self.update, SIM_TICK_RATE, SIM_MAX_CATCH_UP)
+        self.simulation.start()
+        # Runs before the score store and leaderboard client are closed
+        atexit.register(self.simulation.stop)
+
+    def start_metrics_export(self):
+        """Publish metrics on localhost and to the metrics log"""
+        self.metrics.start(METRICS_PORT, METRICS_LOG)
+        atexit.register(self.metrics.close)
+
+    def metric_gauges(self):
+        """Game state for each metrics snapshot; called on the render thread"""
+        gauges = {
+            "texture_bytes": self.texture_manager.texture_memory(),
+            "gl_calls_per_frame": self.gl_state.last_frame_issued,
+            "gl_calls_elided_per_frame": self.gl_state.last_frame_elided,
+            "gc_collections": sum(stats['collections'] for stats in gc.get_stats()),
+            "gc_last_pause_seconds": self.last_gc_pause,
+            "gc_frozen_objects": gc.get_freeze_count(),
+            "quality_level": self.quality.index,
+            "render_scale": self.renderer.scene.scale,
+        }
+        # The world as of the last frame drawn; the live world belongs to the simulation thread
+        snapshot = self.drawn
+        if snapshot is not None:
+            gauges["chunks"] = snapshot.chunk_count
+            gauges["coins"] = snapshot.coin_count
+            gauges["portals"] = snapshot.portal_count
+            gauges["speed_multiplier"] = snapshot.speed_multiplier
+            gauges["snapshot_age_seconds"] = self.snapshot_age
+        if self.simulation is not None:
+            gauges["simulation_ticks_dropped"] = self.simulation.dropped
+        return gauges
+
+    def record_scores(self, entries):
+        """Score writer thread: record newly saved runs locally and on the leaderboard service"""
+        self.leaderboard.add_scores(entries)
+        # Only the newest run can be the one on the game over screen. Among all runs so
+        # far, this one included; ties share the better rank
+        entry = entries[-1]
+        self.recorded_rank = (entry["id"], (self.leaderboard.rank(entry["score"]), self.leaderboard.count()))
+        if self.leaderboard_client is not None:
+            self.leaderboard_client.submit(entries)
+
+    def add_high_score(self, name, score):
+        """Record a finished run; saving happens in the background"""
+        world = self.world_manager.current_world
+        # The score writer thread ranks the run once it is recorded (see final_rank)
+        self.ranked_entry = self.score_store.add(name, score, world)
+
+    def final_rank(self):
+        """(rank, runs) of the last finished run, or None until the score writer has recorded it"""
+        recorded = self.recorded_rank  # Replaced whole by the writer thread, so read once
+        if recorded is None or recorded[0] != self.ranked_entry:
+            return None
+        return recorded[1]
 
     def reset_game(self):
         """Reset the game for a new run"""
-        # Check if previous score is a high score
-        if self.game_state == GameState.GAME_OVER and self.score > 0:
-            # If no high scores yet or score is better than lowest high score
-            if not self.high_scores or len(self.high_scores) < 5 or self.score > min(
-                    entry["score"] for entry in self.high_scores):
-                # Make sure we have a player name
-                if not self.player_name:
-                    self.player_name = "Player"
-                self.add_high_score(self.player_name, self.score)
-
         # Reset game state
         self.player.reset()
         self.world_manager.reset()
         self.score = 0
         self.game_state = GameState.PLAYING
+
+        # The run starts clean; until it ends, garbage is collected at safe points only
+        self.collect_garbage(2)
+        if GC_SAFE_POINTS:
+            gc.disable()
+
+    def collect_garbage(self, generation):
+        """Collect at a safe point, where the pause cannot be felt"""
+        start = time.perf_counter()
+        gc.collect(generation)
+        self.last_gc_pause = time.perf_counter() - start
+
     def update(self):
         """Update game state"""
+        self.tick += 1
+        self.metrics.tick()
+        profiler = self.tick_profiler
+        profiler.begin_frame()
+        self.process_input()
+
+        # Collection is paused during a run; a young collection only if garbage piles up anyway
+        if not gc.isenabled() and gc.get_count()[0] > GC_FORCE_THRESHOLD:
+            self.collect_garbage(0)
+
         if self.game_state == GameState.PLAYING:
             self.update_playing()
         elif self.game_state == GameState.PORTAL_TRANSITION:
             self.update_portal_transition()
+        elif self.game_state == GameState.LOADING:
+            self.update_loading()
+
+        if self.game_state != GameState.LOADING:
+            profiler.begin(SNAPSHOT)
+            self.publish_snapshot()
+            profiler.end(SNAPSHOT)
+        profiler.end_frame()
+
+    def publish_snapshot(self):
+        """Copy what the renderer needs from this tick into a snapshot and hand it over"""
+        snapshot = self.snapshots.back()
+        player = self.player
+        world_manager = self.world_manager
+        snapshot.state = self.game_state
+        snapshot.tick = self.tick
+        snapshot.time = self.clock()
+        snapshot.world = world_manager.current_world
+        snapshot.next_world = self.next_world
+        snapshot.prefetch_world = self.prefetch_world
+        snapshot.transition_progress = self.transition_progress
+        snapshot.score = self.score
+        snapshot.distance = int(-player.z)
+        snapshot.speed_multiplier = world_manager.get_speed_multiplier()
+        snapshot.player_x = player.x
+        snapshot.player_y = player.y + player.jump_height
+        snapshot.player_z = player.z
+        snapshot.player_name = self.player_name
+        snapshot.input_active = self.input_active
+        snapshot.final_rank = self.final_rank()
+        snapshot.capture_world(world_manager, player.z)
+        self.snapshots.publish()
 
     def update_playing(self):
         """Update game when playing"""
-        current_time = time.time()
+        current_time = self.clock()
 
         # Get current speeds from world manager
         platform_speed = self.world_manager.get_current_speed()
         lane_switch_speed = self.world_manager.get_lane_switch_speed()
 
+        profiler = self.tick_profiler
+
         # Update player with dynamic speeds
+        profiler.begin(PLAYER)
         self.player.update(platform_speed, lane_switch_speed)
+        if self.latency_tracker is not None:
+            self.latency_tracker.player_updated(self.tick)
+        profiler.end(PLAYER)
 
         # Update world
+        profiler.begin(WORLD)
         self.world_manager.update(self.player.z)
+        profiler.end(WORLD)
 
         # Check platform collision - be more lenient with jumping players
+        profiler.begin(COLLISION)
         on_platform = self.world_manager.check_platform_collision(self.player)
 
         # Update last_on_platform time if currently on platform
@@ -185,47 +317,77 @@ class PortalRunner:
             in_coyote_time = (current_time - self.last_on_platform) < self.coyote_time
 
             # If player is jumping, recently jumped, or in coyote time, don't end game
-            if self.player.is_jumping or self.player.jump_height > 0.1 or in_coyote_time:
+            if self.player.is_jumping or self.player.jump_height > 0.1 or in_coyote_time or \
+                    self.invulnerable:
                 # Player is either jumping or recently left platform, don't end game
                 pass
             else:
                 # Player is on the ground, not on a platform, and coyote time expired
                 self.game_state = GameState.GAME_OVER
+                gc.enable()
+                self.audio_manager.play_sound_effect("game_over")
+                if self.score > 0:
+                    self.add_high_score(self.player_name or "Player", self.score)
+                if INPUT_LATENCY_REPORT:
+                    print(self.input_queue.report())
+                if self.latency_tracker is not None:
+                    self.latency_tracker.print_report()
                 if self.score > self.high_score:
                     self.high_score = self.score
+        profiler.end(COLLISION)
 
         # Check coin collection
+        profiler.begin(COINS)
         collected_coins = self.world_manager.check_coin_collection(self.player)
-        for coin in collected_coins:
-            self.score += COIN_SCORE
+        self.score += collected_coins * COIN_SCORE
+        if collected_coins:
+            self.audio_manager.play_sound_effect("coin")
+        profiler.end(COINS)
+
+        # Decide where an approaching portal leads; the render thread starts loading its textures
+        profiler.begin(PORTALS)
+        upcoming = self.world_manager.find_portal_ahead(self.player.z, PORTAL_PREFETCH_DISTANCE)
+        if upcoming and upcoming['target_world'] is None:
+            upcoming['target_world'] = self.choose_next_world()
+            self.prefetch_world = upcoming['target_world']
 
         # Check portal interaction
         portal = self.world_manager.check_portal_interaction(self.player)
         if portal:
-            self.start_portal_transition()
+            self.start_portal_transition(portal)
+        profiler.end(PORTALS)
 
-    def start_portal_transition(self):
+    def choose_next_world(self):
+        """Pick a world different from the current one"""
+        current = self.world_manager.current_world
+        possible_worlds = [w for w in WorldType if w != current]
+        return random.choice(possible_worlds)
+
+    def start_portal_transition(self, portal=None):
         """Start portal transition"""
         # Prevent multiple portal transitions
         if self.game_state == GameState.PORTAL_TRANSITION:
             return
 
         self.game_state = GameState.PORTAL_TRANSITION
-        self.transition_start_time = time.time()
-
-        # Choose next world (different from current)
-        current = self.world_manager.current_world
-        possible_worlds = [w for w in WorldType if w != current]
-        self.next_world = random.choice(possible_worlds)
+        self.transition_start_time = self.clock()
+        self.transition_progress = 0.0
+        # The transition animation hides a short pause
+        self.collect_garbage(1)
+
+        # Choose next world (different from current), unless the portal already has one
+        if portal and portal['target_world'] is not None:
+            self.next_world = portal['target_world']
+        else:
+            self.next_world = self.choose_next_world()
+        self.prefetch_world = self.next_world
 
         # Give score bonus for using portal
         self.score += PORTAL_SCORE
+        self.audio_manager.play_sound_effect("portal")
 
         # Remove all portals in the current vicinity to prevent re-triggering
-        player_z = self.player.z
-        for chunk in self.world_manager.platform_chunks:
-            chunk.portals = [p for p in chunk.portals
-                             if abs(p['z'] - player_z) > 10]  # Remove nearby portals
+        self.world_manager.remove_portals_near(self.player.z, 10)
 
     def update_portal_transition(self):
         """Update portal transition"""
@@ -234,42 +396,102 @@ class PortalRunner:
             self.game_state = GameState.PLAYING
             return
 
-        current_time = time.time()
+        current_time = self.clock()
         progress = min(1.0, (current_time - self.transition_start_time) / TRANSITION_DURATION)
+        self.transition_progress = progress
 
         if progress >= 1.0:
-            # Transition complete
+            # Transition complete; the render thread makes the world's texture resident
             self.world_manager.set_world(self.next_world)
             self.game_state = GameState.PLAYING
             self.transition_start_time = 0  # Reset for safety
             self.next_world = None
 
     def render(self):
-        """Render the game"""
+        """Render the game from the newest snapshot"""
+        # A failed tick ends the game here, rather than leaving the last snapshot on screen
+        if self.simulation is not None:
+            self.simulation.check()
+        start = time.perf_counter()
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        self.profiler.begin_frame()
 
-        if self.game_state == GameState.MENU:
-            self.render_menu()
-        elif self.game_state == GameState.GAME_OVER:
-            self.render_game_over()
-        elif self.game_state == GameState.PORTAL_TRANSITION:
-            self.render_portal_transition()
-        else:  # PLAYING
-            self.render_playing()
-
-    def render_playing(self):
+        # Nothing is published until loading is done, which happens on this thread
+        if self.game_state == GameState.LOADING:
+            self.renderer.draw_loading_screen(self.loader.progress(), self.loader.stages,
+                                              self.width, self.height)
+        else:
+            snapshot = self.snapshots.latest()
+            self.drawn = snapshot
+            self.snapshot_age = time.perf_counter() - snapshot.published_at
+            self.update_textures(snapshot)
+
+            if snapshot.state == GameState.MENU:
+                self.render_menu(snapshot)
+            elif snapshot.state == GameState.GAME_OVER:
+                self.render_game_over(snapshot)
+            elif snapshot.state == GameState.PORTAL_TRANSITION:
+                self.render_portal_transition(snapshot)
+            else:  # PLAYING
+                self.render_playing(snapshot)
+
+            if self.latency_tracker is not None and self.latency_tracker.marker_visible(snapshot.tick):
+                self.renderer.draw_latency_marker(MARKER_SIZE, self.width, self.height)
+
+            # Takes effect from the next frame
+            if self.quality.frame(start, time.perf_counter() - start):
+                self.renderer.set_quality(self.quality.level)
+
+        self.gl_state.end_frame()
+        self.profiler.end_frame()
+        self.metrics.frame()
+
+        # Between frames, so the write stalls neither a frame's timing nor a tick
+        if self.trace_requested:
+            self.trace_requested = False
+            export_chrome_trace(PROFILER_TRACE_PATH, (self.tick_profiler, self.profiler))
+
+    def update_textures(self, snapshot):
+        """Texture work the simulation asked for through the snapshot; GL thread only"""
+        texture_manager = self.texture_manager
+        if snapshot.prefetch_world is not None:
+            texture_manager.prefetch_world(snapshot.prefetch_world)  # Does nothing once started
+        if snapshot.world is not self.rendered_world:
+            texture_manager.ensure_world(snapshot.world)
+            if TEXTURE_MEMORY_REPORT and self.rendered_world is not None:
+                texture_manager.print_memory_report()
+            self.rendered_world = snapshot.world
+
+        # Upload textures prefetched in the background (at most one per frame)
+        texture_manager.process_pending_uploads()
+
+    def read_latency_marker(self):
+        """Read back the latency marker before the swap, if measuring with readback"""
+        tracker = self.latency_tracker
+        if tracker is None or not tracker.readback or self.drawn is None or \
+                not tracker.marker_visible(self.drawn.tick):
+            return None
+        return self.renderer.read_pixel(MARKER_SIZE // 2, MARKER_SIZE // 2)
+
+    def frame_presented(self, marker_pixel=None):
+        """Call right after the buffer swap"""
+        if self.latency_tracker is not None and self.drawn is not None:
+            self.latency_tracker.frame_presented(self.drawn.tick, marker_pixel)
+
+    def render_playing(self, snapshot):
         """Render the game while playing"""
-        # Set up 3D projection
+        # Set up 3D projection; the scene may be drawn below window resolution and scaled up
+        self.renderer.begin_scene()
         self.renderer.setup_3d_projection(self.width, self.height)
         glLoadIdentity()
 
         # Ensure proper lighting state before rendering
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-        glColor3f(1.0, 1.0, 1.0)
+        self.gl_state.enable(GL_LIGHTING)
+        self.gl_state.enable(GL_LIGHT0)
+        self.gl_state.color3f(1.0, 1.0, 1.0)
 
         # Position camera behind player with better angle to see gaps
-        player_pos = self.player.get_position()
+        player_pos = (snapshot.player_x, snapshot.player_y, snapshot.player_z)
         gluLookAt(
             player_pos[0], player_pos[1] + 2.5, player_pos[2] + CAMERA_DISTANCE,  # Higher eye position
             player_pos[0], player_pos[1], player_pos[2] - 10,  # Looking further ahead
@@ -277,112 +499,162 @@ class PortalRunner:
         )
 
         # Update light position after setting camera
-        light_position = [player_pos[0] + 5.0, player_pos[1] + 10.0, player_pos[2] + 5.0, 1.0]
+        light_position = [player_pos[0] + LIGHT_OFFSET[0], player_pos[1] + LIGHT_OFFSET[1],
+                          player_pos[2] + LIGHT_OFFSET[2], 1.0]
         glLightfv(GL_LIGHT0, GL_POSITION, light_position)
 
         # Draw world and player
-        self.renderer.draw_world(self.world_manager, self.player)
-        self.renderer.draw_player(self.player)
+        profiler = self.profiler
+        profiler.begin(DRAW_WORLD)
+        self.renderer.draw_world(snapshot, player_pos[2] + CAMERA_DISTANCE)
+        profiler.end(DRAW_WORLD)
+        profiler.begin(DRAW_PLAYER)
+        self.renderer.draw_player(*player_pos)
+        self.renderer.end_scene()
+        profiler.end(DRAW_PLAYER)
 
         # Draw UI
-        self.render_ui()
+        if self.show_hud:
+            profiler.begin(UI)
+            self.render_ui(snapshot)
+            profiler.end(UI)
 
-    def render_ui(self):
+    def render_ui(self, snapshot):
         """Render game UI (minimal, focused on gameplay)"""
         self.renderer.setup_2d_projection(self.width, self.height)
 
         # Just the essential info
-        glColor3f(1.0, 1.0, 1.0)
-        self.renderer.draw_text(10, self.height - 20, f"Score: {self.score}")
-        self.renderer.draw_text(10, self.height - 40, f"Distance: {int(-self.player.z)}")
+        self.renderer.set_color(1.0, 1.0, 1.0)
+        self.renderer.draw_text(10, self.height - 20, f"Score: {snapshot.score}")
+        self.renderer.draw_text(10, self.height - 40, f"Distance: {snapshot.distance}")
 
         # Show speed multiplier only
-        speed_multiplier = self.world_manager.get_speed_multiplier()
-        glColor3f(1.0, 1.0, 0.0)  # Yellow for speed
-        self.renderer.draw_text(10, self.height - 60, f"Speed: {speed_multiplier:.1f}x")
+        self.renderer.set_color(1.0, 1.0, 0.0)  # Yellow for speed
+        self.renderer.draw_text(10, self.height - 60, f"Speed: {snapshot.speed_multiplier:.1f}x")
+
+        if self.profiler.overlay_visible:
+            self.renderer.set_color(0.0, 1.0, 0.0)  # Green for diagnostics
+            lines = self.tick_profiler.overlay_lines() + self.profiler.overlay_lines()[1:]
+            lines.append(f"quality level {self.quality.index} ({self.quality.changes} changes), "
+                         f"scene at {self.renderer.scene.scale:.0%}")
+            for i, line in enumerate(lines):
+                self.renderer.draw_text(180, self.height - 20 - i * 14, line, self.renderer.font_medium)
 
         self.renderer.restore_3d_projection()
 
     # Remove the speed bar and lane indicator methods - focusing on gameplay only
 
-    def render_menu(self):
+    def render_menu(self, snapshot):
         """Render main menu"""
         self.renderer.setup_2d_projection(self.width, self.height)
 
         # Draw title
-        glColor3f(1.0, 1.0, 0.0)  # Yellow
+        self.renderer.set_color(1.0, 1.0, 0.0)  # Yellow
         self.renderer.draw_centered_text(self.height - 100, "PORTAL RUNNER - 3 LANES", self.width)
 
         # Draw name input
-        glColor3f(1.0, 1.0, 1.0)  # White
+        self.renderer.set_color(1.0, 1.0, 1.0)  # White
         self.renderer.draw_centered_text(self.height // 2 + 60, "Enter Your Name:", self.width)
 
         # Highlight input box if active
-        if self.input_active:
-            glColor3f(0.0, 1.0, 0.0)  # Green for active input
+        if snapshot.input_active:
+            self.renderer.set_color(0.0, 1.0, 0.0)  # Green for active input
         else:
-            glColor3f(0.7, 0.7, 0.7)  # Gray for inactive input
+            self.renderer.set_color(0.7, 0.7, 0.7)  # Gray for inactive input
 
         # Draw input box
-        input_text = self.player_name + ("_" if self.input_active else "")
+        input_text = snapshot.player_name + ("_" if snapshot.input_active else "")
         self.renderer.draw_centered_text(self.height // 2 + 30, input_text, self.width)
 
         # Instructions
-        glColor3f(1.0, 1.0, 1.0)  # White
+        self.renderer.set_color(1.0, 1.0, 1.0)  # White
         self.renderer.draw_centered_text(self.height // 2, "Click to input name, ENTER to confirm", self.width)
         self.renderer.draw_centered_text(self.height // 2 - 30, "Press SPACE to start", self.width)
         self.renderer.draw_centered_text(self.height // 2 - 60, "Use A/D to switch lanes, W to jump, S to quick land",
                                          self.width)
 
         # Draw high scores
-        if self.high_scores:
-            glColor3f(1.0, 1.0, 0.0)  # Yellow
+        high_scores = self.leaderboard.top_cached(HIGH_SCORE_COUNT)
+        if high_scores:
+            self.renderer.set_color(1.0, 1.0, 0.0)  # Yellow
             self.renderer.draw_centered_text(self.height // 2 - 100, "HIGH SCORES", self.width)
 
-            for i, entry in enumerate(self.high_scores[:5]):
-                glColor3f(1.0, 1.0, 1.0)  # White
+            for i, entry in enumerate(high_scores):
+                self.renderer.set_color(1.0, 1.0, 1.0)  # White
                 score_text = f"{i + 1}. {entry['name']}: {entry['score']}"
                 self.renderer.draw_centered_text(self.height // 2 - 130 - (i * 20), score_text, self.width)
 
         self.renderer.restore_3d_projection()
 
-    def render_game_over(self):
+    def render_game_over(self, snapshot):
         """Render game over screen"""
         self.renderer.setup_2d_projection(self.width, self.height)
 
         # Draw game over text
-        glColor3f(1.0, 0.0, 0.0)  # Red
+        self.renderer.set_color(1.0, 0.0, 0.0)  # Red
         self.renderer.draw_centered_text(self.height - 100, "GAME OVER", self.width)
 
         # Draw final score
-        glColor3f(1.0, 1.0, 1.0)  # White
-        self.renderer.draw_centered_text(self.height // 2 + 30, f"Final Score: {self.score}", self.width)
-        self.renderer.draw_centered_text(self.height // 2, f"Distance Traveled: {int(-self.player.z)}", self.width)
+        self.renderer.set_color(1.0, 1.0, 1.0)  # White
+        if snapshot.final_rank is not None and snapshot.score > 0:
+            rank, total = snapshot.final_rank
+            self.renderer.draw_centered_text(self.height // 2 + 60, f"Rank {rank} of {total}", self.width)
+        self.renderer.draw_centered_text(self.height // 2 + 30, f"Final Score: {snapshot.score}", self.width)
+        self.renderer.draw_centered_text(self.height // 2, f"Distance Traveled: {snapshot.distance}", self.width)
         self.renderer.draw_centered_text(self.height // 2 - 30, "Press SPACE to restart", self.width)
 
         # Draw high scores
-        if self.high_scores:
-            glColor3f(1.0, 1.0, 0.0)  # Yellow
+        high_scores = self.leaderboard.top_cached(HIGH_SCORE_COUNT)
+        if high_scores:
+            self.renderer.set_color(1.0, 1.0, 0.0)  # Yellow
             self.renderer.draw_centered_text(self.height // 2 - 80, "HIGH SCORES", self.width)
 
-            for i, entry in enumerate(self.high_scores[:5]):
-                glColor3f(1.0, 1.0, 1.0)  # White
+            for i, entry in enumerate(high_scores):
+                self.renderer.set_color(1.0, 1.0, 1.0)  # White
                 score_text = f"{i + 1}. {entry['name']}: {entry['score']}"
                 self.renderer.draw_centered_text(self.height // 2 - 110 - (i * 20), score_text, self.width)
 
         self.renderer.restore_3d_projection()
-    def render_portal_transition(self):
-        """Render portal transition effect"""
-        current_time = time.time()
-        progress = min(1.0, (current_time - self.transition_start_time) / TRANSITION_DURATION)
 
-        self.renderer.draw_portal_transition(progress, self.next_world, self.width, self.height)
+    def render_portal_transition(self, snapshot):
+        """Render portal transition effect"""
+        self.renderer.draw_portal_transition(snapshot.transition_progress, snapshot.next_world,
+                                             self.width, self.height, show_text=self.show_hud)
 
     def reshape(self, width, height):
         """Handle window resizing"""
         self.width = width
         self.height = height
-        glViewport(0, 0, width, height)
+        self.renderer.resize(width, height)
+
+    def process_input(self):
+        """Apply the input events queued since the last tick"""
+        # Coalescing repeats only makes sense for game controls, not for typing a name
+        coalesce = self.game_state == GameState.PLAYING
+        tracker = self.latency_tracker
+        for event in self.input_queue.drain(self.tick, coalesce):
+            before = None
+            if tracker is not None and self.game_state == GameState.PLAYING:
+                before = self.player_control_state()
+
+            if event.kind == KEY:
+                if self.game_state == GameState.MENU and self.input_active:
+                    self.handle_text_input(event.value)
+                else:
+                    self.handle_key(event.value.lower())
+            elif event.kind == SPECIAL:
+                self.handle_special_key(event.value)
+            elif event.kind == MOUSE:
+                self.handle_mouse(*event.value, event.x, event.y)
+
+            if before is not None and self.game_state == GameState.PLAYING and \
+                    self.player_control_state() != before:
+                tracker.input_applied(event, event.value, self.world_manager.get_speed_multiplier())
+
+    def player_control_state(self):
+        """The player state that input changes, to tell presses that did something"""
+        player = self.player
+        return player.target_x, player.is_jumping, player.is_fast_falling
 
     def handle_key(self, key):
         """Handle key press"""
@@ -399,9 +671,38 @@ class PortalRunner:
             if key == ' ':
                 self.reset_game()
 
+    def handle_text_input(self, key):
+        """Edit the player name while the name input is active"""
+        key_code = ord(key)
+        if key_code == 13 or key_code == 10:  # Enter key (CR or LF)
+            self.input_active = False
+        elif key_code == 8 or key_code == 127:  # Backspace or Delete
+            self.player_name = self.player_name[:-1]
+        elif 32 <= key_code <= 126 and len(self.player_name) < 15:  # Printable ASCII
+            self.player_name += key
+
+    def handle_mouse(self, button, state, x, y):
+        """Handle mouse button events"""
+        if self.game_state == GameState.MENU:
+            from OpenGL.GLUT import GLUT_DOWN, GLUT_LEFT_BUTTON
+
+            if button == GLUT_LEFT_BUTTON and state == GLUT_DOWN:
+                # Calculate y position in our coordinate system
+                y = self.height - y
+
+                # Check if click is in the input area
+                input_y = self.height // 2 + 30
+                self.input_active = abs(y - input_y) < 15
+
     def handle_special_key(self, key):
-        """Handle special key press (arrow keys)"""
-        if self.game_state == GameState.PLAYING:
+        """Handle special key press (arrow keys, F3/F4 for the frame profiler)"""
+        from OpenGL.GLUT import GLUT_KEY_F3, GLUT_KEY_F4
+
+        if key == GLUT_KEY_F3:
+            self.profiler.overlay_visible = not self.profiler.overlay_visible
+        elif key == GLUT_KEY_F4:
+            self.trace_requested = True
+        elif self.game_state == GameState.PLAYING:
             from OpenGL.GLUT import GLUT_KEY_LEFT, GLUT_KEY_RIGHT, GLUT_KEY_UP, GLUT_KEY_DOWN
 
             if key == GLUT_KEY_LEFT:
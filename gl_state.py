@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Shadow copy of the OpenGL state used by Portal Runner.
+
+Every state change goes through GLStateCache, which remembers the last value
+it sent to the driver and drops calls that would not change anything.
+"""
+
+from OpenGL.GL import *
+
+
+class GLStateCache:
+    """Tracks enables, bound texture, current color and matrix mode"""
+
+    def __init__(self, debug=False, report_interval=120):
+        self.debug = debug
+        self.report_interval = report_interval
+
+        # Per-frame counters
+        self.issued = 0
+        self.elided = 0
+        self.frame_count = 0
+        self.last_frame_issued = 0
+        self.last_frame_elided = 0
+        self._interval_issued = 0
+        self._interval_elided = 0
+
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget everything we know; the next call of each kind always goes through"""
+        self.enabled = {}
+        self.bound_texture = None
+        self.color = None
+        self.current_matrix_mode = None
+
+    def enable(self, cap):
+        """glEnable, skipped if the capability is already enabled"""
+        if self.enabled.get(cap) is True:
+            self.elided += 1
+            return
+        glEnable(cap)
+        self.enabled[cap] = True
+        self.issued += 1
+
+    def disable(self, cap):
+        """glDisable, skipped if the capability is already disabled"""
+        if self.enabled.get(cap) is False:
+            self.elided += 1
+            return
+        glDisable(cap)
+        self.enabled[cap] = False
+        self.issued += 1
+
+    def bind_texture(self, texture_id):
+        """glBindTexture(GL_TEXTURE_2D), skipped if the texture is already bound"""
+        if self.bound_texture == texture_id:
+            self.elided += 1
+            return
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        self.bound_texture = texture_id
+        self.issued += 1
+
+    def texture_deleted(self, texture_id):
+        """Forget the binding if the bound texture was deleted"""
+        if self.bound_texture == texture_id:
+            self.bound_texture = None
+
+    def color3f(self, r, g, b):
+        """glColor3f, skipped if the current color is unchanged"""
+        self.color4f(r, g, b, 1.0)
+
+    def color4f(self, r, g, b, a):
+        """glColor4f, skipped if the current color is unchanged"""
+        color = self.color
+        if color is not None and color[0] == r and color[1] == g and color[2] == b and color[3] == a:
+            self.elided += 1
+            return
+        glColor4f(r, g, b, a)
+        self.color = (r, g, b, a)
+        self.issued += 1
+
+    def matrix_mode(self, mode):
+        """glMatrixMode, skipped if the mode is already active"""
+        if self.current_matrix_mode == mode:
+            self.elided += 1
+            return
+        glMatrixMode(mode)
+        self.current_matrix_mode = mode
+        self.issued += 1
+
+    def end_frame(self):
+        """Close the per-frame counters and report them in debug mode"""
+        self.last_frame_issued = self.issued
+        self.last_frame_elided = self.elided
+        self._interval_issued += self.issued
+        self._interval_elided += self.elided
+        self.issued = 0
+        self.elided = 0
+        self.frame_count += 1
+
+        if self.debug and self.frame_count % self.report_interval == 0:
+            frames = self.report_interval
+            print(f"GL state: {self.last_frame_elided} calls elided last frame, "
+                  f"{self._interval_elided / frames:.1f} elided / "
+                  f"{self._interval_issued / frames:.1f} issued per frame "
+                  f"(avg over {frames} frames)")
+            self._interval_issued = 0
+            self._interval_elided = 0
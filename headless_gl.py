@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Headless OpenGL context for benchmarks and soak tests.
+
+Creates an off-screen pbuffer context through EGL, so the renderer and the
+texture uploads can run without a window or a display server. With Mesa,
+this is the llvmpipe software rasterizer unless a GPU driver is available.
+
+PyOpenGL picks its platform on first import, so import this module before
+anything that imports OpenGL.
+"""
+
+import ctypes
+import os
+
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")  # Mesa: no X11 or Wayland needed
+
+
+def create_context(width=800, height=600):
+    """Make an off-screen compatibility-profile context current; raises RuntimeError if EGL is unusable"""
+    try:
+        from OpenGL import EGL
+    except ImportError as e:
+        raise RuntimeError(f"EGL is not available: {e}")
+
+    try:
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor))
+
+        config_attributes = (EGL.EGLint * 13)(
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+            EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_NONE)
+        config = EGL.EGLConfig()
+        count = EGL.EGLint()
+        EGL.eglChooseConfig(display, config_attributes, ctypes.pointer(config), 1, ctypes.pointer(count))
+        if count.value == 0:
+            raise RuntimeError("no EGL config with an RGB color buffer and a depth buffer")
+
+        surface = EGL.eglCreatePbufferSurface(
+            display, config, (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE))
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+        EGL.eglMakeCurrent(display, surface, surface, context)
+    except RuntimeError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"could not create an EGL context: {e}")
+
+    return display, surface, context
+
+
+def renderer_name():
+    """GL_RENDERER of the current context"""
+    from OpenGL.GL import GL_RENDERER, glGetString
+    return glGetString(GL_RENDERER).decode()
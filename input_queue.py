@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Input event queue for Portal Runner.
+
+GLUT callbacks only push timestamped events here. The game drains the queue
+at the start of each update, so input is applied at a fixed point in the
+tick rather than in the middle of simulation or rendering. Each event's
+latency from callback to applied tick is recorded. The applied events can
+be recorded with their tick number and replayed later.
+"""
+
+import time
+from collections import deque
+
+from constants import INPUT_LATENCY_WINDOW
+
+# Event kinds
+KEY = "key"  # value: the key as str, in the case it was typed
+SPECIAL = "special"  # value: GLUT_KEY_* code
+MOUSE = "mouse"  # value: (button, state)
+
+
+class InputEvent:
+    __slots__ = ("kind", "value", "x", "y", "timestamp")
+
+    def __init__(self, kind, value, x=0, y=0, timestamp=None):
+        self.kind = kind
+        self.value = value
+        self.x = x
+        self.y = y
+        self.timestamp = time.perf_counter() if timestamp is None else timestamp
+
+    def same_action(self, other):
+        return self.kind == other.kind and self.value == other.value
+
+
+class InputQueue:
+    def __init__(self, latency_window=INPUT_LATENCY_WINDOW):
+        self._events = deque()
+
+        # Callback-to-tick latencies of the most recent events, in seconds
+        self.latencies = deque(maxlen=latency_window)
+        self.applied = 0
+        self.coalesced = 0
+
+        self._drained = []  # Returned by drain(); reused so an idle tick allocates nothing
+
+        self.recording = None  # [(tick, kind, value, x, y)] while recording
+        self._replay = deque()
+
+    def push(self, kind, value, x=0, y=0):
+        """Queue an event; called from GLUT callbacks"""
+        self._events.append(InputEvent(kind, value, x, y))
+
+    def drain(self, tick, coalesce=False):
+        """Events to apply this tick, oldest first; the list is reused by the next drain.
+
+        With coalesce, a run of identical events (key auto-repeat, several
+        presses within one tick) is applied once; text entry leaves it off.
+        """
+        now = time.perf_counter()
+        while self._replay and self._replay[0][0] <= tick:
+            _, kind, value, x, y = self._replay.popleft()
+            self._events.append(InputEvent(kind, value, x, y, now))
+
+        events = self._drained
+        events.clear()
+        while self._events:
+            event = self._events.popleft()
+            self.latencies.append(now - event.timestamp)
+            if coalesce and events and events[-1].same_action(event):
+                self.coalesced += 1
+                continue
+            events.append(event)
+
+        self.applied += len(events)
+        if self.recording is not None:
+            self.recording.extend((tick, event.kind, event.value, event.x, event.y) for event in events)
+        return events
+
+    def start_recording(self):
+        self.recording = []
+
+    def replay(self, recording):
+        """Inject recorded events at the ticks they were originally applied on"""
+        self._replay = deque(sorted(recording, key=lambda event: event[0]))
+
+    def latency_stats(self):
+        """Percentiles of recent callback-to-tick latency in milliseconds"""
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+
+        def at(fraction):
+            return values[min(len(values) - 1, int(fraction * len(values)))] * 1000
+
+        return {'count': len(values), 'p50': at(0.50), 'p95': at(0.95), 'p99': at(0.99),
+                'max': values[-1] * 1000}
+
+    def report(self):
+        """One line summarizing input latency and coalescing"""
+        stats = self.latency_stats()
+        if stats is None:
+            return "Input latency: no events"
+        return (f"Input latency over {stats['count']} events: p50 {stats['p50']:.1f} ms, "
+                f"p95 {stats['p95']:.1f} ms, p99 {stats['p99']:.1f} ms, max {stats['max']:.1f} ms; "
+                f"{self.applied} applied, {self.coalesced} coalesced")
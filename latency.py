@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Input-to-photon latency measurement for Portal Runner.
+
+Every key press that changes the player's state is followed through four
+points in time:
+
+    pressed    the GLUT callback queued the event
+    applied    the tick that drained the input queue handled it
+    simulated  that tick's player update moved the player
+    presented  the swap of the first frame drawn from that tick's snapshot
+               or a later one (see simulation.py)
+
+While a change is waiting to be presented, the game draws a small white
+marker in the bottom-left corner of the frame, which a photodiode or a
+high-speed camera can watch. With readback enabled, that pixel is read back
+before the swap to confirm the frame really contains the change. The read
+also waits for the GPU to finish the frame, so "presented" includes
+rendering time.
+
+Enable with: python main.py --measure-latency [--latency-readback]
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from constants import LATENCY_BUCKET_MS, LATENCY_MAX_MS
+
+MARKER_SIZE = 8  # Pixels, drawn at the bottom-left corner of the window
+
+
+class LatencySample:
+    __slots__ = ("action", "speed_multiplier", "pressed", "applied", "simulated", "tick", "presented",
+                 "confirmed")
+
+    def __init__(self, action, speed_multiplier, pressed, applied):
+        self.action = action
+        self.speed_multiplier = speed_multiplier
+        self.pressed = pressed
+        self.applied = applied
+        self.simulated = None
+        self.tick = None  # Simulation tick that moved the player
+        self.presented = None
+        self.confirmed = None  # True/False with readback, None without
+
+
+class LatencyTracker:
+    def __init__(self, readback=False, bucket_ms=LATENCY_BUCKET_MS, max_ms=LATENCY_MAX_MS):
+        self.readback = readback
+        self.bucket_ms = bucket_ms
+        self.max_ms = max_ms
+
+        self._applied = []  # Handled this tick, waiting for the player update
+        self._simulated = []  # Simulated, waiting for a frame; oldest first
+        self._lock = threading.Lock()  # _simulated is shared by the simulation and render threads
+        self.samples = []  # Complete measurements
+
+    def input_applied(self, event, action, speed_multiplier):
+        """An input event changed the player's state this tick"""
+        self._applied.append(LatencySample(action, speed_multiplier, event.timestamp,
+                                           time.perf_counter()))
+
+    def player_updated(self, tick):
+        """The tick's player update ran; the applied changes are now part of the simulation"""
+        if self._applied:
+            now = time.perf_counter()
+            for sample in self._applied:
+                sample.simulated = now
+                sample.tick = tick
+            with self._lock:
+                self._simulated.extend(self._applied)
+            self._applied.clear()
+
+    def marker_visible(self, tick):
+        """True while the frame being drawn, from the snapshot of tick, is the first to show a measured change"""
+        with self._lock:
+            return bool(self._simulated) and self._simulated[0].tick <= tick
+
+    def frame_presented(self, tick, marker_pixel=None):
+        """Call right after the buffer swap of a frame drawn from the snapshot of tick;
+        marker_pixel is the readback of the marker, if any"""
+        with self._lock:
+            simulated = self._simulated
+            shown = 0
+            while shown < len(simulated) and simulated[shown].tick <= tick:
+                shown += 1
+            if not shown:
+                return
+            presented = simulated[:shown]
+            del simulated[:shown]
+        now = time.perf_counter()
+        confirmed = None if marker_pixel is None else all(channel > 200 for channel in marker_pixel[:3])
+        for sample in presented:
+            sample.presented = now
+            sample.confirmed = confirmed
+        self.samples.extend(presented)
+
+    def histogram(self, stage="presented"):
+        """Counts of press-to-stage latency per bucket: [(bucket start in ms, count)]"""
+        bucket_count = int(self.max_ms // self.bucket_ms) + 1  # The last bucket collects overflow
+        counts = [0] * bucket_count
+        for sample in self.samples:
+            milliseconds = (getattr(sample, stage) - sample.pressed) * 1000
+            counts[min(bucket_count - 1, int(milliseconds // self.bucket_ms))] += 1
+        return [(i * self.bucket_ms, count) for i, count in enumerate(counts)]
+
+    def report(self, width=40):
+        """Lines with the stage breakdown, the press-to-present histogram and latency by speed"""
+        if not self.samples:
+            return ["Input-to-photon latency: no measured presses"]
+
+        def median_ms(values):
+            values = sorted(values)
+            return values[len(values) // 2] * 1000
+
+        lines = [f"Input-to-photon latency over {len(self.samples)} presses (median):"]
+        previous = "pressed"
+        for stage in ("applied", "simulated", "presented"):
+            lines.append(f"  {previous:>9} -> {stage:<9} "
+                         f"{median_ms([getattr(s, stage) - getattr(s, previous) for s in self.samples]):7.1f} ms")
+            previous = stage
+        lines.append(f"  {'pressed':>9} -> {'presented':<9} "
+                     f"{median_ms([s.presented - s.pressed for s in self.samples]):7.1f} ms")
+
+        if self.readback:
+            confirmed = sum(1 for sample in self.samples if sample.confirmed)
+            lines.append(f"  marker confirmed by readback in {confirmed} of {len(self.samples)} frames")
+
+        histogram = self.histogram()
+        peak = max(count for _, count in histogram)
+        last_used = max(i for i, (_, count) in enumerate(histogram) if count)
+        lines.append("Press-to-present histogram:")
+        for i, (start, count) in enumerate(histogram[:last_used + 1]):
+            label = f">={start:g}" if i == len(histogram) - 1 else f"{start:g}-{start + self.bucket_ms:g}"
+            lines.append(f"  {label:>9} ms {count:5d} {'#' * round(width * count / peak)}")
+
+        by_speed = defaultdict(list)
+        for sample in self.samples:
+            by_speed[round(sample.speed_multiplier, 1)].append(sample.presented - sample.pressed)
+        lines.append("Median press-to-present by speed multiplier:")
+        for multiplier in sorted(by_speed):
+            lines.append(f"  {multiplier:4.1f}x {median_ms(by_speed[multiplier]):7.1f} ms "
+                         f"({len(by_speed[multiplier])} presses)")
+        return lines
+
+    def print_report(self):
+        for line in self.report():
+            print(line)
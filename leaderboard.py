@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+SQLite leaderboard for Portal Runner.
+
+Every finished run is a row in `scores`. Two small tables are kept up to
+date on insert so the common queries never scan all runs:
+
+- `score_counts` holds how many runs reached each score, overall and per
+  world. A rank is one indexed range sum over the distinct scores above it.
+  Scores are multiples of 10, so there are a few thousand distinct values
+  even with millions of runs.
+- `player_bests` holds each player's best run, indexed by score.
+
+The database runs in WAL mode, so the game can read while another thread,
+or another cabinet sharing the file, writes.
+
+Usage: python leaderboard.py import high_scores.json [...]
+       python leaderboard.py top [--world DESERT] [--limit 20]
+       python leaderboard.py rank SCORE [--world DESERT]
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+
+from constants import LEADERBOARD_DB, LEADERBOARD_REFRESH_INTERVAL
+
+# score_counts key for the board across all worlds
+ALL_WORLDS = "*"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    world TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id);
+CREATE INDEX IF NOT EXISTS scores_by_world ON scores (world, score DESC, id);
+
+CREATE TABLE IF NOT EXISTS score_counts (
+    world TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (world, score)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS player_bests (
+    player TEXT PRIMARY KEY,
+    score INTEGER NOT NULL,
+    world TEXT NOT NULL,
+    id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS player_bests_by_score ON player_bests (score DESC, id);
+"""
+
+
+def _world_key(world):
+    """Column value for a WorldType, its name, or None for unknown"""
+    if world is None:
+        return ""
+    return getattr(world, "name", world)
+
+
+class Leaderboard:
+    def __init__(self, path=LEADERBOARD_DB, refresh_interval=LEADERBOARD_REFRESH_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+
+        # sqlite3 connections must stay on the thread that opened them
+        self._local = threading.local()
+
+        # Cached top lists for the menu: (limit, world) -> rows, valid while the
+        # database is unchanged. _generation counts our own writes; PRAGMA
+        # data_version changes when another connection commits.
+        self._top_cache = {}
+        self._generation = 0
+        self._cache_version = None
+        self._next_check = 0.0
+
+        with self._connection() as db:
+            db.executescript(SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; fsync at checkpoints
+            self._local.db = db
+        return db
+
+    def add_score(self, player, score, world=None, created=None):
+        """Record one finished run"""
+        self.add_scores([{"name": player, "score": score, "world": world, "created": created}])
+
+    def add_scores(self, entries):
+        """Record runs given as dicts with "name", "score" and optionally "world" and "created".
+
+        All entries are written in one transaction, which is what makes bulk
+        imports fast.
+        """
+        now = time.time()
+        db = self._connection()
+        with db:
+            for entry in entries:
+                player, score = entry["name"], int(entry["score"])
+                world = _world_key(entry.get("world"))
+                cursor = db.execute(
+                    "INSERT INTO scores (player, score, world, created) VALUES (?, ?, ?, ?)",
+                    (player, score, world, entry.get("created") or now))
+                db.executemany(
+                    "INSERT INTO score_counts VALUES (?, ?, 1) "
+                    "ON CONFLICT (world, score) DO UPDATE SET count = count + 1",
+                    ((ALL_WORLDS, score), (world, score)))
+                db.execute(
+                    "INSERT INTO player_bests VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (player) DO UPDATE SET score = excluded.score, "
+                    "world = excluded.world, id = excluded.id "
+                    "WHERE excluded.score > player_bests.score",
+                    (player, score, world, cursor.lastrowid))
+        self._generation += 1
+
+    def import_json(self, path):
+        """Add the entries of a high-score file (old list format or a ScoreStore snapshot)"""
+        with open(path, "r") as f:
+            data = json.load(f)
+        entries = data["scores"] if isinstance(data, dict) else data
+        self.add_scores(entries)
+        return len(entries)
+
+    def count(self, world=None):
+        """Number of recorded runs, overall or in one world"""
+        row = self._connection().execute(
+            "SELECT COALESCE(SUM(count), 0) FROM score_counts WHERE world = ?",
+            (ALL_WORLDS if world is None else _world_key(world),)).fetchone()
+        return row[0]
+
+    def rank(self, score, world=None):
+        """1-based rank a score would have; ties share the better rank"""
+        row = self._connection().execute(
+            "SELECT COALESCE(SUM(count), 0) FROM score_counts WHERE world = ? AND score > ?",
+            (ALL_WORLDS if world is None else _world_key(world), score)).fetchone()
+        return row[0] + 1
+
+    def top(self, limit=10, world=None, after=None):
+        """Best runs as [{"id", "name", "score", "world"}], highest first.
+
+        For the next page pass after=(score, id) of the last row returned; unlike
+        OFFSET this stays an index seek however deep the page is.
+        """
+        query = "SELECT id, player, score, world FROM scores"
+        conditions, params = [], []
+        if world is not None:
+            conditions.append("world = ?")
+            params.append(_world_key(world))
+        if after is not None:
+            conditions.append("(score < ? OR (score = ? AND id > ?))")
+            params += [after[0], after[0], after[1]]
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY score DESC, id LIMIT ?"
+        params.append(limit)
+
+        rows = self._connection().execute(query, params).fetchall()
+        return [{"id": row_id, "name": player, "score": score, "world": world_name}
+                for row_id, player, score, world_name in rows]
+
+    def top_cached(self, limit=10, world=None):
+        """top() for code that runs every frame; re-queried only after the data changed"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.refresh_interval
+            version = (self._generation,
+                       self._connection().execute("PRAGMA data_version").fetchone()[0])
+            if version != self._cache_version:
+                self._cache_version = version
+                self._top_cache.clear()
+
+        key = (limit, world)
+        rows = self._top_cache.get(key)
+        if rows is None:
+            rows = self._top_cache[key] = self.top(limit, world)
+        return rows
+
+    def player_bests(self, limit=10, after=None):
+        """Each player's best run as [{"id", "name", "score", "world"}], highest first"""
+        query = "SELECT id, player, score, world FROM player_bests"
+        params = []
+        if after is not None:
+            query += " WHERE score < ? OR (score = ? AND id > ?)"
+            params += [after[0], after[0], after[1]]
+        query += " ORDER BY score DESC, id LIMIT ?"
+        params.append(limit)
+
+        rows = self._connection().execute(query, params).fetchall()
+        return [{"id": row_id, "name": player, "score": score, "world": world_name}
+                for row_id, player, score, world_name in rows]
+
+    def player_best(self, player):
+        """A player's best score, or None if they have no runs"""
+        row = self._connection().execute(
+            "SELECT score FROM player_bests WHERE player = ?", (player,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        """Close this thread's connection"""
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portal Runner leaderboard")
+    parser.add_argument("--db", default=LEADERBOARD_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="add the entries of high-score JSON files")
+    import_parser.add_argument("files", nargs="+")
+
+    top_parser = commands.add_parser("top", help="print the best runs")
+    top_parser.add_argument("--world")
+    top_parser.add_argument("--limit", type=int, default=10)
+
+    rank_parser = commands.add_parser("rank", help="print the rank of a score")
+    rank_parser.add_argument("score", type=int)
+    rank_parser.add_argument("--world")
+
+    args = parser.parse_args()
+    leaderboard = Leaderboard(args.db)
+
+    if args.command == "import":
+        for path in args.files:
+            print(f"{path}: imported {leaderboard.import_json(path)} scores")
+    elif args.command == "top":
+        for i, entry in enumerate(leaderboard.top(args.limit, args.world)):
+            print(f"{i + 1:>4}. {entry['name']:<16} {entry['score']:>8}  {entry['world']}")
+    else:
+        print(f"Rank {leaderboard.rank(args.score, args.world)} of {leaderboard.count(args.world)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Submits finished runs to a remote leaderboard service.
+
+Scores are handed to a background thread that keeps one TCP connection to
+the service open and sends them in batches. Every score is first appended
+to a spool file, and it is only dropped from the spool once the service has
+acknowledged its batch. Scores survive outages and restarts, and the game
+never waits on the network. Failed sends are retried with exponential
+backoff and jitter.
+
+The wire protocol is one JSON object per line in each direction; see
+leaderboard_server.py.
+"""
+
+import json
+import os
+import queue
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+
+from constants import (LEADERBOARD_ADDRESS, LEADERBOARD_BATCH_INTERVAL, LEADERBOARD_BATCH_SIZE,
+                       LEADERBOARD_RETRY_MAX, LEADERBOARD_SPOOL)
+
+CONNECT_TIMEOUT = 5.0  # Seconds for connecting and for each reply
+RETRY_MIN = 0.5  # First backoff after a failure, doubled up to LEADERBOARD_RETRY_MAX
+
+
+class LeaderboardClient:
+    def __init__(self, address=LEADERBOARD_ADDRESS, spool_path=LEADERBOARD_SPOOL,
+                 batch_size=LEADERBOARD_BATCH_SIZE, batch_interval=LEADERBOARD_BATCH_INTERVAL,
+                 retry_max=LEADERBOARD_RETRY_MAX):
+        self.address = tuple(address)
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.retry_max = retry_max
+
+        # Scores not acknowledged yet, oldest first; loaded from the spool on startup
+        self.pending = deque(self._load_spool())
+        self.sent = 0
+        self.failures = 0
+
+        self._sock = None
+        self._reader = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+        self._requests = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="leaderboard-client", daemon=True)
+        self._thread.start()
+
+    def _load_spool(self):
+        """Spooled scores whose batch was never acknowledged"""
+        entries, acked = [], set()
+        try:
+            with open(self.spool_path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash
+                    if "acked" in record:
+                        acked.update(record["acked"])
+                    else:
+                        entries.append(record)
+        except FileNotFoundError:
+            pass
+        return [entry for entry in entries if entry["submission_id"] not in acked]
+
+    def _append_to_spool(self, records):
+        with open(self.spool_path, "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def submit(self, entries):
+        """Queue scores (dicts with "name", "score", "world", "created"); returns at once"""
+        self._requests.put([dict(entry, submission_id=uuid.uuid4().hex) for entry in entries])
+
+    def _run(self):
+        """Client thread: spool new scores, send batches when due, back off on failure"""
+        oldest = time.monotonic() if self.pending else None
+        closing = False
+        while not closing:
+            timeout = None
+            if self.pending:
+                due = max(self._retry_at, oldest + self.batch_interval)
+                timeout = max(0.0, due - time.monotonic())
+            try:
+                entries = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                entries = []
+            if entries is None:
+                closing = True
+                entries = []
+
+            if entries:
+                try:
+                    self._append_to_spool(entries)
+                except OSError as e:
+                    print(f"Could not spool leaderboard scores: {e}")
+                if not self.pending:
+                    oldest = time.monotonic()
+                self.pending.extend(entries)
+
+            # A full batch goes out right away, a partial one after batch_interval
+            while self.pending and time.monotonic() >= self._retry_at and (
+                    closing or len(self.pending) >= self.batch_size or
+                    time.monotonic() >= oldest + self.batch_interval):
+                if not self._send_batch():
+                    break
+                oldest = time.monotonic()
+
+        self._disconnect()
+
+    def _send_batch(self):
+        """Send the oldest pending scores; returns True once the service acknowledged them"""
+        batch = [self.pending[i] for i in range(min(self.batch_size, len(self.pending)))]
+        try:
+            if self._sock is None:
+                self._sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+                self._reader = self._sock.makefile("rb")
+            self._sock.sendall((json.dumps({"type": "submit", "scores": batch}) + "\n").encode())
+            reply = self._reader.readline()
+            if not reply:
+                raise ConnectionError("connection closed by the leaderboard service")
+            reply = json.loads(reply)
+            if not reply.get("ok"):
+                raise ConnectionError(reply.get("error", "submission rejected"))
+        except (OSError, ValueError) as e:
+            self._disconnect()
+            self.failures += 1
+            # Exponential backoff with jitter so cabinets do not retry in lockstep
+            self._backoff = min(self.retry_max, max(RETRY_MIN, self._backoff * 2))
+            self._retry_at = time.monotonic() + self._backoff * random.uniform(0.5, 1.0)
+            print(f"Leaderboard unreachable ({e}); retrying in {self._backoff:.1f}s")
+            return False
+
+        for _ in batch:
+            self.pending.popleft()
+        self.sent += len(batch)
+        self._backoff = 0.0
+
+        try:
+            if self.pending:
+                self._append_to_spool([{"acked": [entry["submission_id"] for entry in batch]}])
+            else:
+                # Everything acknowledged: start the spool over
+                open(self.spool_path, "w").close()
+        except OSError as e:
+            print(f"Could not update leaderboard spool: {e}")
+        return True
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+
+    def close(self):
+        """Make one last attempt to send pending scores and stop; unsent scores stay spooled"""
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Load generator for the leaderboard service.
+
+Opens one persistent connection per simulated cabinet and has every cabinet
+submit batches of random scores, as LeaderboardClient does. It then reports
+throughput and request latency percentiles. By default it starts a
+stand-in server (leaderboard_server.py) on a temporary database. Pass
+--address to load an already running service instead.
+
+Usage: python leaderboard_loadgen.py [--submitters 500] [--batches 10] [--batch-size 20]
+                                     [--address HOST:PORT] [--seed 1] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from constants import WorldType
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoadRun:
+    """Shared state of one load run: start signal and collected latencies"""
+
+    def __init__(self, submitters):
+        self.submitters = submitters
+        self.arrived = 0
+        self.all_connected = asyncio.Event()
+        self.latencies = []
+
+    def arrive(self):
+        """Called once per cabinet, connected or not; the run starts when all have arrived"""
+        self.arrived += 1
+        if self.arrived == self.submitters:
+            self.all_connected.set()
+
+
+async def submitter(run, cabinet, host, port, batches, batch_size, rng):
+    """One cabinet: connect, wait until every cabinet is connected, then submit back to back"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    finally:
+        run.arrive()
+    await run.all_connected.wait()
+
+    worlds = [world.name for world in WorldType]
+    try:
+        for batch_number in range(batches):
+            scores = [{
+                "submission_id": f"{cabinet}-{batch_number}-{i}",
+                "name": f"cabinet{cabinet}",
+                "score": rng.randrange(0, 5000) * 10,
+                "world": rng.choice(worlds),
+            } for i in range(batch_size)]
+
+            start = time.perf_counter()
+            writer.write((json.dumps({"type": "submit", "scores": scores}) + "\n").encode())
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            run.latencies.append(time.perf_counter() - start)
+            if not reply.get("ok"):
+                raise RuntimeError(reply.get("error"))
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, submitters, batches, batch_size, seed):
+    """Run the load and return a summary dict"""
+    run = LoadRun(submitters)
+    tasks = [asyncio.create_task(submitter(run, cabinet, host, port, batches, batch_size,
+                                           random.Random(seed * 100003 + cabinet)))
+             for cabinet in range(submitters)]
+
+    # Connection setup is not part of the measurement
+    await run.all_connected.wait()
+    start = time.perf_counter()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    latencies = sorted(run.latencies)
+    requests = len(latencies)
+    return {
+        "submitters": submitters,
+        "batch_size": batch_size,
+        "requests": requests,
+        "scores": requests * batch_size,
+        "errors": len(errors),
+        "first_error": repr(errors[0]) if errors else None,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed if elapsed else 0.0,
+        "scores_per_second": requests * batch_size / elapsed if elapsed else 0.0,
+        "latency_ms": {name: percentile(latencies, fraction) * 1000
+                       for name, fraction in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99),
+                                              ("p99.9", 0.999), ("max", 1.0))},
+    }
+
+
+def start_local_server(db_path):
+    """Start leaderboard_server.py on a free port; returns (process, host, port)"""
+    server_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leaderboard_server.py")
+    process = subprocess.Popen([sys.executable, server_script, "--port", "0", "--db", db_path],
+                               stdout=subprocess.PIPE, text=True)
+    # First line: "Leaderboard server listening on HOST:PORT (DB)"
+    address = process.stdout.readline().split(" on ", 1)[1].split()[0]
+    host, port = address.rsplit(":", 1)
+    return process, host, int(port)
+
+
+def print_summary(summary):
+    print(f"{summary['submitters']} submitters, {summary['requests']} batches of "
+          f"{summary['batch_size']} in {summary['seconds']:.2f}s")
+    print(f"  {summary['scores_per_second']:.0f} scores/s, {summary['requests_per_second']:.0f} batches/s")
+    print("  latency " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in summary['latency_ms'].items()))
+    if summary['errors']:
+        print(f"  {summary['errors']} submitters failed, first error: {summary['first_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboard service load generator")
+    parser.add_argument("--submitters", type=int, default=500, help="concurrent cabinets")
+    parser.add_argument("--batches", type=int, default=10, help="batches per cabinet")
+    parser.add_argument("--batch-size", type=int, default=20, help="scores per batch")
+    parser.add_argument("--address", help="HOST:PORT of a running service (default: start one)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.address:
+            host, port = args.address.rsplit(":", 1)
+            port = int(port)
+        else:
+            process, host, port = start_local_server(os.path.join(tmp, "loadgen.db"))
+
+        try:
+            summary = asyncio.run(run_load(host, port, args.submitters, args.batches,
+                                           args.batch_size, args.seed))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the leaderboard service.
+
+Speaks the protocol LeaderboardClient uses: newline-delimited JSON over a
+persistent TCP connection. Each request gets exactly one reply line.
+
+    {"type": "submit", "scores": [{"submission_id", "name", "score", "world", "created"}, ...]}
+        -> {"ok": true, "accepted": <new scores>}
+    {"type": "top", "limit": 10, "world": "ICE"}
+        -> {"ok": true, "scores": [...]}
+    {"type": "rank", "score": 1230, "world": null}
+        -> {"ok": true, "rank": 17, "count": 4032}
+
+Scores are stored with Leaderboard, on a single database thread so the event
+loop keeps serving connections while a batch is written. Batches that arrive
+while a write is in progress are committed together in the next transaction
+(group commit), so throughput does not stop at one commit per batch.
+Submission ids seen since startup are remembered, so a batch that is retried
+after a lost reply is not counted twice. So are the ids of batches still
+being committed: a retry that arrives meanwhile waits for the original commit
+and is then acknowledged without storing anything again.
+
+Usage: python leaderboard_server.py [--host 127.0.0.1] [--port 7878] [--db leaderboard_server.db]
+"""
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from constants import LEADERBOARD_PORT
+from leaderboard import Leaderboard
+
+DEFAULT_DB = "leaderboard_server.db"
+
+
+class LeaderboardServer:
+    def __init__(self, db_path=DEFAULT_DB):
+        # One thread owns the SQLite connection; requests are queued to it in order
+        self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="leaderboard-db")
+        self.leaderboard = self._db_thread.submit(Leaderboard, db_path).result()
+        self.seen = set()
+        self.in_flight = {}  # Submission id -> future of the group commit that stores it
+        self.connections = 0
+        self.submitted = 0
+        self.commits = 0
+        self.server = None
+
+        # Scores waiting for the next group commit, and the futures of their submitters
+        self._queued_scores = []
+        self._queued_waiters = []
+        self._committing = False
+
+    async def start(self, host="127.0.0.1", port=LEADERBOARD_PORT):
+        """Start listening; port 0 picks a free port. Returns the bound (host, port)."""
+        self.server = await asyncio.start_server(self._serve, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self._handle(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"ok": False, "error": f"bad request: {e}"}
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _handle(self, request):
+        loop = asyncio.get_running_loop()
+        kind = request["type"]
+        if kind == "submit":
+            scores = []
+            pending = set()  # Commits of earlier submissions of some of these scores
+            for entry in request["scores"]:
+                submission_id = entry["submission_id"]
+                if submission_id in self.seen:
+                    continue
+                if submission_id in self.in_flight:
+                    pending.add(self.in_flight[submission_id])
+                else:
+                    scores.append(entry)
+            ids = [entry["submission_id"] for entry in scores]
+            if scores:
+                waiter = self._commit(scores)
+                self.in_flight.update(dict.fromkeys(ids, waiter))
+                # Recorded when the commit ends, even if this handler is cancelled meanwhile
+                waiter.add_done_callback(lambda done: self._committed(ids, done))
+                try:
+                    await asyncio.shield(waiter)
+                except Exception as e:
+                    return {"ok": False, "error": f"commit failed: {e}"}
+            for waiter in pending:
+                try:
+                    await asyncio.shield(waiter)
+                except Exception as e:
+                    return {"ok": False, "error": f"commit failed: {e}"}
+            return {"ok": True, "accepted": len(scores)}
+        if kind == "top":
+            scores = await loop.run_in_executor(
+                self._db_thread, self.leaderboard.top, request.get("limit", 10), request.get("world"))
+            return {"ok": True, "scores": scores}
+        if kind == "rank":
+            def rank():
+                world = request.get("world")
+                return self.leaderboard.rank(request["score"], world), self.leaderboard.count(world)
+            position, count = await loop.run_in_executor(self._db_thread, rank)
+            return {"ok": True, "rank": position, "count": count}
+        return {"ok": False, "error": f"unknown request type {kind!r}"}
+
+    def _committed(self, ids, waiter):
+        """Done callback of a submission's commit: forget it as in flight, remember it if stored"""
+        for submission_id in ids:
+            self.in_flight.pop(submission_id, None)
+        # Only after the commit, so a failed batch is accepted when the client retries it
+        if not waiter.cancelled() and waiter.exception() is None:
+            self.seen.update(ids)
+            self.submitted += len(ids)
+
+    def _commit(self, scores):
+        """Queue scores for the next group commit; returns a future that is done when it is"""
+        waiter = asyncio.get_running_loop().create_future()
+        self._queued_scores.extend(scores)
+        self._queued_waiters.append(waiter)
+        if not self._committing:
+            self._committing = True
+            asyncio.create_task(self._commit_queued())
+        return waiter
+
+    async def _commit_queued(self):
+        """Write everything queued in one transaction, until nothing is left"""
+        loop = asyncio.get_running_loop()
+        try:
+            while self._queued_scores:
+                scores, waiters = self._queued_scores, self._queued_waiters
+                self._queued_scores, self._queued_waiters = [], []
+                try:
+                    await loop.run_in_executor(self._db_thread, self.leaderboard.add_scores, scores)
+                    self.commits += 1
+                except Exception as e:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                else:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+        finally:
+            self._committing = False
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self._db_thread.submit(self.leaderboard.close).result()
+        self._db_thread.shutdown()
+
+
+async def serve(host, port, db_path):
+    server = LeaderboardServer(db_path)
+    bound = await server.start(host, port)
+    print(f"Leaderboard server listening on {bound[0]}:{bound[1]} ({db_path})", flush=True)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in leaderboard service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=LEADERBOARD_PORT)
+    parser.add_argument("--db", default=DEFAULT_DB)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.db))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
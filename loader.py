@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Staged initialization for Portal Runner.
+
+Each stage has CPU-bound work that runs on a worker thread (decoding,
+chunk generation, audio loading) and optional follow-up steps that must run
+on the main thread because they touch the GL context (texture uploads).
+Stages run concurrently, so loading takes as long as the slowest stage
+rather than the sum of all of them. A stage that fails is reported by name;
+loading carries on without it unless the stage is required.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Stage status values
+PENDING = "pending"
+FINISHING = "finishing"
+DONE = "done"
+FAILED = "failed"
+
+
+class LoadingStage:
+    """One named unit of startup work"""
+
+    def __init__(self, name, work, finish=None, required=True):
+        self.name = name
+        self.work = work
+        self.finish = finish  # result -> list of main-thread steps
+        self.required = required  # The game cannot start without it
+        self.error = None
+        self.future = None
+        self.steps = []
+        self.total_steps = 0
+        self.status = PENDING
+        self.elapsed = 0.0
+
+    def progress(self):
+        """0.0 to 1.0; worker completion counts for half when there are main-thread steps"""
+        if self.status in (DONE, FAILED):
+            return 1.0
+        if self.status == PENDING:
+            return 0.0
+        return 0.5 + 0.5 * (self.total_steps - len(self.steps)) / max(1, self.total_steps)
+
+
+class StagedLoader:
+    """Runs loading stages on a thread pool and their GL steps on the caller's thread"""
+
+    def __init__(self, max_workers=None):
+        self.stages = []
+        self.start_time = None
+        self.finish_time = None
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="loader")
+
+    def add_stage(self, name, work, finish=None, required=True):
+        """Start `work` on a worker; `finish(result)` later returns main-thread steps"""
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+        stage = LoadingStage(name, work, finish, required)
+        stage.future = self._pool.submit(self._timed, stage)
+        self.stages.append(stage)
+        return stage
+
+    def _timed(self, stage):
+        start = time.perf_counter()
+        try:
+            return stage.work()
+        finally:
+            stage.elapsed = time.perf_counter() - start
+
+    def step(self, time_budget=0.010):
+        """Advance loading from the main thread; returns True once every stage is done.
+
+        Runs main-thread steps until time_budget seconds are used, but always at
+        least one, so the loading screen keeps redrawing between uploads.
+        Raises RuntimeError naming the stage if a required stage fails.
+        """
+        for stage in self.stages:
+            if stage.status == PENDING and stage.future.done():
+                try:
+                    result = stage.future.result()  # Re-raises worker errors here
+                    stage.steps = list(stage.finish(result)) if stage.finish else []
+                except Exception as e:
+                    self._fail(stage, e)
+                    continue
+                stage.total_steps = len(stage.steps)
+                stage.status = FINISHING
+
+        deadline = time.perf_counter() + time_budget
+        ran_step = False
+        for stage in self.stages:
+            if stage.status != FINISHING:
+                continue
+            try:
+                while stage.steps and (not ran_step or time.perf_counter() < deadline):
+                    stage.steps.pop(0)()
+                    ran_step = True
+            except Exception as e:
+                self._fail(stage, e)
+                continue
+            if not stage.steps:
+                stage.status = DONE
+
+        if self.is_done() and self.finish_time is None:
+            self.finish_time = time.perf_counter()
+            self._pool.shutdown(wait=False)
+        return self.is_done()
+
+    def _fail(self, stage, error):
+        stage.status = FAILED
+        stage.steps = []
+        stage.error = error
+        message = f"Loading stage '{stage.name}' failed: {error}"
+        if stage.required:
+            self._pool.shutdown(wait=False)
+            raise RuntimeError(message) from error
+        print(f"{message}; continuing without it")
+
+    def is_done(self):
+        return all(stage.status in (DONE, FAILED) for stage in self.stages)
+
+    def progress(self):
+        """Overall progress from 0.0 to 1.0"""
+        if not self.stages:
+            return 1.0
+        return sum(stage.progress() for stage in self.stages) / len(self.stages)
+
+    def total_time(self):
+        """Seconds from the first stage to the last step (so far, if still loading)"""
+        end = self.finish_time if self.finish_time is not None else time.perf_counter()
+        return end - self.start_time if self.start_time is not None else 0.0
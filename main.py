@@ -2,39 +2,98 @@
 """
 Portal Runner - Main Entry Point
 A 3D infinite runner game with portals between different worlds
-"""
-#!/usr/bin/env python3
-"""
-Main Game class for Portal Runner
+
+Only GLUT is imported before the window is created. PyOpenGL's GL bindings,
+NumPy and the game modules are imported on a background thread in the
+meantime; pygame is imported by the audio thread and Pillow only when the
+texture pack needs rebuilding. Once the window is up, the rest of the
+startup work runs behind a loading screen (see loader.py). After loading,
+the simulation runs on its own thread and the GLUT thread only draws (see
+simulation.py). Run with
+--profile-startup to print a per-module cold-start breakdown, and with
+--measure-latency (optionally --latency-readback) to report input-to-photon
+latency at every game over (see latency.py). Runtime metrics are served on
+localhost and logged to a file (see metrics.py).
 """
 
-import random
 import time
-import json
-import os
-from OpenGL.GL import *
-from OpenGL.GLU import *
-
-from constants import *
-from player import Player
-from world import WorldManager
-from textures import TextureManager
-from renderer import Renderer
-from audio import AudioManager
+
+STARTUP_BEGIN = time.perf_counter()
+
+import importlib
 import sys
+import threading
+
 from OpenGL.GLUT import *
 
-from constants import GameState
-from game import PortalRunner
+from constants import SIMULATION_THREAD, GameState
+from input_queue import KEY, MOUSE, SPECIAL
+
+# Imported on the preload thread in this order, dependencies first, so each
+# module's entry in the startup profile is mostly its own cost
+PRELOAD_MODULES = ("numpy", "OpenGL.GL", "OpenGL.GLU", "game")
 
 # Global game instance
 game = None
 
+# (label, seconds) pairs for --profile-startup
+startup_marks = [("import OpenGL.GLUT", time.perf_counter() - STARTUP_BEGIN)]
+module_times = []
+
+
+def preload_modules():
+    """Import the heavy modules while the main thread creates the window"""
+    for name in PRELOAD_MODULES:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        module_times.append((name, time.perf_counter() - start))
+
+
+def mark(label, since):
+    """Record the time since `since` for the startup profile; returns now"""
+    now = time.perf_counter()
+    startup_marks.append((label, now - since))
+    return now
+
+
+def print_startup_profile():
+    """Print the cold-start breakdown collected during main()"""
+    print("Startup profile (main thread):")
+    for label, seconds in startup_marks:
+        print(f"  {label:<28} {seconds * 1000:8.1f} ms")
+    print("Module imports (preload thread, in import order):")
+    for name, seconds in module_times:
+        print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+    print("For the full import tree run: python -X importtime main.py")
+
+
+def clear_window():
+    """Display callback used until the game is ready"""
+    from OpenGL.GL import glClear, GL_COLOR_BUFFER_BIT
+
+    glClear(GL_COLOR_BUFFER_BIT)
+    glutSwapBuffers()
+
+
+def show_first_frame():
+    """Clear the new window to the sky color and present it right away"""
+    from OpenGL.GL import glClearColor
+
+    glClearColor(0.5, 0.7, 1.0, 1.0)
+    glutDisplayFunc(clear_window)
+    clear_window()
+
+    # freeglut can map the window before glutMainLoop; other GLUTs show it there
+    if bool(glutMainLoopEvent):
+        glutMainLoopEvent()
+
 
 def display():
     """GLUT display callback"""
     game.render()
+    marker_pixel = game.read_latency_marker()
     glutSwapBuffers()
+    game.frame_presented(marker_pixel)
 
 
 def reshape(width, height):
@@ -44,67 +103,32 @@ def reshape(width, height):
 
 def keyboard(key, x, y):
     """GLUT keyboard callback"""
-    # Handle text input for player name
-    if game.game_state == GameState.MENU and game.input_active:
-        # Convert key to integer ordinal if it's bytes
-        key_code = ord(key) if isinstance(key, bytes) else ord(key)
-
-        # Check for Enter key
-        if key_code == 13 or key_code == 10:  # Enter key (CR or LF)
-            game.input_active = False
-        # Check for Backspace (multiple possible codes)
-        elif key_code == 8 or key_code == 127:  # Backspace or Delete
-            if len(game.player_name) > 0:
-                game.player_name = game.player_name[:-1]
-        # Regular character input
-        elif 32 <= key_code <= 126 and len(game.player_name) < 15:  # Printable ASCII
-            if isinstance(key, bytes):
-                game.player_name += key.decode('utf-8')
-            else:
-                game.player_name += key
-    else:
-        # Convert to lowercase for normal game controls
-        if isinstance(key, bytes):
-            key = key.decode('utf-8').lower()
-        else:
-            key = key.lower()
-        game.handle_key(key)
-
-    # Quit on ESC
-    if (isinstance(key, bytes) and key == b'\x1b') or key == chr(27):  # ESC
+    if isinstance(key, bytes):
+        key = key.decode('latin-1')
+
+    # Quit on ESC right away; everything else waits for the next tick
+    if key == chr(27):
         sys.exit(0)
+    game.input_queue.push(KEY, key, x, y)
+
 
 def mouse(button, state, x, y):
     """GLUT mouse callback"""
-    if game.game_state == GameState.MENU:
-        from OpenGL.GLUT import GLUT_LEFT_BUTTON, GLUT_DOWN
-        if button == GLUT_LEFT_BUTTON and state == GLUT_DOWN:
-            # Calculate y position in our coordinate system
-            y = game.height - y
-
-            # Check if click is in the input area
-            input_y = game.height // 2 + 30
-            if abs(y - input_y) < 15:
-                game.input_active = True
-            else:
-                game.input_active = False
+    game.input_queue.push(MOUSE, (button, state), x, y)
+
+
 def special_keys(key, x, y):
     """GLUT special keys callback (arrow keys)"""
-    from OpenGL.GLUT import GLUT_KEY_LEFT, GLUT_KEY_RIGHT, GLUT_KEY_UP, GLUT_KEY_DOWN
-
-    if key == GLUT_KEY_LEFT:
-        game.player.move_left()
-    elif key == GLUT_KEY_RIGHT:
-        game.player.move_right()
-    elif key == GLUT_KEY_UP:
-        game.player.jump()
-    elif key == GLUT_KEY_DOWN:
-        game.player.quick_land()
+    game.input_queue.push(SPECIAL, key, x, y)
 
 
 def idle():
     """GLUT idle callback for animation"""
-    game.update()
+    # Ticks run here while loading, or for good with SIMULATION_THREAD off
+    if game.simulation is None:
+        game.update()
+        if SIMULATION_THREAD and game.game_state != GameState.LOADING:
+            game.start_simulation()
     glutPostRedisplay()
 
 
@@ -112,6 +136,20 @@ def main():
     """Main function to initialize and start the game"""
     global game
 
+    profile_startup = "--profile-startup" in sys.argv
+    if profile_startup:
+        sys.argv.remove("--profile-startup")
+    latency_readback = "--latency-readback" in sys.argv
+    if latency_readback:
+        sys.argv.remove("--latency-readback")
+    measure_latency = latency_readback or "--measure-latency" in sys.argv
+    if "--measure-latency" in sys.argv:
+        sys.argv.remove("--measure-latency")
+
+    # Heavy imports run while GLUT sets up the window
+    preload = threading.Thread(target=preload_modules, name="preload", daemon=True)
+    preload.start()
+
     # Print start message
     print("Starting Portal Runner...")
     print("Controls:")
@@ -119,25 +157,46 @@ def main():
     print("  W or Up arrow - Jump")
     print("  S or Down arrow - Quick land")
     print("  Space - Start/Restart game")
+    print("  F3 - Frame profiler overlay, F4 - Export frame trace")
     print("  ESC - Quit")
     print()
 
     # Initialize GLUT
+    now = time.perf_counter()
     glutInit(sys.argv)
     glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
     glutInitWindowSize(800, 600)
     glutCreateWindow(b"Portal Runner - Infinite Edition")
+    now = mark("create window", now)
+
+    show_first_frame()
+    now = mark("first frame", now)
+    startup_marks.append(("window on screen (total)", now - STARTUP_BEGIN))
+
+    preload.join()
+    now = mark("wait for preload", now)
+    from game import PortalRunner
 
     # Create game instance
     game = PortalRunner()
+    if measure_latency:
+        from latency import LatencyTracker
+        game.latency_tracker = LatencyTracker(readback=latency_readback)
     game.init()
+    game.start_metrics_export()
+    now = mark("game init", now)
+    # Textures, world and audio keep loading behind the loading screen from here
+    startup_marks.append(("loading screen (total)", now - STARTUP_BEGIN))
+
+    if profile_startup:
+        print_startup_profile()
 
     # Set up GLUT callbacks
     glutDisplayFunc(display)
     glutReshapeFunc(reshape)
     glutKeyboardFunc(keyboard)
     glutSpecialFunc(special_keys)
-    glutMouseFunc(mouse)  # Add this line
+    glutMouseFunc(mouse)
     glutIdleFunc(idle)
 
     print("Game initialized successfully!")
@@ -154,4 +213,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Runtime metrics for Portal Runner.
+
+The game counts ticks and frames into plain integers and a preallocated
+NumPy ring of frame intervals, which costs next to nothing per frame. Every
+METRICS_INTERVAL seconds the main thread turns them into a snapshot: fps,
+frame-time percentiles, ticks per second and the game's gauges (live chunks,
+coins and portals, texture memory, GL state calls, speed multiplier, render
+snapshot age).
+
+Snapshots are published two ways, both optional:
+
+    http://127.0.0.1:METRICS_PORT/metrics   Prometheus text format
+    METRICS_LOG                              one JSON object per line
+
+The HTTP server runs on its own thread and only reads the latest snapshot,
+which the main thread replaces as a whole, so a scrape never waits for a
+frame and never sees half an update.
+"""
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from constants import METRICS_INTERVAL, METRICS_LOG_MAX_BYTES, METRICS_WINDOW
+
+PREFIX = "portal_runner_"
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Gauges reported by the game's gauge function: name -> help text
+GAUGE_HELP = {
+    "chunks": "Live world chunks",
+    "coins": "Uncollected coins in the live chunks",
+    "portals": "Portals in the live chunks",
+    "texture_bytes": "GPU memory used by textures, including mip levels",
+    "gl_calls_per_frame": "State calls issued through the GL state cache in the last frame",
+    "gl_calls_elided_per_frame": "Redundant GL state calls dropped by the cache in the last frame",
+    "speed_multiplier": "Current SpeedManager multiplier",
+    "gc_collections": "Garbage collections since start, all generations",
+    "gc_last_pause_seconds": "Duration of the last safe-point garbage collection",
+    "gc_frozen_objects": "Objects frozen out of garbage collection after loading",
+    "snapshot_age_seconds": "Time between publishing the last drawn render snapshot and drawing it",
+    "simulation_ticks_dropped": "Simulation ticks skipped to recover from stalls",
+    "quality_level": "Rendering quality level in use; 0 is the best",
+    "render_scale": "Resolution of the 3D pass as a fraction of the window's width and height",
+}
+
+
+class GameMetrics:
+    def __init__(self, gauges, window=METRICS_WINDOW, interval=METRICS_INTERVAL):
+        self.gauges = gauges  # Called on the main thread at every snapshot; returns {name: value}
+        self.interval = interval
+
+        # Seconds between presented frames; slot = frame number % window
+        self.frame_times = np.zeros(window)
+        self.frames = 0
+        self.frame_time_total = 0.0
+        self.ticks = 0
+        self._last_frame = None
+
+        self._published_at = time.perf_counter()
+        self._frames_at_publish = 0
+        self._ticks_at_publish = 0
+        self.snapshot = None  # Latest published values; replaced, never modified
+
+        self._server = None
+        self._log = None
+        self._log_path = None
+        self._log_max_bytes = METRICS_LOG_MAX_BYTES
+
+    def tick(self):
+        """Count one simulation tick"""
+        self.ticks += 1
+
+    def frame(self):
+        """Count a presented frame; publishes a snapshot once per interval"""
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            interval = now - self._last_frame
+            self.frame_times[self.frames % len(self.frame_times)] = interval
+            self.frame_time_total += interval
+            self.frames += 1
+        self._last_frame = now
+
+        if now - self._published_at >= self.interval:
+            self.publish(now)
+
+    def publish(self, now=None):
+        """Build a snapshot from the counters and the game's gauges, then export it"""
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._published_at
+        window = self.frame_times[:min(self.frames, len(self.frame_times))]
+        percentiles = np.percentile(window, [q * 100 for q in QUANTILES]) if len(window) else [0.0] * 3
+
+        snapshot = {
+            "timestamp": time.time(),
+            "fps": (self.frames - self._frames_at_publish) / elapsed,
+            "ticks_per_second": (self.ticks - self._ticks_at_publish) / elapsed,
+            "frame_time_ms": {f"p{round(q * 100)}": float(p) * 1000 for q, p in zip(QUANTILES, percentiles)},
+            "frames_total": self.frames,
+            "frame_time_seconds_total": self.frame_time_total,
+            "ticks_total": self.ticks,
+        }
+        snapshot.update(self.gauges())
+        self.snapshot = snapshot
+
+        self._published_at = now
+        self._frames_at_publish = self.frames
+        self._ticks_at_publish = self.ticks
+        if self._log is not None:
+            self._write_log(snapshot)
+        return snapshot
+
+    def prometheus_text(self):
+        """The latest snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return ""
+        lines = []
+
+        def metric(name, kind, help_text, value, labels=""):
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines.append(f"{PREFIX}{name}{labels} {value}")
+
+        metric("fps", "gauge", "Frames per second over the last interval", snapshot["fps"])
+        metric("ticks_per_second", "gauge", "Simulation ticks per second over the last interval",
+               snapshot["ticks_per_second"])
+        metric("ticks_total", "counter", "Simulation ticks since start", snapshot["ticks_total"])
+
+        name = f"{PREFIX}frame_time_seconds"
+        lines.append(f"# HELP {name} Time between presented frames, over the last {len(self.frame_times)} frames")
+        lines.append(f"# TYPE {name} summary")
+        for q in QUANTILES:
+            lines.append(f'{name}{{quantile="{q}"}} {snapshot["frame_time_ms"][f"p{round(q * 100)}"] / 1000}')
+        lines.append(f"{name}_sum {snapshot['frame_time_seconds_total']}")
+        lines.append(f"{name}_count {snapshot['frames_total']}")
+
+        for gauge, help_text in GAUGE_HELP.items():
+            if gauge in snapshot:
+                metric(gauge, "gauge", help_text, snapshot[gauge])
+        return "\n".join(lines) + "\n"
+
+    def start(self, port=None, log_path=None):
+        """Export snapshots over HTTP on localhost and/or to a JSON-lines file"""
+        if log_path is not None:
+            self._log_path = log_path
+            self._log = open(log_path, "a")
+        if port is not None:
+            try:
+                self._server = ThreadingHTTPServer(("127.0.0.1", port), _handler_for(self))
+            except OSError as e:
+                print(f"Metrics endpoint disabled, could not listen on port {port}: {e}")
+                return
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            print(f"Metrics at http://127.0.0.1:{self._server.server_address[1]}/metrics")
+
+    def _write_log(self, snapshot):
+        self._log.write(json.dumps(snapshot) + "\n")
+        self._log.flush()
+        if self._log.tell() > self._log_max_bytes:
+            # Keep one older file, so a cabinet running for weeks does not fill its disk
+            self._log.close()
+            os.replace(self._log_path, self._log_path + ".1")
+            self._log = open(self._log_path, "a")
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def _handler_for(metrics):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # No console line per scrape
+
+    return MetricsHandler
@@ -7,6 +7,10 @@ from constants import *
 
 
 class Player:
+    # Fixed attribute slots: no per-instance dict, and faster attribute access in the update
+    __slots__ = ("current_lane", "target_x", "x", "y", "z", "jump_height", "is_jumping",
+                 "is_moving_lanes", "is_fast_falling")
+
     def __init__(self):
         self.reset()
 
@@ -106,10 +110,10 @@ class Player:
     def get_bounding_box(self):
         """Get player's bounding box for collision detection"""
         return {
-            'min_x': self.x - 0.4,
-            'max_x': self.x + 0.4,
-            'min_z': self.z - 0.4,
-            'max_z': self.z + 0.4,
+            'min_x': self.x - PLAYER_HALF_SIZE,
+            'max_x': self.x + PLAYER_HALF_SIZE,
+            'min_z': self.z - PLAYER_HALF_SIZE,
+            'max_z': self.z + PLAYER_HALF_SIZE,
             'y': self.y + self.jump_height
         }
 
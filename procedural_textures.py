@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Procedural placeholder textures for Portal Runner.
+
+Every texture is computed as a NumPy array in one pass and returned as the
+same image dict decode_image produces, so TextureManager can use it directly
+without writing or decoding any file.
+"""
+
+import numpy as np
+
+# Base colors of the themed platform textures; a new world only needs an entry here
+THEME_COLORS = {
+    "desert_platform": (239, 221, 111),  # Sandy yellow
+    "ice_platform": (173, 216, 230),  # Light blue
+    "forest_platform": (34, 139, 34),  # Forest green
+}
+
+
+def _image(pixels):
+    """Wrap an (height, width, channels) uint8 array as an image dict"""
+    height, width, channels = pixels.shape
+    return {
+        'width': width,
+        'height': height,
+        'mode': "RGBA" if channels == 4 else "RGB",
+        'data': np.ascontiguousarray(pixels, dtype=np.uint8).tobytes(),
+    }
+
+
+def _distance_from_center(size):
+    """Distance of every pixel center from the image center"""
+    y, x = np.mgrid[0:size[1], 0:size[0]]
+    return np.hypot(x - size[0] // 2, y - size[1] // 2)
+
+
+def color_pattern(color, size=(256, 256)):
+    """Solid color with a checker of darker 17x17 squares every 32 pixels"""
+    pixels = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    pixels[:] = color
+
+    y, x = np.ogrid[0:size[1], 0:size[0]]
+    squares = (x % 32 <= 16) & (y % 32 <= 16) & ((x // 32 + y // 32) % 2 == 0)
+    pixels[squares] = tuple(max(0, c - 30) for c in color)
+
+    return _image(pixels)
+
+
+def coin_pattern(size=(128, 128)):
+    """Golden disc with a lighter inner disc and an orange rim on the inner edge"""
+    pixels = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+    distance = _distance_from_center(size)
+    radius = min(size) // 2 - 10
+
+    pixels[distance <= radius] = (255, 215, 0, 255)
+    pixels[distance <= radius * 0.7] = (255, 235, 59, 255)
+    pixels[np.abs(distance - radius * 0.7) < 1.5] = (255, 140, 0, 255)
+
+    return _image(pixels)
+
+
+def portal_pattern(size=(256, 256)):
+    """Concentric violet rings, fading towards the center"""
+    colors = np.array([
+        (0, 0, 0, 0),  # Outside the portal
+        (75, 0, 130, 220),  # Indigo
+        (138, 43, 226, 200),  # BlueViolet
+        (148, 0, 211, 180),  # DarkViolet
+        (186, 85, 211, 160),  # MediumOrchid
+        (218, 112, 214, 140)  # Orchid
+    ], dtype=np.uint8)
+
+    distance = _distance_from_center(size)
+    max_radius = min(size) // 2 - 10
+    radii = max_radius * (1 - np.arange(5) * 0.2)
+
+    # Number of rings containing the pixel picks the innermost ring's color
+    ring = (distance[..., None] <= radii).sum(axis=-1)
+    return _image(colors[ring])
+
+
+def player_pattern(size=(128, 128)):
+    """Blue body with a face, two eyes and a mouth"""
+    width, height = size
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    pixels[:] = (30, 144, 255, 255)
+
+    pixels[height // 4:3 * height // 4 + 1, width // 4:3 * width // 4 + 1] = (255, 222, 173, 255)
+
+    y, x = np.ogrid[0:height, 0:width]
+    eye_radius = width // 20
+    for eye_x in (width // 3, 2 * width // 3):
+        eye = (x - eye_x) ** 2 + (y - height // 3) ** 2 <= eye_radius ** 2
+        pixels[eye] = (0, 0, 0, 255)
+
+    # Lower half of an ellipse outline
+    center_x, center_y = width // 2, 7 * height // 12
+    radius_x, radius_y = width / 6, height / 12
+    ellipse = ((x - center_x) / radius_x) ** 2 + ((y - center_y) / radius_y) ** 2
+    mouth = (np.abs(ellipse - 1.0) < 0.25) & (y >= center_y)
+    pixels[mouth] = (0, 0, 0, 255)
+
+    return _image(pixels)
+
+
+PROCEDURAL_TEXTURES = {
+    "coin": coin_pattern,
+    "portal": portal_pattern,
+    "player": player_pattern,
+}
+
+
+def has_procedural_texture(name):
+    """True if generate_texture can produce the named texture"""
+    return name in THEME_COLORS or name in PROCEDURAL_TEXTURES
+
+
+def generate_texture(name):
+    """Generate the named texture in memory"""
+    if name in THEME_COLORS:
+        return color_pattern(THEME_COLORS[name])
+    return PROCEDURAL_TEXTURES[name]()
+
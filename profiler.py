@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Per-phase frame profiler for Portal Runner.
+
+PortalRunner brackets each phase of update_playing and render_playing with
+begin()/end(). The simulation and the renderer run on their own threads (see
+simulation.py), so each has its own profiler: one "frame" of the simulation
+profiler is a tick. The timings go into preallocated NumPy ring buffers
+holding the last PROFILER_FRAMES frames, so profiling allocates nothing per
+frame. A tick or frame longer than HITCH_MS is a hitch, and the phase that
+took longest in it is recorded as the cause.
+
+Render phases measure the CPU time spent issuing GL commands. The GPU may
+still be working on them when the phase ends.
+
+F3 toggles the overlay; F4 writes the buffered frames of both profilers as
+a Chrome trace, one track per thread (open it in chrome://tracing or
+https://ui.perfetto.dev).
+"""
+
+import json
+import time
+
+import numpy as np
+
+from constants import HITCH_MS, PROFILER_FRAMES, PROFILER_LOG_HITCHES
+
+PHASES = ("player", "world", "collision", "coins", "portals", "draw_world", "draw_player", "ui", "snapshot")
+PLAYER, WORLD, COLLISION, COINS, PORTALS, DRAW_WORLD, DRAW_PLAYER, UI, SNAPSHOT = range(len(PHASES))
+SIMULATION_PHASES = (PLAYER, WORLD, COLLISION, COINS, PORTALS, SNAPSHOT)
+RENDER_PHASES = (DRAW_WORLD, DRAW_PLAYER, UI)
+
+# Shared by all profilers, so their traces line up
+EPOCH = time.perf_counter()
+
+
+class FrameProfiler:
+    def __init__(self, name="frame", phases=RENDER_PHASES, tid=1, capacity=PROFILER_FRAMES,
+                 hitch_ms=HITCH_MS, log_hitches=PROFILER_LOG_HITCHES):
+        self.name = name
+        self.phases = phases  # Shown in the overlay; all of PHASES can be timed
+        self.tid = tid  # Track in the Chrome trace
+        self.capacity = capacity
+        self.hitch_seconds = hitch_ms / 1000
+        self.log_hitches = log_hitches
+        self.overlay_visible = False
+
+        # Seconds since EPOCH; row = frame number % capacity
+        self.epoch = EPOCH
+        self.frame_starts = np.zeros(capacity)
+        self.frame_durations = np.zeros(capacity)
+        self.phase_starts = np.zeros((capacity, len(PHASES)))
+        self.phase_durations = np.zeros((capacity, len(PHASES)))
+
+        self.frames = 0  # Frames begun so far
+        self._row = -1
+        self._phase_begin = [0.0] * len(PHASES)
+
+        self.hitches = 0
+        self.last_hitch = None  # (frame number, milliseconds, slowest phase)
+
+    def begin_frame(self):
+        """Start a new frame, overwriting the oldest one in the ring"""
+        self._row = self.frames % self.capacity
+        self.frames += 1
+        self.frame_starts[self._row] = time.perf_counter() - self.epoch
+        self.frame_durations[self._row] = 0.0
+        self.phase_durations[self._row] = 0.0
+
+    def begin(self, phase):
+        self._phase_begin[phase] = time.perf_counter()
+
+    def end(self, phase):
+        """Finish a phase; a phase that runs twice in a frame adds up"""
+        now = time.perf_counter()
+        row = self._row
+        if self.phase_durations[row, phase] == 0.0:
+            self.phase_starts[row, phase] = self._phase_begin[phase] - self.epoch
+        self.phase_durations[row, phase] += now - self._phase_begin[phase]
+
+    def end_frame(self):
+        """Close the frame and check it for a hitch"""
+        row = self._row
+        if row < 0:
+            return
+        duration = time.perf_counter() - self.epoch - self.frame_starts[row]
+        self.frame_durations[row] = duration
+
+        if duration > self.hitch_seconds:
+            self.hitches += 1
+            slowest = PHASES[int(np.argmax(self.phase_durations[row]))]
+            self.last_hitch = (self.frames, duration * 1000, slowest)
+            if self.log_hitches:
+                print(f"Hitch in {self.name} {self.frames}: {duration * 1000:.1f} ms, slowest phase {slowest} "
+                      f"({self.phase_durations[row].max() * 1000:.1f} ms)")
+
+    def _filled_rows(self):
+        """Ring rows of completed frames, oldest first"""
+        count = min(self.frames, self.capacity)
+        first = self.frames - count
+        rows = np.arange(first, self.frames) % self.capacity
+        # The current frame is still running until end_frame
+        return rows[self.frame_durations[rows] > 0]
+
+    def summary(self):
+        """(phase, last ms, mean ms, max ms) per phase plus a row named after the profiler, over the buffered frames"""
+        rows = self._filled_rows()
+        if len(rows) == 0:
+            return []
+        last = rows[-1]
+        durations = self.phase_durations[rows] * 1000
+        result = [(PHASES[i], durations[-1, i], durations[:, i].mean(), durations[:, i].max())
+                  for i in self.phases]
+        frames = self.frame_durations[rows] * 1000
+        result.append((self.name, self.frame_durations[last] * 1000, frames.mean(), frames.max()))
+        return result
+
+    def overlay_lines(self):
+        """Text lines for the on-screen overlay"""
+        lines = [f"{'phase':<12}{'last':>7}{'avg':>7}{'max':>7} ms"]
+        for name, last, mean, peak in self.summary():
+            lines.append(f"{name:<12}{last:7.2f}{mean:7.2f}{peak:7.2f}")
+        if self.last_hitch is not None:
+            frame, milliseconds, phase = self.last_hitch
+            lines.append(f"{self.hitches} hitches, last: {self.name} {frame} {milliseconds:.1f} ms ({phase})")
+        return lines
+
+    def chrome_trace(self):
+        """The buffered frames as Chrome trace-event JSON (a dict)"""
+        events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": self.tid, "args": {"name": self.name}}]
+        for row in self._filled_rows():
+            events.append({"name": self.name, "cat": "frame", "ph": "X", "pid": 1, "tid": self.tid,
+                           "ts": self.frame_starts[row] * 1e6, "dur": self.frame_durations[row] * 1e6})
+            for phase, name in enumerate(PHASES):
+                if self.phase_durations[row, phase] > 0:
+                    events.append({"name": name, "cat": "phase", "ph": "X", "pid": 1, "tid": self.tid,
+                                   "ts": self.phase_starts[row, phase] * 1e6,
+                                   "dur": self.phase_durations[row, phase] * 1e6})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(path, profilers):
+    """Write the buffered frames of several profilers into one trace"""
+    events = []
+    for profiler in profilers:
+        events.extend(profiler.chrome_trace()["traceEvents"])
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    print(f"Wrote {', '.join(f'{min(p.frames, p.capacity)} {p.name}s' for p in profilers)} to {path}")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Adaptive rendering quality for Portal Runner.
+
+QualityGovernor watches the last QUALITY_WINDOW frames on the render thread
+and moves through QUALITY_LEVELS, best first, to hold QUALITY_TARGET_FPS:
+
+- One step down when the mean time between frames is more than
+  QUALITY_DOWN_MARGIN over the target: frames are being missed.
+- One step up when frames are on target and drawing them took less than
+  QUALITY_UP_HEADROOM of the frame budget, for QUALITY_UP_FRAMES in a row.
+
+Stepping up is much slower than stepping down, and the window starts over
+after every change, so quality does not flicker around a threshold. An
+upgrade that is undone within QUALITY_UP_FRAMES doubles the wait before the
+next one, up to QUALITY_UP_FRAMES_MAX. A cabinet that cannot sustain a level
+soon stops trying it.
+
+Each level sets the draw distance (with the far plane and fog just behind
+it), the platform faces drawn, how many coins are shown beyond a distance,
+the ring and segment counts of the portal transition, and the resolution
+of the 3D pass.
+"""
+
+import numpy as np
+
+from constants import (QUALITY_ADAPTIVE, QUALITY_DOWN_MARGIN, QUALITY_LEVELS, QUALITY_TARGET_FPS,
+                       QUALITY_UP_FRAMES, QUALITY_UP_FRAMES_MAX, QUALITY_UP_HEADROOM, QUALITY_WINDOW)
+
+# Platform faces per level: the top and front faces are always drawn
+SIDES_ALL = 2  # Also the left, right and back faces
+SIDES_NO_BACK = 1  # Left and right, not the back face at the far end
+SIDES_NONE = 0
+
+
+class QualityLevel:
+    __slots__ = ("view", "sides", "coin_distance", "coin_stride", "rings", "segments", "scale")
+
+    def __init__(self, view, sides, coin_distance, coin_stride, rings, segments, scale):
+        self.view = view  # Draw distance ahead of the player; the far plane and fog end here
+        self.sides = sides  # SIDES_*
+        self.coin_distance = coin_distance  # Beyond this, only every coin_stride-th coin is drawn
+        self.coin_stride = coin_stride
+        self.rings = rings  # Portal transition
+        self.segments = segments
+        self.scale = scale  # Of the 3D pass's resolution; see framebuffer.py
+
+
+LEVELS = tuple(QualityLevel(**level) for level in QUALITY_LEVELS)
+
+
+class QualityGovernor:
+    def __init__(self, target_fps=QUALITY_TARGET_FPS, window=QUALITY_WINDOW, adaptive=QUALITY_ADAPTIVE):
+        self.adaptive = adaptive  # False holds the current level
+        self.target = 1.0 / target_fps
+        self.index = 0  # Into LEVELS; 0 is the best quality
+        self.level = LEVELS[0]
+        self.changes = 0
+
+        # Seconds between frames and seconds spent drawing them; slot = frame % window
+        self.intervals = np.zeros(window)
+        self.work = np.zeros(window)
+        self.frames = 0  # Frames in the window since the last change
+        self._last_frame = None
+
+        self.up_frames = QUALITY_UP_FRAMES  # Frames on target with headroom before stepping up
+        self._good_frames = 0
+        self._frames_since_upgrade = None
+
+    def frame(self, now, work):
+        """Account for a frame that started at now and took work seconds to draw.
+
+        Returns True if the level changed.
+        """
+        last, self._last_frame = self._last_frame, now
+        if last is None or not self.adaptive:
+            return False
+        slot = self.frames % len(self.intervals)
+        # A single stall (a texture upload, a collection) counts as one missed frame, not many
+        self.intervals[slot] = min(now - last, 2 * self.target)
+        self.work[slot] = work
+        self.frames += 1
+        if self._frames_since_upgrade is not None:
+            self._frames_since_upgrade += 1
+        if self.frames < len(self.intervals):
+            return False
+
+        interval = self.intervals.mean()
+        if interval > self.target * (1 + QUALITY_DOWN_MARGIN):
+            if self.index + 1 < len(LEVELS):
+                if self._frames_since_upgrade is not None and self._frames_since_upgrade < self.up_frames:
+                    # The last upgrade did not hold; wait longer before the next one
+                    self.up_frames = min(self.up_frames * 2, QUALITY_UP_FRAMES_MAX)
+                self._frames_since_upgrade = None
+                self.set_level(self.index + 1)
+                return True
+            self._good_frames = 0
+            return False
+
+        if self.work.mean() < self.target * QUALITY_UP_HEADROOM:
+            self._good_frames += 1
+        else:
+            self._good_frames = 0
+        if self._good_frames >= self.up_frames and self.index > 0:
+            self._frames_since_upgrade = 0
+            self.set_level(self.index - 1)
+            return True
+        return False
+
+    def set_level(self, index):
+        """Switch to LEVELS[index] and start measuring afresh"""
+        self.index = index
+        self.level = LEVELS[index]
+        self.changes += 1
+        self.frames = 0
+        self._good_frames = 0
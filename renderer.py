@@ -5,15 +5,70 @@ Rendering functions for Portal Runner
 
 import math
 import time
+
+import numpy as np
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from OpenGL.GLUT import *
 from constants import *
+from framebuffer import SceneFramebuffer, render_scale
+from gl_state import GLStateCache
+from quality import LEVELS, SIDES_ALL, SIDES_NO_BACK
+from texture_atlas import FULL_REGION
+
+# Level of detail of a chunk; see LOD_MID_DISTANCE in constants.py
+LOD_NEAR = 0  # Every face the quality level allows
+LOD_MID = 1  # Top and front faces in one batch
+LOD_FAR = 2  # Top faces in one batch, coins as points
+
+COIN_SIZE = 0.6  # Edge of the coin quad
+
+
+SHADE_DISTANCES = 200  # Units ahead of the player covered by the shade tables; past any draw distance
+
+
+def baked_shade(nx, ny, nz, distance=0.0):
+    """Brightness GL lighting gives a white face with unit normal n, this far ahead of the player.
+
+    The light follows the player, so the direction to it depends on nothing else; the
+    player's lane and jump height are left out.
+    """
+    lx, ly, lz = LIGHT_OFFSET
+    lz += distance
+    diffuse = max(0.0, (nx * lx + ny * ly + nz * lz) / math.sqrt(lx * lx + ly * ly + lz * lz))
+    return min(1.0, LIGHT_MODEL_AMBIENT + LIGHT_AMBIENT + LIGHT_DIFFUSE * diffuse)
+
+
+def spun_shades(rotation, distance):
+    """Baked shades of the front and back of a quad turned rotation degrees about the y axis"""
+    angle = math.radians(rotation)
+    nx, nz = math.sin(angle), math.cos(angle)  # The front normal (0, 0, 1) turned
+    return baked_shade(nx, 0, nz, distance), baked_shade(-nx, 0, -nz, distance)
+
+
+def shade_table(nx, ny, nz):
+    """baked_shade of a face orientation at each whole distance ahead of the player"""
+    return tuple(baked_shade(nx, ny, nz, distance) for distance in range(SHADE_DISTANCES))
+
+
+# Platforms are axis-aligned and never move, so their shades are baked once per face orientation
+TOP_SHADES = shade_table(0, 1, 0)
+FRONT_SHADES = shade_table(0, 0, 1)
+BACK_SHADES = shade_table(0, 0, -1)
+RIGHT_SHADES = shade_table(1, 0, 0)
+LEFT_SHADES = shade_table(-1, 0, 0)
 
 
 class Renderer:
-    def __init__(self, texture_manager):
+    def __init__(self, texture_manager, state=None):
         self.texture_manager = texture_manager
+        self.state = state if state is not None else GLStateCache()
+        self.quality = LEVELS[0]  # QualityLevel; see quality.py
+        self.scene = SceneFramebuffer()  # The 3D pass, at a fraction of the window's resolution
+        self.lod = LOD_ENABLED
+        self.baked_lighting = BAKED_LIGHTING  # Shade the world from the *_SHADES tables with GL_LIGHTING off
+        self.player_z = 0.0  # Of the frame being drawn; the shades depend on the distance ahead of it
+        self.pixels_per_unit = 1.0  # On screen, of something one unit from the camera
 
         # Fix for bitmap font constants - use the module reference
         try:
@@ -26,22 +81,27 @@ class Renderer:
 
     def init_gl(self):
         """Initialize OpenGL settings"""
-        glClearColor(0.5, 0.7, 1.0, 1.0)  # Sky blue background
-        glEnable(GL_DEPTH_TEST)
-        glEnable(GL_TEXTURE_2D)
-        glEnable(GL_BLEND)
+        glClearColor(*SKY_COLOR)  # Sky blue background
+        state = self.state
+        state.invalidate()
+        state.enable(GL_DEPTH_TEST)
+        state.enable(GL_TEXTURE_2D)
+        state.enable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
+        # Normals of the player cube need normalizing; platforms and sprites already use unit normals
+        state.enable(GL_NORMALIZE)
+
         # Initialize lighting with more robust setup
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-        glEnable(GL_COLOR_MATERIAL)
+        state.enable(GL_LIGHTING)
+        state.enable(GL_LIGHT0)
+        state.enable(GL_COLOR_MATERIAL)
         glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
 
         # Light position and properties (more stable lighting)
-        light_position = [5.0, 10.0, 5.0, 1.0]
-        light_ambient = [0.4, 0.4, 0.4, 1.0]  # Increased ambient
-        light_diffuse = [0.8, 0.8, 0.8, 1.0]  # Reduced diffuse for more stable lighting
+        light_position = [*LIGHT_OFFSET, 1.0]
+        light_ambient = [LIGHT_AMBIENT, LIGHT_AMBIENT, LIGHT_AMBIENT, 1.0]  # Increased ambient
+        light_diffuse = [LIGHT_DIFFUSE, LIGHT_DIFFUSE, LIGHT_DIFFUSE, 1.0]  # Reduced diffuse for more stable lighting
         light_specular = [1.0, 1.0, 1.0, 1.0]
 
         glLightfv(GL_LIGHT0, GL_POSITION, light_position)
@@ -51,56 +111,84 @@ class Renderer:
 
         # Set model lighting parameters for more stable appearance
         glLightModeli(GL_LIGHT_MODEL_LOCAL_VIEWER, GL_FALSE)
-        glLightModelfv(GL_LIGHT_MODEL_AMBIENT, [0.3, 0.3, 0.3, 1.0])
+        glLightModelfv(GL_LIGHT_MODEL_AMBIENT, [LIGHT_MODEL_AMBIENT, LIGHT_MODEL_AMBIENT, LIGHT_MODEL_AMBIENT, 1.0])
+
+        # Linear fog in the sky color hides the far plane, wherever the quality level puts it
+        state.enable(GL_FOG)
+        glFogi(GL_FOG_MODE, GL_LINEAR)
+        glFogfv(GL_FOG_COLOR, SKY_COLOR)
+        self.set_quality(self.quality)
 
         # Ensure proper default color
-        glColor3f(1.0, 1.0, 1.0)
+        state.color3f(1.0, 1.0, 1.0)
+
+    def set_quality(self, level):
+        """Draw with a QualityLevel from now on; moves the fog with the draw distance"""
+        self.quality = level
+        glFogf(GL_FOG_START, level.view * FOG_START_FRACTION)
+        glFogf(GL_FOG_END, level.view)
+        scene = self.scene
+        if scene.window_width:
+            scene.resize(scene.window_width, scene.window_height,
+                         render_scale(scene.window_width, scene.window_height, level.scale))
+
+    def resize(self, width, height):
+        """Match a new window size"""
+        glViewport(0, 0, width, height)
+        self.scene.resize(width, height, render_scale(width, height, self.quality.scale))
+
+    def begin_scene(self):
+        """Start the 3D pass; it goes offscreen when rendering below window resolution"""
+        self.scene.begin()
+
+    def end_scene(self):
+        """Finish the 3D pass; what follows is drawn into the window at full resolution"""
+        self.scene.present()
 
     def setup_3d_projection(self, width, height):
         """Set up 3D perspective projection"""
-        glMatrixMode(GL_PROJECTION)
+        self.state.matrix_mode(GL_PROJECTION)
         glLoadIdentity()
-        gluPerspective(45, width / height, 0.1, 100.0)
-        glMatrixMode(GL_MODELVIEW)
+        gluPerspective(45, width / height, 0.1, self.quality.view)  # Fully fogged at the far plane
+        self.pixels_per_unit = height * self.scene.scale / (2 * math.tan(math.radians(45 / 2)))
+        self.state.matrix_mode(GL_MODELVIEW)
 
     def setup_2d_projection(self, width, height):
         """Set up 2D orthographic projection for UI"""
-        # Save current OpenGL state including lighting
-        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT | GL_LIGHTING_BIT)
-
-        glDisable(GL_LIGHTING)
-        glDisable(GL_TEXTURE_2D)
-        glDisable(GL_DEPTH_TEST)  # Disable depth testing for UI
+        # The state cache knows what is enabled, so no glPushAttrib is needed
+        state = self.state
+        state.disable(GL_LIGHTING)
+        state.disable(GL_TEXTURE_2D)
+        state.disable(GL_DEPTH_TEST)  # Disable depth testing for UI
 
-        glMatrixMode(GL_PROJECTION)
+        state.matrix_mode(GL_PROJECTION)
         glPushMatrix()
         glLoadIdentity()
         gluOrtho2D(0, width, 0, height)
 
-        glMatrixMode(GL_MODELVIEW)
+        state.matrix_mode(GL_MODELVIEW)
         glPushMatrix()
         glLoadIdentity()
 
     def restore_3d_projection(self):
         """Restore 3D projection after 2D rendering"""
-        glMatrixMode(GL_PROJECTION)
+        state = self.state
+        state.matrix_mode(GL_PROJECTION)
         glPopMatrix()
-        glMatrixMode(GL_MODELVIEW)
+        state.matrix_mode(GL_MODELVIEW)
         glPopMatrix()
 
-        # Restore all OpenGL state including lighting
-        glPopAttrib()
+        # Back to the 3D state; calls that change nothing are dropped by the cache
+        state.enable(GL_LIGHTING)
+        state.enable(GL_LIGHT0)
+        state.enable(GL_TEXTURE_2D)
+        state.enable(GL_DEPTH_TEST)
+        state.enable(GL_COLOR_MATERIAL)
+        state.color3f(1.0, 1.0, 1.0)
 
-        # Ensure proper lighting state is restored
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-        glEnable(GL_TEXTURE_2D)
-        glEnable(GL_DEPTH_TEST)
-
-        # Reset color to white and ensure proper color material
-        glColor3f(1.0, 1.0, 1.0)
-        glEnable(GL_COLOR_MATERIAL)
-        glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
+    def set_color(self, r, g, b, a=1.0):
+        """Set the current color through the state cache"""
+        self.state.color4f(r, g, b, a)
 
     def draw_text(self, x, y, text, font=None):
         """Draw text at given position"""
@@ -135,29 +223,39 @@ class Renderer:
         length = platform['length']
         tex_scale_x = width / 2.0
         tex_scale_z = length / 2.0
+        near = far = 0
+        if self.baked_lighting:
+            near = self.shade_index(platform['z'])
+            far = self.shade_index(platform['z'] - length)
 
         glBegin(GL_QUADS)
-        # Top face
-        glNormal3f(0, 1, 0)
+        # Top face; shaded per edge, as GL lighting shades per vertex
+        self.face(TOP_SHADES[near], 0, 1, 0)
         glTexCoord2f(0, 0)
         glVertex3f(-width / 2, 0, 0)
         glTexCoord2f(tex_scale_x, 0)
         glVertex3f(width / 2, 0, 0)
+        self.face(TOP_SHADES[far], 0, 1, 0)
         glTexCoord2f(tex_scale_x, tex_scale_z)
         glVertex3f(width / 2, 0, -length)
         glTexCoord2f(0, tex_scale_z)
         glVertex3f(-width / 2, 0, -length)
 
         # Draw sides
-        self._draw_platform_sides(width, length, tex_scale_x, tex_scale_z)
+        self._draw_platform_sides(width, length, tex_scale_x, tex_scale_z, self.quality.sides, near, far)
         glEnd()
 
         glPopMatrix()
 
-    def _draw_platform_sides(self, width, length, tex_scale_x, tex_scale_z):
-        """Draw the sides of a platform"""
+    def _draw_platform_sides(self, width, length, tex_scale_x, tex_scale_z, sides=SIDES_ALL, near=0, far=0):
+        """Draw the sides of a platform.
+
+        The chase camera stays between the platform edges and behind the
+        platform, so the left, right and back faces are only ever seen edge-on
+        or from behind; lower quality levels leave them out.
+        """
         # Front face
-        glNormal3f(0, 0, 1)
+        self.face(FRONT_SHADES[near], 0, 0, 1)
         glTexCoord2f(0, 0)
         glVertex3f(-width / 2, -0.5, 0)
         glTexCoord2f(tex_scale_x, 0)
@@ -167,8 +265,11 @@ class Renderer:
         glTexCoord2f(0, 0.5)
         glVertex3f(-width / 2, 0, 0)
 
+        if sides < SIDES_NO_BACK:
+            return
+
         # Right side
-        glNormal3f(1, 0, 0)
+        self.face(RIGHT_SHADES[near], 1, 0, 0)
         glTexCoord2f(0, 0)
         glVertex3f(width / 2, -0.5, 0)
         glTexCoord2f(tex_scale_z, 0)
@@ -179,7 +280,7 @@ class Renderer:
         glVertex3f(width / 2, 0, 0)
 
         # Left side
-        glNormal3f(-1, 0, 0)
+        self.face(LEFT_SHADES[near], -1, 0, 0)
         glTexCoord2f(0, 0)
         glVertex3f(-width / 2, -0.5, -length)
         glTexCoord2f(tex_scale_z, 0)
@@ -189,8 +290,11 @@ class Renderer:
         glTexCoord2f(0, 0.5)
         glVertex3f(-width / 2, 0, -length)
 
+        if sides < SIDES_ALL:
+            return
+
         # Back face
-        glNormal3f(0, 0, -1)
+        self.face(BACK_SHADES[far], 0, 0, -1)
         glTexCoord2f(0, 0)
         glVertex3f(width / 2, -0.5, -length)
         glTexCoord2f(tex_scale_x, 0)
@@ -207,28 +311,33 @@ class Renderer:
         glRotatef(coin['rotation'], 0, 1, 0)
 
         self.texture_manager.bind_texture("coin")
+        u0, v0, u1, v1 = self.texture_manager.get_region("coin")
 
         glBegin(GL_QUADS)
+        front = back = 1.0
+        if self.baked_lighting:
+            front, back = spun_shades(coin['rotation'], self.player_z - coin['z'])
+
         # Front face
-        glNormal3f(0, 0, 1)
-        glTexCoord2f(0, 0)
+        self.face(front, 0, 0, 1)
+        glTexCoord2f(u0, v0)
         glVertex3f(-0.3, -0.3, 0)
-        glTexCoord2f(1, 0)
+        glTexCoord2f(u1, v0)
         glVertex3f(0.3, -0.3, 0)
-        glTexCoord2f(1, 1)
+        glTexCoord2f(u1, v1)
         glVertex3f(0.3, 0.3, 0)
-        glTexCoord2f(0, 1)
+        glTexCoord2f(u0, v1)
         glVertex3f(-0.3, 0.3, 0)
 
         # Back face
-        glNormal3f(0, 0, -1)
-        glTexCoord2f(0, 0)
+        self.face(back, 0, 0, -1)
+        glTexCoord2f(u0, v0)
         glVertex3f(0.3, -0.3, 0)
-        glTexCoord2f(1, 0)
+        glTexCoord2f(u1, v0)
         glVertex3f(-0.3, -0.3, 0)
-        glTexCoord2f(1, 1)
+        glTexCoord2f(u1, v1)
         glVertex3f(-0.3, 0.3, 0)
-        glTexCoord2f(0, 1)
+        glTexCoord2f(u0, v1)
         glVertex3f(0.3, 0.3, 0)
         glEnd()
 
@@ -241,40 +350,43 @@ class Renderer:
         glRotatef(portal['rotation'], 0, 1, 0)
 
         self.texture_manager.bind_texture("portal")
+        u0, v0, u1, v1 = self.texture_manager.get_region("portal")
 
         size = 2.0 * portal['scale']
+        shade = 1.0
+        if self.baked_lighting:
+            shade = spun_shades(portal['rotation'], self.player_z - portal['z'])[0]
         glBegin(GL_QUADS)
-        glNormal3f(0, 0, 1)
-        glTexCoord2f(0, 0)
+        self.face(shade, 0, 0, 1)
+        glTexCoord2f(u0, v0)
         glVertex3f(-size, -size, 0)
-        glTexCoord2f(1, 0)
+        glTexCoord2f(u1, v0)
         glVertex3f(size, -size, 0)
-        glTexCoord2f(1, 1)
+        glTexCoord2f(u1, v1)
         glVertex3f(size, size, 0)
-        glTexCoord2f(0, 1)
+        glTexCoord2f(u0, v1)
         glVertex3f(-size, size, 0)
         glEnd()
 
         glPopMatrix()
 
-    def draw_player(self, player):
-        """Draw the player character"""
+    def draw_player(self, x, y, z):
+        """Draw the player character at its position"""
         # Ensure proper color state
-        glColor3f(1.0, 1.0, 1.0)
+        self.state.color3f(1.0, 1.0, 1.0)
 
-        pos = player.get_position()
         glPushMatrix()
-        glTranslatef(pos[0], pos[1], pos[2])
+        glTranslatef(x, y, z)
 
         self.texture_manager.bind_texture("player")
-        self.draw_textured_cube(0.4)
+        self.draw_textured_cube(0.4, self.texture_manager.get_region("player"))
 
         glPopMatrix()
 
-    def draw_textured_cube(self, size=1.0):
-        """Draw a textured cube centered at the origin"""
+    def draw_textured_cube(self, size=1.0, region=FULL_REGION):
+        """Draw a textured cube centered at the origin, mapping region (u0, v0, u1, v1) on each face"""
         # Ensure normal vectors are properly set for lighting
-        glEnable(GL_NORMALIZE)  # Normalize normals for proper lighting
+        self.state.enable(GL_NORMALIZE)  # Normalize normals for proper lighting
 
         # Define the vertices of a cube
         vertices = [
@@ -311,11 +423,12 @@ class Renderer:
         ]
 
         # Define texture coordinates
+        u0, v0, u1, v1 = region
         tex_coords = [
-            [0.0, 0.0],
-            [1.0, 0.0],
-            [1.0, 1.0],
-            [0.0, 1.0]
+            [u0, v0],
+            [u1, v0],
+            [u1, v1],
+            [u0, v1]
         ]
 
         # Define normals for each face
@@ -337,7 +450,7 @@ class Renderer:
                 glVertex3f(vertices[face * 4 + i][0], vertices[face * 4 + i][1], vertices[face * 4 + i][2])
         glEnd()
 
-    def draw_portal_transition(self, progress, next_world, width, height):
+    def draw_portal_transition(self, progress, next_world, width, height, show_text=True):
         """Draw portal transition effect"""
         self.setup_2d_projection(width, height)
 
@@ -350,20 +463,21 @@ class Renderer:
         color = WORLD_COLORS[next_world]
 
         # Draw concentric circles with varying opacity
-        for i in range(20):
-            t = i / 19.0  # 0 to 1
+        rings = self.quality.rings
+        segments = self.quality.segments
+        for i in range(rings):
+            t = i / (rings - 1)  # 0 to 1
             radius = max_radius * (1.0 - progress) * (1.0 - t)
 
             glPushMatrix()
             glTranslatef(center_x, center_y, 0)
 
             # Set color with opacity
-            glColor4f(color[0], color[1], color[2], 0.1)
+            self.state.color4f(color[0], color[1], color[2], 0.1)
 
             # Draw circle
             glBegin(GL_TRIANGLE_FAN)
             glVertex2f(0, 0)  # Center
-            segments = 32
             for j in range(segments + 1):
                 angle = 2.0 * math.pi * j / segments
                 x = radius * math.cos(angle)
@@ -374,8 +488,8 @@ class Renderer:
             glPopMatrix()
 
         # Text indicating the new world
-        if progress > 0.5:
-            glColor3f(1.0, 1.0, 1.0)  # White color
+        if progress > 0.5 and show_text:
+            self.state.color3f(1.0, 1.0, 1.0)  # White color
 
             if next_world == WorldType.DESERT:
                 text = "Entering Desert World"
@@ -388,37 +502,198 @@ class Renderer:
 
         self.restore_3d_projection()
 
-    def draw_world(self, world_manager, player):
-        """Draw the entire world"""
-        # Set fog color based on world
-        world_color = world_manager.get_world_color()
-        fog_color = [world_color[0] * 0.8, world_color[1] * 0.8, world_color[2] * 0.8, 1.0]
-        glFogfv(GL_FOG_COLOR, fog_color)
+    def draw_loading_screen(self, progress, stages, width, height):
+        """Draw a progress bar and the status of each loading stage"""
+        self.setup_2d_projection(width, height)
+
+        self.set_color(1.0, 1.0, 0.0)  # Yellow
+        self.draw_centered_text(height - 100, "PORTAL RUNNER", width)
+
+        # Bar outline, then the filled part
+        bar_width, bar_height = width // 2, 20
+        left, bottom = (width - bar_width) // 2, height // 2
+        self.set_color(0.3, 0.3, 0.3)
+        glRectf(left, bottom, left + bar_width, bottom + bar_height)
+        self.set_color(0.0, 1.0, 0.0)  # Green
+        glRectf(left, bottom, left + bar_width * progress, bottom + bar_height)
+
+        self.set_color(1.0, 1.0, 1.0)  # White
+        self.draw_centered_text(bottom - 30, f"Loading... {int(progress * 100)}%", width)
+        for i, stage in enumerate(stages):
+            self.draw_centered_text(bottom - 60 - i * 20, f"{stage.name}: {stage.status}",
+                                    width, self.font_medium)
 
-        # Reset color to white for 3D rendering
-        glColor3f(1.0, 1.0, 1.0)
+        self.restore_3d_projection()
 
-        texture_name = world_manager.get_world_texture_name()
+    def draw_latency_marker(self, size, width, height):
+        """White square in the bottom-left corner marking a frame for latency measurement"""
+        self.setup_2d_projection(width, height)
+        self.set_color(1.0, 1.0, 1.0)
+        glRectf(0, 0, size, size)
+        self.restore_3d_projection()
 
-        # Draw chunks that are near the player (increased range)
-        player_z = player.z
-        for chunk in world_manager.platform_chunks:
-            # Show chunks within a larger range (was -50 to +20, now -100 to +50)
-            if chunk.start_z > player_z + 50 or chunk.start_z < player_z - 100:
+    def read_pixel(self, x, y):
+        """RGB of one pixel of the frame being drawn; waits for the GPU to finish it"""
+        data = glReadPixels(x, y, 1, 1, GL_RGB, GL_UNSIGNED_BYTE)
+        if isinstance(data, bytes):
+            return tuple(data)
+        return tuple(np.asarray(data).ravel())
+
+    def chunk_lod(self, chunk_z, camera_z):
+        """LOD_* of a chunk starting at chunk_z, seen from a camera at camera_z"""
+        distance = camera_z - chunk_z  # To the near end; ahead means smaller z
+        if not self.lod or distance < LOD_MID_DISTANCE:
+            return LOD_NEAR
+        if distance < LOD_FAR_DISTANCE:
+            return LOD_MID
+        return LOD_FAR
+
+    def draw_world(self, snapshot, camera_z):
+        """Draw the world as captured in a render snapshot, up to the quality level's draw distance.
+
+        Each chunk is drawn at the level of detail its distance from the camera calls for.
+        With baked lighting, faces carry their shade as a color and GL_LIGHTING is off.
+        """
+        # Reset color to white for 3D rendering; objects below inherit it
+        self.state.color3f(1.0, 1.0, 1.0)
+        self.player_z = snapshot.player_z
+        if self.baked_lighting:
+            self.state.disable(GL_LIGHTING)
+
+        texture_name = WORLD_TEXTURES[snapshot.world]
+        level = self.quality
+        far_z = snapshot.player_z - level.view  # Ahead means smaller z
+        platforms, coins = snapshot.platforms, snapshot.coins
+        chunk_z = snapshot.chunk_z
+        platform_ends, coin_ends = snapshot.chunk_platform_ends, snapshot.chunk_coin_ends
+
+        # Platforms first, then the sprites: one texture bind per pass instead of
+        # switching between the world texture and the sprite atlas per chunk
+        first = 0
+        for i in range(len(chunk_z)):
+            last = platform_ends[i]
+            lod = self.chunk_lod(chunk_z[i], camera_z)
+            if lod == LOD_NEAR:
+                for j in range(first, last):
+                    if platforms[j]['z'] >= far_z:
+                        self.draw_platform(platforms[j], texture_name)
+            else:
+                self.draw_platform_strips(platforms, first, last, far_z, texture_name, lod == LOD_MID)
+            first = last
+
+        # The snapshot holds uncollected coins only. Far away, a thinned-out set of
+        # them; chosen by position, so the same coins stay visible from frame to frame
+        sparse_z = snapshot.player_z - level.coin_distance
+        stride = level.coin_stride
+        first = 0
+        for i in range(len(chunk_z)):
+            last = coin_ends[i]
+            points = self.chunk_lod(chunk_z[i], camera_z) == LOD_FAR
+            if points:
+                # Sized and shaded for the middle of the chunk
+                middle = chunk_z[i] - CHUNK_LENGTH / 2
+                size = COIN_SIZE * self.pixels_per_unit / (camera_z - middle)
+                self.begin_coin_points(size, FRONT_SHADES[self.shade_index(middle)])
+            for j in range(first, last):
+                coin = coins[j]
+                z = coin['z']
+                if z >= far_z and (z >= sparse_z or int(z) % stride == 0):
+                    if points:
+                        glVertex3f(coin['x'], coin['y'], z)
+                    else:
+                        self.draw_coin(coin)
+            if points:
+                self.end_coin_points()
+            first = last
+
+        for portal in snapshot.portals:
+            if portal['z'] >= far_z:
+                self.draw_portal(portal)
+
+        if self.baked_lighting:
+            self.state.enable(GL_LIGHTING)  # The player is lit as before
+            self.state.color3f(1.0, 1.0, 1.0)
+
+    def shade_index(self, z):
+        """Index into the *_SHADES tables for a point at z"""
+        return min(SHADE_DISTANCES - 1, max(0, int(self.player_z - z)))
+
+    def face(self, shade, nx, ny, nz):
+        """Start a face: its normal for GL lighting, or its baked shade; between glBegin and glEnd"""
+        if self.baked_lighting:
+            self.state.color3f(shade, shade, shade)
+        else:
+            glNormal3f(nx, ny, nz)
+
+    def draw_platform_strips(self, platforms, first, last, far_z, texture_name, front_faces):
+        """Top faces (and optionally front faces) of platforms[first:last] in one batch.
+
+        Platforms that continue each other without a gap become a single quad;
+        the gaps between the others are kept, they are what the player jumps.
+        """
+        self.texture_manager.bind_texture(texture_name)
+        glBegin(GL_QUADS)
+        j = first
+        while j < last:
+            platform = platforms[j]
+            j += 1
+            x, y, z, width = platform['x'], platform['y'], platform['z'], platform['width']
+            if z < far_z:
                 continue
+            end_z = z - platform['length']
+            while j < last:
+                following = platforms[j]
+                if following['x'] != x or following['y'] != y or following['width'] != width or \
+                        abs(following['z'] - end_z) > 1e-6:
+                    break
+                end_z -= following['length']
+                j += 1
+
+            # Same texture coordinates and shades as draw_platform, continued over merged platforms
+            left, right = x - width / 2, x + width / 2
+            tex_scale_x = width / 2.0
+            tex_scale_z = (z - end_z) / 2.0
+            near = self.shade_index(z)
+            self.face(TOP_SHADES[near], 0, 1, 0)
+            glTexCoord2f(0, 0)
+            glVertex3f(left, y, z)
+            glTexCoord2f(tex_scale_x, 0)
+            glVertex3f(right, y, z)
+            self.face(TOP_SHADES[self.shade_index(end_z)], 0, 1, 0)
+            glTexCoord2f(tex_scale_x, tex_scale_z)
+            glVertex3f(right, y, end_z)
+            glTexCoord2f(0, tex_scale_z)
+            glVertex3f(left, y, end_z)
+
+            if front_faces:
+                self.face(FRONT_SHADES[near], 0, 0, 1)
+                glTexCoord2f(0, 0)
+                glVertex3f(left, y - 0.5, z)
+                glTexCoord2f(tex_scale_x, 0)
+                glVertex3f(right, y - 0.5, z)
+                glTexCoord2f(tex_scale_x, 0.5)
+                glVertex3f(right, y, z)
+                glTexCoord2f(0, 0.5)
+                glVertex3f(left, y, z)
+        glEnd()
+
+    def begin_coin_points(self, size, shade):
+        """Start a batch of distant coins, one round point each; end it with end_coin_points().
 
-            # Draw platforms
-            for platform in chunk.platforms:
-                glColor3f(1.0, 1.0, 1.0)  # Ensure white color for each platform
-                self.draw_platform(platform, texture_name)
-
-            # Draw coins
-            for coin in chunk.coins:
-                if not coin['collected']:
-                    glColor3f(1.0, 1.0, 1.0)  # Ensure white color for each coin
-                    self.draw_coin(coin)
-
-            # Draw portals
-            for portal in chunk.portals:
-                glColor3f(1.0, 1.0, 1.0)  # Ensure white color for each portal
-                self.draw_portal(portal)
\ No newline at end of file
+        The coin is a region of the sprite atlas, so a point sprite's texture
+        coordinates (which span the whole texture) would show the atlas. Each
+        point samples the middle of the coin instead.
+        """
+        self.texture_manager.bind_texture("coin")
+        u0, v0, u1, v1 = self.texture_manager.get_region("coin")
+        self.state.enable(GL_POINT_SMOOTH)
+        glPointSize(max(1.0, size))
+        glBegin(GL_POINTS)
+        self.face(shade, 0, 0, 1)
+        glTexCoord2f((u0 + u1) / 2, (v0 + v1) / 2)
+
+    def end_coin_points(self):
+        """End a batch started by begin_coin_points and restore the point state"""
+        glEnd()
+        self.state.disable(GL_POINT_SMOOTH)
+        glPointSize(1.0)
\ No newline at end of file
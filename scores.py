@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+High-score storage for Portal Runner.
+
+New scores are appended to a log by a background writer thread, so the game
+never waits for the disk. The writer batches everything queued within
+SCORE_FSYNC_INTERVAL into one fsync, and every SCORE_COMPACT_EVERY entries it
+folds the log into a snapshot written to a temporary file and renamed over
+the old one. A crash can at worst lose the last unsynced batch or leave a
+torn final log line, which is skipped on load.
+
+The top entries are kept in memory in a min-heap, so adding a score and
+checking whether one qualifies never touch the files. Each synced batch is
+also handed to an optional sink, such as Leaderboard.add_scores, on the
+writer thread.
+"""
+
+import heapq
+import json
+import os
+import queue
+import threading
+import time
+
+from constants import (HIGH_SCORE_COUNT, HIGH_SCORE_FILE, HIGH_SCORE_LOG, SCORE_COMPACT_EVERY,
+                       SCORE_FSYNC_INTERVAL)
+
+SNAPSHOT_VERSION = 1
+
+
+class ScoreStore:
+    def __init__(self, snapshot_path=HIGH_SCORE_FILE, log_path=HIGH_SCORE_LOG,
+                 keep=HIGH_SCORE_COUNT, fsync_interval=SCORE_FSYNC_INTERVAL,
+                 compact_every=SCORE_COMPACT_EVERY, sink=None):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path
+        self.keep = keep
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.sink = sink  # Called with each batch of entries after it is synced
+
+        # Min-heap of (score, id, name): the lowest kept score is at index 0.
+        # Ids increase with every entry, so equal scores rank oldest first.
+        self._top = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._logged = 0  # Entries in the log since the last compaction
+        self._torn_tail = False  # Log ends in a partial line
+
+        self._load()
+
+        self._requests = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        """Read the snapshot, then replay the log entries written after it"""
+        try:
+            last_id, entries = self._read_snapshot()
+        except FileNotFoundError:
+            last_id, entries = 0, []
+        except (OSError, ValueError) as e:
+            # Keep the damaged file for inspection instead of silently starting over
+            last_id, entries = 0, []
+            try:
+                os.replace(self.snapshot_path, self.snapshot_path + ".corrupt")
+                print(f"Could not read {self.snapshot_path}: {e}; moved it to {self.snapshot_path}.corrupt")
+            except OSError as move_error:
+                print(f"Could not read {self.snapshot_path}: {e}; could not move it aside: {move_error}")
+
+        try:
+            with open(self.log_path, "r") as f:
+                for line in f:
+                    self._torn_tail = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn write from a crash
+                    if entry["id"] > last_id:
+                        entries.append((entry["score"], entry["id"], entry["name"]))
+                        self._logged += 1
+        except FileNotFoundError:
+            pass
+
+        for entry in entries:
+            self._push(entry)
+        self._next_id = max([last_id] + [entry_id for _, entry_id, _ in entries]) + 1
+
+    def _read_snapshot(self):
+        """(last_id, entries) from the snapshot; ValueError if it is not one"""
+        with open(self.snapshot_path, "r") as f:
+            snapshot = json.load(f)
+        try:
+            if isinstance(snapshot, list):
+                # Plain list written by older versions of the game
+                return 0, [(entry["score"], 0, entry["name"]) for entry in snapshot]
+            return snapshot["last_id"], [(entry["score"], entry["id"], entry["name"])
+                                         for entry in snapshot["scores"]]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"unexpected snapshot contents ({e!r})") from e
+
+    def _push(self, entry):
+        """Add (score, id, name) to the heap, dropping the lowest entry when full"""
+        # Negated ids make the older of two equal scores the larger heap item
+        item = (entry[0], -entry[1], entry[2])
+        if len(self._top) < self.keep:
+            heapq.heappush(self._top, item)
+        elif item > self._top[0]:
+            heapq.heapreplace(self._top, item)
+
+    def qualifies(self, score):
+        """True if score would make it into the high-score list"""
+        with self._lock:
+            return len(self._top) < self.keep or score > self._top[0][0]
+
+    def add(self, name, score, world=None):
+        """Record a score; returns its id at once, the writer thread persists it"""
+        with self._lock:
+            entry = {"id": self._next_id, "name": name, "score": score,
+                     "world": getattr(world, "name", world), "created": time.time()}
+            self._next_id += 1
+            self._push((score, entry["id"], name))
+        self._requests.put(entry)
+        return entry["id"]
+
+    def top(self):
+        """Kept entries as [{"name", "score"}], highest first"""
+        with self._lock:
+            items = sorted(self._top, reverse=True)
+        return [{"name": name, "score": score} for score, _, name in items]
+
+    def _run(self):
+        """Writer thread: append queued entries, one fsync per batch, compact when the log grows"""
+        with open(self.log_path, "a") as log:
+            if self._torn_tail:
+                log.write("\n")  # Keep the next entry off the partial line
+            while True:
+                entry = self._requests.get()
+                if entry is None:
+                    return
+
+                # Anything queued within the interval shares this entry's fsync
+                batch = [entry]
+                deadline = time.monotonic() + self.fsync_interval
+                stop = False
+                while True:
+                    try:
+                        entry = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if entry is None:
+                        stop = True
+                        break
+                    batch.append(entry)
+
+                try:
+                    log.write("".join(json.dumps(entry) + "\n" for entry in batch))
+                    log.flush()
+                    os.fsync(log.fileno())
+                    self._logged += len(batch)
+                    if self._logged >= self.compact_every:
+                        self._compact(log)
+                except OSError as e:
+                    print(f"Could not save high scores: {e}")
+
+                if self.sink is not None:
+                    try:
+                        self.sink(batch)
+                    except Exception as e:
+                        print(f"Could not record high scores: {e}")
+
+                if stop:
+                    return
+
+    def _compact(self, log):
+        """Replace the snapshot with the current top entries and empty the log"""
+        with self._lock:
+            items = sorted(self._top, reverse=True)
+            last_id = self._next_id - 1
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "last_id": last_id,
+            "scores": [{"id": -neg_id, "name": name, "score": score} for score, neg_id, name in items],
+        }
+
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Entries still in the log after a crash here have ids <= last_id and are skipped on load
+        log.truncate(0)
+        log.flush()
+        os.fsync(log.fileno())
+        self._logged = 0
+
+    def close(self):
+        """Persist everything queued and stop the writer thread"""
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
@@ -8,6 +8,8 @@ import os
 import sys
 from PIL import Image, ImageDraw
 
+from procedural_textures import color_pattern
+
 
 def create_texture_dir():
     """Create the textures directory if it doesn't exist"""
@@ -20,16 +22,9 @@ def create_texture_dir():
 
 def create_color_texture(filename, color, size=(256, 256)):
     """Create a simple colored texture with a pattern"""
-    img = Image.new('RGB', size, color)
-    draw = ImageDraw.Draw(img)
-
-    # Add some pattern
-    for i in range(0, size[0], 32):
-        for j in range(0, size[1], 32):
-            if (i + j) % 64 == 0:
-                # Draw a darker square
-                darker_color = tuple(max(0, c - 30) for c in color)
-                draw.rectangle([i, j, i + 16, j + 16], fill=darker_color)
+    # The pattern is generated as an array (see procedural_textures.py)
+    image = color_pattern(color, size)
+    img = Image.frombytes(image['mode'], (image['width'], image['height']), image['data'])
 
     # Save the texture
     path = os.path.join('textures', filename)
@@ -141,6 +136,11 @@ def main():
     create_portal_texture()
     create_player_texture()
 
+    # Bake everything into the pack the game loads at startup
+    from textures import build_texture_pack
+    build_texture_pack()
+    print("Created texture pack")
+
     print("\nAll textures have been created!")
     print("You can now run the game using: python portal_runner.py")
 
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Simulation thread and render snapshots for Portal Runner.
+
+Once loading is done, the player, world generation, collisions and scoring
+run on their own thread at a fixed SIM_TICK_RATE. The GLUT thread only draws.
+At the end of every tick the simulation copies what a frame needs into a
+RenderSnapshot:
+
+- the game state, score, clocks and player position
+- the platform, coin and portal records of the chunks in view
+
+The renderer draws whatever snapshot is newest when its frame starts. A
+published snapshot is never written again until the renderer has moved past
+it, so a frame always shows one whole tick. A slow frame only makes the
+renderer skip snapshots; the simulation keeps its tick rate. A slow tick
+repeats the last snapshot.
+
+The snapshots are double-buffered with a spare, usually called triple
+buffering. The simulation fills its back snapshot while the renderer draws
+its front one. Publishing swaps the back with the spare, and the renderer
+picks up the spare when a new one is there. With only two buffers, one
+thread would have to wait for the other, or the simulation could not
+publish while a frame is drawn. The lock only guards the swap of two
+references; it is never held while a snapshot is filled or drawn.
+
+Snapshot records come from the same kind of RecordPool as the chunks' own,
+so publishing allocates nothing once the pools are warm. They hold numbers
+only, which keeps them out of the garbage collector's tracked objects.
+"""
+
+import threading
+import time
+
+from world import MAX_LIVE_CHUNKS, MAX_PLATFORMS_PER_CHUNK, PLATFORM_KEYS, LANES, RecordPool
+
+# Chunks whose start lies in this range around the player are copied into the snapshot
+VISIBLE_AHEAD = 100
+VISIBLE_BEHIND = 50
+
+# What the renderer reads of each record
+COIN_FIELDS = ('x', 'y', 'z', 'rotation')
+PORTAL_FIELDS = ('x', 'y', 'z', 'rotation', 'scale')
+
+
+def copy_record(pool, source, fields):
+    """A pooled record holding the given fields of source"""
+    record = pool.take()
+    for field in fields:
+        record[field] = source[field]
+    return record
+
+
+class RenderSnapshot:
+    """Everything a frame is drawn from; filled by the simulation, read-only once published"""
+
+    __slots__ = ("state", "tick", "time", "published_at", "world", "next_world", "prefetch_world",
+                 "transition_progress", "score", "distance", "speed_multiplier", "player_x", "player_y",
+                 "player_z", "player_name", "input_active", "final_rank", "chunk_count", "coin_count",
+                 "portal_count", "platforms", "coins", "portals", "chunk_z", "chunk_platform_ends",
+                 "chunk_coin_ends", "platform_pool", "coin_pool", "portal_pool")
+
+    def __init__(self):
+        self.state = None
+        self.tick = -1
+        self.time = 0.0  # Game clock of the tick, for animation
+        self.published_at = 0.0  # time.perf_counter() when handed to the renderer
+        self.world = None
+        self.next_world = None  # World being entered during a portal transition
+        self.prefetch_world = None  # World whose textures the renderer should start loading
+        self.transition_progress = 0.0
+        self.score = 0
+        self.distance = 0
+        self.speed_multiplier = 1.0
+        self.player_x = self.player_y = self.player_z = 0.0
+        self.player_name = ""
+        self.input_active = False
+        self.final_rank = None
+
+        # Counted over all live chunks, for the metrics
+        self.chunk_count = self.coin_count = self.portal_count = 0
+
+        # Copies of the records in view; uncollected coins only
+        self.platforms = []
+        self.coins = []
+        self.portals = []
+        # Per chunk in view: its start and where its platforms and coins end in the lists
+        # above; the renderer picks a level of detail per chunk
+        self.chunk_z = []
+        self.chunk_platform_ends = []
+        self.chunk_coin_ends = []
+        platforms = MAX_LIVE_CHUNKS * MAX_PLATFORMS_PER_CHUNK
+        self.platform_pool = RecordPool(PLATFORM_KEYS, platforms)
+        self.coin_pool = RecordPool(COIN_FIELDS, platforms * len(LANES))
+        self.portal_pool = RecordPool(PORTAL_FIELDS, MAX_LIVE_CHUNKS)
+
+    def capture_world(self, world_manager, player_z):
+        """Copy the records of the chunks in view and count what is live"""
+        platforms, coins, portals = self.platforms, self.coins, self.portals
+        platform_pool, coin_pool, portal_pool = self.platform_pool, self.coin_pool, self.portal_pool
+        platform_pool.release(platforms)
+        coin_pool.release(coins)
+        portal_pool.release(portals)
+        chunk_z, platform_ends, coin_ends = self.chunk_z, self.chunk_platform_ends, self.chunk_coin_ends
+        chunk_z.clear()
+        platform_ends.clear()
+        coin_ends.clear()
+        first = player_z - VISIBLE_AHEAD
+        last = player_z + VISIBLE_BEHIND
+        coin_count = portal_count = 0
+
+        chunks = world_manager.platform_chunks
+        for chunk in chunks:
+            visible = first <= chunk.start_z <= last
+            for coin in chunk.coins:
+                if not coin['collected']:
+                    coin_count += 1
+                    if visible:
+                        coins.append(copy_record(coin_pool, coin, COIN_FIELDS))
+            portal_count += len(chunk.portals)
+            if not visible:
+                continue
+            for platform in chunk.platforms:
+                record = platform_pool.take()
+                record.update(platform)  # Numbers only already
+                platforms.append(record)
+            for portal in chunk.portals:
+                portals.append(copy_record(portal_pool, portal, PORTAL_FIELDS))
+            chunk_z.append(chunk.start_z)
+            platform_ends.append(len(platforms))
+            coin_ends.append(len(coins))
+
+        self.chunk_count = len(chunks)
+        self.coin_count = coin_count
+        self.portal_count = portal_count
+
+
+class SnapshotBuffer:
+    """Hands the newest snapshot from the simulation to the renderer; neither ever waits"""
+
+    def __init__(self):
+        self._back = RenderSnapshot()  # Filled by the simulation
+        self._spare = RenderSnapshot()  # The newest published snapshot, until the renderer takes it
+        self._front = RenderSnapshot()  # Drawn by the renderer
+        self._fresh = False  # The spare is newer than the front
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def back(self):
+        """The snapshot to fill; simulation thread only"""
+        return self._back
+
+    def publish(self):
+        """Hand over the filled back snapshot; simulation thread only"""
+        self._back.published_at = time.perf_counter()
+        with self._lock:
+            self._back, self._spare = self._spare, self._back
+            self._fresh = True
+        self.published += 1
+
+    def latest(self):
+        """The newest published snapshot; valid until the next call. Render thread only"""
+        with self._lock:
+            if self._fresh:
+                self._front, self._spare = self._spare, self._front
+                self._fresh = False
+        return self._front
+
+
+class SimulationThread:
+    """Calls tick() at a fixed rate on its own thread"""
+
+    def __init__(self, tick, tick_rate, max_catch_up):
+        self.tick = tick
+        self.period = 1.0 / tick_rate
+        self.max_catch_up = max_catch_up  # Late ticks run back to back; beyond this many they are dropped
+        self.dropped = 0  # Ticks skipped after stalls
+        self.error = None  # What ended the thread, re-raised on the GL thread by check()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._tick_until_stopped()
+        except Exception as e:
+            self.error = e
+            self._stop.set()
+
+    def _tick_until_stopped(self):
+        period = self.period
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            self.tick()
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif delay < -period * self.max_catch_up:
+                # Stalled (a swap-in, a debugger): carry on from now rather than fast-forward
+                missed = int(-delay / period)
+                self.dropped += missed
+                next_tick += missed * period
+
+    def check(self):
+        """Re-raise the exception that ended a tick, on the calling thread"""
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        """Stop after the current tick"""
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Long-run soak test for Portal Runner.
+
+Drives the real game loop headlessly for tens of millions of distance
+units: PortalRunner is created on an off-screen EGL context (see
+headless_gl.py), loads like the game does, and then runs one endless game
+with an invulnerable player. Portals are taken and worlds switch as in a
+normal run. A simulated clock advances one 60 Hz frame per tick, so portal
+transitions take as many ticks as they would on a cabinet. After the first
+8,000 units the world moves at MAX_PLATFORM_SPEED, one unit per tick.
+
+At regular intervals the soak samples:
+
+    memory    tracemalloc's traced bytes and the process's resident size
+    objects   live objects tracked by the garbage collector
+    world     live chunks, platforms, coins and portals
+    textures  resident textures and their GPU bytes
+    time      mean and 99th percentile update+render time per tick
+
+The first tenth of the run is warm-up. The rest is split into quarters, and
+the last quarter is compared with the first. The soak fails (exit status 1)
+if memory, live objects, live chunks or per-tick time grew. Memory and
+objects are also broken down by source file and by type, so a leak points to
+the subsystem that holds it.
+
+At the end, check_allocations runs a few thousand more simulation ticks
+and verifies that they leave nothing allocated (see PortalRunner's GC
+handling); --allocations-only runs just that check after reaching full speed.
+It is the end-to-end variant of test_allocations.py, which needs no GPU.
+Then check_tick_rate moves the simulation to its thread, as the game does
+(see simulation.py), and draws deliberately slow frames on this thread. The
+simulation must keep SIM_TICK_RATE regardless; --tick-rate-only runs just
+that check.
+
+Usage: python soak.py [--distance UNITS] [--samples N] [--render-every N]
+                      [--no-render] [--seed N] [--output FILE] [--allocations-only]
+                      [--tick-rate-only]
+"""
+
+import headless_gl  # Must come before anything imports OpenGL
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from constants import (BASE_PLATFORM_SPEED, GameState, MAX_PLATFORM_SPEED, SIM_TICK_RATE,
+                       SPEED_INCREASE_INTERVAL, SPEED_INCREASE_RATE)
+
+SOAK_DISTANCE = 20_000_000
+SOAK_SAMPLES = 200
+RENDER_EVERY = 10  # Ticks per rendered frame; the renderer is much slower than the simulation
+TICK_SECONDS = 1 / 60
+WARMUP_FRACTION = 0.1
+FULL_SPEED_DISTANCE = round((MAX_PLATFORM_SPEED / BASE_PLATFORM_SPEED - 1) / SPEED_INCREASE_RATE
+                            * SPEED_INCREASE_INTERVAL)
+ALLOCATION_CHECK_TICKS = 3000  # About 60 chunks recycled at full speed
+# What may change hands during the check (see check_allocations); one leak per tick is 3000 times this
+ALLOCATION_SLACK_OBJECTS = 4
+ALLOCATION_SLACK_BYTES = 4096
+
+# Threaded tick rate check: each frame also keeps this thread busy for SLOW_FRAME_SECONDS,
+# like a renderer managing 20 fps, and the simulation may fall this far short of its rate
+TICK_RATE_SECONDS = 10.0
+SLOW_FRAME_SECONDS = 0.05
+TICK_RATE_TOLERANCE = 0.02
+
+# Growth from the first to the last measured quarter that counts as a leak
+MEMORY_GROWTH_LIMIT = 1024 * 1024  # Bytes
+OBJECT_GROWTH_LIMIT = 0.02  # Fraction of live objects
+TICK_TIME_GROWTH_LIMIT = 0.25  # Fraction of the median tick time
+
+
+class SimulatedClock:
+    """Stands in for time.time in PortalRunner; advances one frame per tick"""
+
+    def __init__(self, start=0.0, step=TICK_SECONDS):
+        self.now = start
+        self.step = step
+
+    def __call__(self):
+        return self.now
+
+    def advance(self):
+        self.now += self.step
+
+
+def resident_memory():
+    """Current resident set size in bytes, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+# Columns of the sample table
+FIELDS = ("distance", "tick", "speed", "traced_bytes", "resident_bytes", "gc_objects", "chunks",
+          "platforms", "coins", "portals", "textures", "texture_bytes", "tick_ms", "tick_p99_ms")
+COLUMN = {name: i for i, name in enumerate(FIELDS)}
+
+# Tick times are counted in buckets, so timing a tick allocates nothing that outlives it
+TICK_BUCKET_SECONDS = 0.00001
+TICK_BUCKETS = 10000  # Up to 100 ms; slower ticks land in the last bucket
+
+
+def live_types():
+    """Live objects tracked by the garbage collector, counted by type name"""
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+def save_snapshot():
+    """Write a tracemalloc snapshot to a temporary file, so its traces are not live objects"""
+    fd, path = tempfile.mkstemp(prefix="soak-", suffix=".tracemalloc")
+    os.close(fd)
+    tracemalloc.take_snapshot().dump(path)
+    return path
+
+
+def start_game():
+    """A PortalRunner past its loading screen (not drawn: it uses GLUT fonts), in a game that never ends"""
+    from game import PortalRunner
+
+    game = PortalRunner()
+    game.clock = SimulatedClock(start=time.time())
+    game.invulnerable = True
+    game.show_hud = False
+    game.quality.adaptive = False  # Full detail throughout, so runs compare
+    game.init()
+    while game.game_state == GameState.LOADING:
+        game.update()
+    game.reset_game()
+    return game
+
+
+def percentile_of_buckets(counts, fraction):
+    """Upper edge of the bucket holding the given fraction of the counted ticks"""
+    target = fraction * sum(counts)
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if seen >= target:
+            return (i + 1) * TICK_BUCKET_SECONDS
+    return TICK_BUCKETS * TICK_BUCKET_SECONDS
+
+
+def take_sample(row, game, tick, tick_seconds, tick_counts):
+    """Fill one row of the sample table"""
+    chunks = game.world_manager.platform_chunks
+    traced, _ = tracemalloc.get_traced_memory()
+    ticks = sum(tick_counts)
+    row[:] = (-game.player.z, tick, game.world_manager.get_current_speed(), traced,
+              resident_memory() or np.nan, len(gc.get_objects()), len(chunks),
+              sum(len(chunk.platforms) for chunk in chunks),
+              sum(len(chunk.coins) for chunk in chunks),
+              sum(len(chunk.portals) for chunk in chunks),
+              len(game.texture_manager.textures), game.texture_manager.texture_memory(),
+              tick_seconds / ticks * 1000, percentile_of_buckets(tick_counts, 0.99) * 1000)
+
+
+def check_growth(samples):
+    """Compare the last measured quarter with the first; returns (findings, failed)"""
+    measured = samples[int(len(samples) * WARMUP_FRACTION):]
+    quarter = max(1, len(measured) // 4)
+    first, last = measured[:quarter], measured[-quarter:]
+    findings = []
+
+    def check(label, before, after, limit, unit=""):
+        findings.append((label, float(before), float(after), bool(after - before > limit), unit))
+
+    traced = COLUMN["traced_bytes"]
+    check("traced memory", first[:, traced].mean(), last[:, traced].mean(), MEMORY_GROWTH_LIMIT, " B")
+    objects = COLUMN["gc_objects"]
+    check("live objects", first[:, objects].mean(), last[:, objects].mean(),
+          first[:, objects].mean() * OBJECT_GROWTH_LIMIT)
+    # The chunk count at a fixed speed is bounded; any increase means chunks are retained
+    chunks = COLUMN["chunks"]
+    check("live chunks", first[:, chunks].max(), last[:, chunks].max(), 0)
+    tick_ms = COLUMN["tick_ms"]
+    before = np.median(first[:, tick_ms])
+    check("tick time", before, np.median(last[:, tick_ms]), before * TICK_TIME_GROWTH_LIMIT, " ms")
+    return findings, any(grew for _, _, _, grew, _ in findings)
+
+
+def check_allocations(game, ticks=ALLOCATION_CHECK_TICKS):
+    """Objects and bytes that steady-state simulation ticks leave allocated.
+
+    Arithmetic in any Python code creates ints and floats that are freed again
+    within the tick; what must not happen is anything outliving its tick. So
+    the check compares the heap before and after thousands of ticks: a single
+    leaked object per tick would show up thousands of times. What may differ
+    is a handful of objects that only change hands, like a pool record
+    holding its last values or a texture prefetch in flight.
+    Rendering is left out; PyOpenGL allocates per call.
+    """
+    clock = game.clock
+    for _ in range(ticks // 10):  # Settle the pools and free lists
+        game.update()
+        clock.advance()
+
+    was_enabled = gc.isenabled()
+    gc.disable()
+    gc.collect()
+    tracemalloc.start()
+    os.remove(save_snapshot())  # The first snapshot fills pickle's and tempfile's caches
+    snapshot_path = save_snapshot()
+    objects = len(gc.get_objects())
+    traced = tracemalloc.get_traced_memory()[0]
+    for _ in range(ticks):
+        game.update()
+        clock.advance()
+    net_bytes = tracemalloc.get_traced_memory()[0] - traced
+    new_objects = len(gc.get_objects()) - objects
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    if was_enabled:
+        gc.enable()
+
+    # Where the bytes went, for the report
+    baseline = tracemalloc.Snapshot.load(snapshot_path)
+    os.remove(snapshot_path)
+    own_files = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+    diffs = [stat for stat in snapshot.filter_traces(own_files).compare_to(
+        baseline.filter_traces(own_files), "lineno") if stat.size_diff]
+    return new_objects, net_bytes, diffs
+
+
+def print_allocations(new_objects, net_bytes, diffs, ticks=ALLOCATION_CHECK_TICKS):
+    """Print the allocation check; returns True if it passed"""
+    passed = abs(new_objects) <= ALLOCATION_SLACK_OBJECTS and abs(net_bytes) <= ALLOCATION_SLACK_BYTES
+    print(f"Allocation check over {ticks} ticks: {new_objects:+} GC-tracked objects, {net_bytes:+} B "
+          f"({net_bytes / ticks:+.2f} B per tick)")
+    if not passed:
+        for stat in diffs[:8]:
+            frame = stat.traceback[0]
+            print(f"  {stat.size_diff:+8} B {stat.count_diff:+5} blocks  {frame.filename}:{frame.lineno}")
+    return passed
+
+
+def check_tick_rate(game, seconds=TICK_RATE_SECONDS, slow_frame=SLOW_FRAME_SECONDS):
+    """Run the simulation on its own thread while this thread draws slow frames.
+
+    Returns (ticks per second, 99th percentile tick interval in ms, frames drawn,
+    ticks dropped). The game keeps running on real time afterwards.
+    """
+    from OpenGL.GL import glFinish
+
+    game.clock = time.time
+    profiler = game.tick_profiler
+    first_tick = game.tick
+    game.start_simulation()
+    started = time.perf_counter()
+    frames = 0
+    while time.perf_counter() - started < seconds:
+        game.render()
+        glFinish()
+        busy_until = time.perf_counter() + slow_frame
+        while time.perf_counter() < busy_until:  # Holds the GIL, as a slow Python renderer would
+            pass
+        frames += 1
+    game.simulation.stop()
+    elapsed = time.perf_counter() - started
+
+    ticks = game.tick - first_tick
+    count = min(ticks, profiler.capacity)
+    rows = np.arange(profiler.frames - count, profiler.frames) % profiler.capacity
+    intervals = np.diff(profiler.frame_starts[rows]) * 1000
+    return ticks / elapsed, float(np.percentile(intervals, 99)), frames / elapsed, game.simulation.dropped
+
+
+def print_tick_rate(rate, p99_interval_ms, fps, dropped):
+    """Print the tick rate check; returns True if it passed"""
+    passed = rate >= SIM_TICK_RATE * (1 - TICK_RATE_TOLERANCE) and dropped == 0
+    print(f"Threaded tick rate while drawing at {fps:.1f} fps: {rate:.2f} ticks/s (target {SIM_TICK_RATE}), "
+          f"p99 tick interval {p99_interval_ms:.1f} ms, {dropped} ticks dropped")
+    return passed
+
+
+def run_soak(game, distance, sample_count, render, render_every, progress=True):
+    """Run the soak; returns (sample table, memory growth by file, object growth by type)"""
+    clock = game.clock
+    player = game.player
+    sample_every = distance / sample_count
+    warmup_end = distance * WARMUP_FRACTION
+    if render:
+        from OpenGL.GL import glFinish
+
+    # Everything the soak itself keeps is allocated before tracing starts
+    samples = np.zeros((sample_count + 1, len(FIELDS)))
+    tick_counts = [0] * TICK_BUCKETS
+    tick_seconds = 0.0
+    taken = 0
+    baseline = None  # (live types, tracemalloc snapshot file) at the end of the warm-up
+    next_sample = sample_every
+    tick = 0
+    started = time.perf_counter()
+    tracemalloc.start()
+
+    while -player.z < distance:
+        tick_start = time.perf_counter()
+        game.update()
+        if render and tick % render_every == 0:
+            game.render()
+            glFinish()  # Count the rasterization, not just issuing the commands
+        elapsed = time.perf_counter() - tick_start
+        tick_seconds += elapsed
+        tick_counts[min(TICK_BUCKETS - 1, int(elapsed / TICK_BUCKET_SECONDS))] += 1
+        clock.advance()
+        tick += 1
+
+        if game.game_state == GameState.GAME_OVER:
+            raise RuntimeError(f"game ended at distance {-player.z:.0f} despite invulnerability")
+
+        if -player.z >= next_sample and taken < len(samples):
+            next_sample += sample_every
+            row = samples[taken]
+            take_sample(row, game, tick, tick_seconds, tick_counts)
+            taken += 1
+            tick_seconds = 0.0
+            tick_counts[:] = [0] * TICK_BUCKETS
+            if baseline is None and -player.z >= warmup_end:
+                gc.collect()
+                baseline = (live_types(), save_snapshot())
+            if progress:
+                print(f"{row[COLUMN['distance']]:>12,.0f} units  "
+                      f"{row[COLUMN['traced_bytes']] / 1024:9.0f} KB traced  "
+                      f"{row[COLUMN['gc_objects']]:>8.0f} objects  {row[COLUMN['chunks']]:>3.0f} chunks  "
+                      f"{row[COLUMN['tick_ms']]:6.3f} ms/tick  ({time.perf_counter() - started:.0f} s)",
+                      flush=True)
+
+    if baseline is None:
+        tracemalloc.stop()
+        return samples[:taken], [], []
+
+    # Objects first, while the only snapshot alive is on disk
+    gc.collect()
+    baseline_types, snapshot_path = baseline
+    by_type = (live_types() - baseline_types).most_common()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    baseline_snapshot = tracemalloc.Snapshot.load(snapshot_path)
+    os.remove(snapshot_path)
+
+    # The soak's own bookkeeping is left out of the comparison
+    own_files = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+    by_file = snapshot.filter_traces(own_files).compare_to(baseline_snapshot.filter_traces(own_files),
+                                                           "filename")
+    return samples[:taken], by_file, by_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portal Runner soak test")
+    parser.add_argument("--distance", type=float, default=SOAK_DISTANCE, help="units to run")
+    parser.add_argument("--samples", type=int, default=SOAK_SAMPLES)
+    parser.add_argument("--render-every", type=int, default=RENDER_EVERY, help="ticks per rendered frame")
+    parser.add_argument("--no-render", action="store_true", help="simulation only")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the samples and findings as JSON")
+    parser.add_argument("--allocations-only", action="store_true",
+                        help="only check that steady-state ticks allocate nothing")
+    parser.add_argument("--tick-rate-only", action="store_true",
+                        help="only check the threaded tick rate under slow frames")
+    args = parser.parse_args()
+
+    # Textures are uploaded even without rendering, so a context is needed either way
+    try:
+        headless_gl.create_context()
+    except RuntimeError as e:
+        print(f"Soak needs an OpenGL context: {e}")
+        sys.exit(2)
+
+    random.seed(args.seed)
+    game = start_game()
+
+    if args.allocations_only:
+        while -game.player.z < FULL_SPEED_DISTANCE:
+            game.update()
+            game.clock.advance()
+        passed = print_allocations(*check_allocations(game))
+        print("PASS: steady-state ticks allocate nothing" if passed else "FAIL: ticks leave allocations behind")
+        sys.exit(0 if passed else 1)
+
+    if args.tick_rate_only:
+        passed = print_tick_rate(*check_tick_rate(game))
+        print("PASS: the simulation kept its tick rate" if passed else "FAIL: slow frames held back the simulation")
+        sys.exit(0 if passed else 1)
+
+    print(f"Soaking {args.distance:,.0f} units on {headless_gl.renderer_name()} "
+          f"(speed reaches {MAX_PLATFORM_SPEED} units/tick after {FULL_SPEED_DISTANCE:,} units)")
+    samples, by_file, by_type = run_soak(game, args.distance, args.samples, not args.no_render,
+                                         args.render_every)
+
+    findings, failed = check_growth(samples)
+    print("First vs last measured quarter:")
+    for label, before, after, grew, unit in findings:
+        print(f"  {label:<14} {before:14,.3f} -> {after:14,.3f}{unit:<3} {'GREW' if grew else 'flat'}")
+
+    print("Traced memory growth since warm-up, by file:")
+    for stat in by_file[:8]:
+        frame = stat.traceback[0]
+        print(f"  {stat.size_diff:+12,} B {stat.count_diff:+8} blocks  {frame.filename}")
+    print("Live object growth since warm-up, by type:")
+    for name, count in by_type[:8]:
+        print(f"  {count:+8}  {name}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"distance": args.distance, "seed": args.seed, "fields": FIELDS,
+                       "samples": samples.tolist(),
+                       "findings": [{"metric": label, "first": before, "last": after, "grew": grew}
+                                    for label, before, after, grew, _ in findings]}, f, indent=1)
+        print(f"Samples written to {args.output}")
+
+    # The end of a long run is the steadiest state there is
+    if not print_allocations(*check_allocations(game)):
+        failed = True
+    if not args.no_render and not print_tick_rate(*check_tick_rate(game)):
+        failed = True
+
+    print("FAIL: growth, allocations or a slow tick rate detected" if failed else
+          "PASS: memory, objects, chunks and tick time stayed flat; ticks allocate nothing")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Sprite atlas builder for Portal Runner.
+
+Packs small sprite textures (coin, portal, player) into a single RGBA image
+so they can be drawn with one texture binding, and records the UV
+sub-rectangle of every sprite.
+"""
+
+import math
+
+import numpy as np
+
+from texture_pack import CHANNELS, generate_mip_levels
+
+# Edge pixels are repeated this far around each sprite so filtering and the
+# first few mip levels never sample a neighbouring sprite
+ATLAS_PADDING = 8
+
+FULL_REGION = (0.0, 0.0, 1.0, 1.0)
+
+
+def _as_rgba(image):
+    """Pixel array of shape (height, width, 4) for an RGB or RGBA image dict"""
+    pixels = np.frombuffer(image['data'], dtype=np.uint8).reshape(
+        image['height'], image['width'], CHANNELS[image['mode']])
+    if image['mode'] == "RGBA":
+        return pixels
+    alpha = np.full(pixels.shape[:2] + (1,), 255, dtype=np.uint8)
+    return np.concatenate([pixels, alpha], axis=2)
+
+
+def _shelf_pack(sizes, atlas_width):
+    """Place padded (width, height) boxes on shelves; returns positions and total height"""
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i][1], reverse=True)
+    positions = [None] * len(sizes)
+    x = y = shelf_height = 0
+
+    for i in order:
+        width, height = sizes[i]
+        if x + width > atlas_width:
+            y += shelf_height
+            x = shelf_height = 0
+        positions[i] = (x, y)
+        x += width
+        shelf_height = max(shelf_height, height)
+
+    return positions, y + shelf_height
+
+
+def _next_power_of_two(value):
+    return 1 << max(0, math.ceil(math.log2(value)))
+
+
+def build_atlas(images, padding=ATLAS_PADDING):
+    """Pack sprite images (name -> image dict) into one power-of-two RGBA image.
+
+    Returns (atlas image dict with 'mipmaps', {name: (u0, v0, u1, v1)}).
+    """
+    names = list(images)
+    sprites = [_as_rgba(images[name]) for name in names]
+    sizes = [(s.shape[1] + 2 * padding, s.shape[0] + 2 * padding) for s in sprites]
+
+    # Try every power-of-two width that fits the widest sprite, keep the smallest atlas
+    best = None
+    width = _next_power_of_two(max(w for w, _ in sizes))
+    total_width = _next_power_of_two(sum(w for w, _ in sizes))
+    while width <= total_width:
+        positions, used_height = _shelf_pack(sizes, width)
+        height = _next_power_of_two(used_height)
+        if best is None or width * height < best[0] * best[1]:
+            best = (width, height, positions)
+        width *= 2
+
+    atlas_width, atlas_height, positions = best
+    pixels = np.zeros((atlas_height, atlas_width, 4), dtype=np.uint8)
+    regions = {}
+
+    for name, sprite, (x, y) in zip(names, sprites, positions):
+        height, width = sprite.shape[:2]
+        padded = np.pad(sprite, ((padding, padding), (padding, padding), (0, 0)), mode="edge")
+        pixels[y:y + padded.shape[0], x:x + padded.shape[1]] = padded
+
+        left, top = x + padding, y + padding
+        regions[name] = (left / atlas_width, top / atlas_height,
+                         (left + width) / atlas_width, (top + height) / atlas_height)
+
+    atlas = {
+        'width': atlas_width,
+        'height': atlas_height,
+        'mode': "RGBA",
+        'data': pixels.tobytes(),
+    }
+
+    # Below this level the padding is gone and sprites would bleed into each other
+    usable_levels = int(math.log2(padding))
+    atlas['mipmaps'] = generate_mip_levels(atlas)[:usable_levels]
+
+    return atlas, regions
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Pre-baked texture pack for Portal Runner.
+
+The pack is a single file holding every game texture as raw, upload-ready
+pixel data together with its full mip chain:
+
+    magic (8 bytes) | header length (uint32 LE) | JSON header | pixel data
+
+The header is keyed by texture name and records the source file's mtime,
+size and SHA-1 so a stale pack can be detected and rebuilt. Pixel data is
+read through mmap, so opening the pack does not decode or copy anything.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+PACK_MAGIC = b"PRPACK01"
+PACK_VERSION = 2
+DATA_ALIGNMENT = 16
+
+CHANNELS = {"RGB": 3, "RGBA": 4}
+
+
+def generate_mip_levels(image):
+    """Return the mip chain below level 0 as a list of {'width', 'height', 'data'} dicts"""
+    channels = CHANNELS[image['mode']]
+    level = np.frombuffer(image['data'], dtype=np.uint8).reshape(
+        image['height'], image['width'], channels)
+
+    levels = []
+    while level.shape[0] > 1 or level.shape[1] > 1:
+        height, width = level.shape[:2]
+
+        # GL expects floor(size / 2) per level, so an odd last row/column is dropped
+        if height > 1 and height % 2:
+            level = level[:-1]
+        if width > 1 and width % 2:
+            level = level[:, :-1]
+
+        blocks = level.astype(np.uint16)
+        if blocks.shape[0] > 1:
+            blocks = blocks[0::2] + blocks[1::2]
+        else:
+            blocks = blocks * 2
+        if blocks.shape[1] > 1:
+            blocks = blocks[:, 0::2] + blocks[:, 1::2]
+        else:
+            blocks = blocks * 2
+
+        level = ((blocks + 2) // 4).astype(np.uint8)
+        levels.append({
+            'width': level.shape[1],
+            'height': level.shape[0],
+            'data': level.tobytes(),
+        })
+
+    return levels
+
+
+def file_sha1(filepath):
+    """SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(filepath):
+    """mtime, size and hash of a texture source, or None if it does not exist"""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return {
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha1': file_sha1(filepath),
+    }
+
+
+def _source_matches(entry, filepath):
+    """Check a header entry against the current state of its source file"""
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return entry.get('source_missing', False)
+
+    if entry.get('source_missing', False) or entry['source'] != filepath:
+        return False
+    if entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+        return True
+
+    # Touched but possibly unchanged: only the contents decide
+    return entry['size'] == stat.st_size and entry['sha1'] == file_sha1(filepath)
+
+
+def is_pack_stale(pack_path, texture_files):
+    """True if the pack is missing, unreadable or built from other source files"""
+    try:
+        with open(pack_path, "rb") as f:
+            header = _read_header(f.read(len(PACK_MAGIC) + 4), f)
+    except (OSError, ValueError):
+        return True
+
+    entries = {name: entry for name, entry in header['textures'].items()
+               if not entry.get('derived', False)}
+    if set(entries) != set(texture_files):
+        return True
+
+    return not all(_source_matches(entries[name], filepath)
+                   for name, filepath in texture_files.items())
+
+
+def write_texture_pack(pack_path, images, texture_files, atlases=None):
+    """Write a pack from decoded images (name -> image dict with 'mipmaps').
+
+    Names in texture_files without an image are recorded as missing sources so
+    the pack is rebuilt as soon as the file appears, or, if the file exists but
+    could not be decoded, as unreadable with its fingerprint so the pack is
+    rebuilt only once the file changes. atlases maps an atlas name
+    to (atlas image, {sprite name: uv region}); sprites stored in an atlas keep
+    their source fingerprint but no pixel data of their own.
+    """
+    entries = {}
+    chunks = []
+    offset = 0
+
+    def add_levels(image):
+        nonlocal offset
+        levels = []
+        for level in [image] + image['mipmaps']:
+            data = level['data']
+            levels.append({
+                'width': level['width'],
+                'height': level['height'],
+                'offset': offset,
+                'length': len(data),
+            })
+            padding = -len(data) % DATA_ALIGNMENT
+            chunks.append(data)
+            chunks.append(b"\0" * padding)
+            offset += len(data) + padding
+        return levels
+
+    sprite_regions = {}
+    for atlas_name, (atlas, regions) in (atlases or {}).items():
+        entries[atlas_name] = {'derived': True, 'mode': atlas['mode'], 'levels': add_levels(atlas)}
+        for sprite_name, region in regions.items():
+            sprite_regions[sprite_name] = (atlas_name, list(region))
+
+    for name, filepath in texture_files.items():
+        fingerprint = source_fingerprint(filepath)
+        image = images.get(name)
+        if fingerprint is None:
+            entries[name] = {'source': filepath, 'source_missing': True}
+        elif image is None:
+            entries[name] = dict(fingerprint, source=filepath, source_unreadable=True)
+        elif name in sprite_regions:
+            atlas_name, region = sprite_regions[name]
+            entries[name] = dict(fingerprint, source=filepath, atlas=atlas_name, region=region)
+        else:
+            entries[name] = dict(fingerprint, source=filepath, mode=image['mode'],
+                                 levels=add_levels(image))
+
+    header = json.dumps({'version': PACK_VERSION, 'textures': entries}).encode("utf-8")
+
+    # Data offsets in the header are relative to the aligned start of the data section
+    prefix_length = len(PACK_MAGIC) + 4 + len(header)
+    header_padding = -prefix_length % DATA_ALIGNMENT
+
+    temp_path = pack_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(PACK_MAGIC)
+        f.write(struct.pack("<I", len(header) + header_padding))
+        f.write(header)
+        f.write(b" " * header_padding)  # JSON tolerates trailing whitespace
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, pack_path)
+
+
+def _read_header(prefix, f):
+    """Parse the magic, length and JSON header that start a pack"""
+    if len(prefix) != len(PACK_MAGIC) + 4 or not prefix.startswith(PACK_MAGIC):
+        raise ValueError("not a texture pack")
+    (header_length,) = struct.unpack("<I", prefix[len(PACK_MAGIC):])
+    header = json.loads(f.read(header_length).decode("utf-8"))
+    if header.get('version') != PACK_VERSION:
+        raise ValueError(f"unsupported texture pack version {header.get('version')}")
+    header['data_start'] = len(prefix) + header_length
+    return header
+
+
+class TexturePack:
+    """Read-only, memory-mapped view of a texture pack"""
+
+    def __init__(self, pack_path):
+        self.path = pack_path
+        self._file = open(pack_path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            prefix = self._map[:len(PACK_MAGIC) + 4]
+            self._file.seek(len(prefix))
+            header = _read_header(prefix, self._file)
+        except Exception:
+            self._file.close()
+            raise
+        self._data_start = header['data_start']
+        self.entries = {name: entry for name, entry in header['textures'].items()
+                        if not entry.get('source_missing', False) and not entry.get('source_unreadable', False)}
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def names(self):
+        """Names of the textures stored in the pack"""
+        return list(self.entries)
+
+    def get_atlas(self, name):
+        """(atlas name, uv region) if the texture lives in an atlas, otherwise None"""
+        entry = self.entries[name]
+        if 'atlas' not in entry:
+            return None
+        return entry['atlas'], tuple(entry['region'])
+
+    def get_image(self, name):
+        """Image dict for a texture; pixel data are zero-copy views into the mapping"""
+        entry = self.entries[name]
+        levels = [{
+            'width': level['width'],
+            'height': level['height'],
+            'data': np.frombuffer(self._map, dtype=np.uint8, count=level['length'],
+                                  offset=self._data_start + level['offset']),
+        } for level in entry['levels']]
+
+        image = dict(levels[0], mode=entry['mode'])
+        image['mipmaps'] = levels[1:]
+        return image
+
+    def close(self):
+        """Unmap the pack; images returned by get_image must no longer be used"""
+        try:
+            self._map.close()
+        except BufferError:
+            # Views are still alive somewhere; the mapping goes away with them
+            pass
+        self._file.close()
@@ -4,57 +4,429 @@ Texture loading and management for Portal Runner
 """
 
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import numpy as np
-from PIL import Image
 from OpenGL.GL import *
 
+from constants import (ATLAS_SPRITES, MIN_TEXTURE_SIZE, SPRITE_ATLAS, TEXTURE_FILES,
+                       TEXTURE_MEMORY_BUDGET, TEXTURE_PACK_PATH, WORLD_TEXTURES)
+from gl_state import GLStateCache
+from procedural_textures import generate_texture, has_procedural_texture
+from texture_atlas import FULL_REGION, build_atlas
+from texture_pack import TexturePack, generate_mip_levels, is_pack_stale, write_texture_pack
+
+# Platform textures are only resident while their world is active or about to be
+WORLD_TEXTURE_NAMES = frozenset(WORLD_TEXTURES.values())
+
+# (source mode, compact) -> (GL internal format, bytes per texel, name for reports).
+# Drivers pad 24-bit RGB to 32 bits, so RGB8 is counted as 4 bytes.
+INTERNAL_FORMATS = {
+    ("RGB", False): (GL_RGB8, 4, "RGB8"),
+    ("RGBA", False): (GL_RGBA8, 4, "RGBA8"),
+    ("RGB", True): (GL_RGB5, 2, "RGB5"),
+    ("RGBA", True): (GL_RGBA4, 2, "RGBA4"),
+}
+
+
+def decode_image(filepath):
+    """Decode an image into upload-ready RGB or RGBA bytes.
+
+    Safe to call from worker threads; no OpenGL calls are made here.
+    """
+    # Pillow is only needed when the texture pack has to be (re)built
+    from PIL import Image
+
+    with Image.open(filepath) as img:
+        # Normalize every mode (L, P, CMYK, LA, I;16, ...) to RGB or RGBA
+        has_alpha = img.mode in ("RGBA", "LA", "PA", "RGBa", "La") or \
+            (img.mode == "P" and "transparency" in img.info)
+        mode = "RGBA" if has_alpha else "RGB"
+        if img.mode != mode:
+            img = img.convert(mode)
+
+        return {
+            'width': img.width,
+            'height': img.height,
+            'mode': mode,
+            'data': img.tobytes(),  # One contiguous buffer, no per-pixel objects
+        }
+
+
+def decode_texture(filepath):
+    """Decode an image and build its mip chain"""
+    image = decode_image(filepath)
+    image['mipmaps'] = generate_mip_levels(image)
+    return image
+
+
+def generate_procedural_texture(name):
+    """Generate a placeholder texture in memory and build its mip chain"""
+    image = generate_texture(name)
+    image['mipmaps'] = generate_mip_levels(image)
+    return image
+
+
+def texture_bytes(levels, bytes_per_texel=4):
+    """GPU memory taken by a list of mip levels"""
+    return sum(level['width'] * level['height'] * bytes_per_texel for level in levels)
+
+
+def load_texture_source(name, filepath, procedural_fallback=False):
+    """Decode a texture source, optionally generating it in memory if the file is missing"""
+    if procedural_fallback and not os.path.exists(filepath) and has_procedural_texture(name):
+        return generate_procedural_texture(name)
+    return decode_texture(filepath)
+
+
+def _decode_in_parallel(texture_files, procedural_fallback=False):
+    """Yield (name, image or exception) as texture sources finish decoding"""
+    with ThreadPoolExecutor(max_workers=min(len(texture_files), os.cpu_count() or 1)) as pool:
+        futures = {pool.submit(load_texture_source, name, filepath, procedural_fallback): name
+                   for name, filepath in texture_files.items()}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+def build_sprite_atlas(images):
+    """Atlas of the decoded ATLAS_SPRITES as {SPRITE_ATLAS: (atlas, regions)}, or {} if none decoded"""
+    sprites = {name: images[name] for name in ATLAS_SPRITES if name in images}
+    if not sprites:
+        return {}
+    return {SPRITE_ATLAS: build_atlas(sprites)}
+
+
+def build_texture_pack(pack_path=TEXTURE_PACK_PATH, texture_files=TEXTURE_FILES):
+    """Decode every texture source and write them to a texture pack"""
+    images = {}
+    for name, result in _decode_in_parallel(texture_files):
+        if isinstance(result, Exception):
+            print(f"Error loading texture {texture_files[name]}: {result}")
+        else:
+            images[name] = result
+    write_texture_pack(pack_path, images, texture_files, build_sprite_atlas(images))
+
+
+def shared_texture_files():
+    """name -> source file of the textures that stay resident for the whole session"""
+    return {name: filepath for name, filepath in TEXTURE_FILES.items()
+            if name not in WORLD_TEXTURE_NAMES}
+
+
+def open_texture_pack(pack_path=TEXTURE_PACK_PATH, texture_files=TEXTURE_FILES):
+    """Open the texture pack, rebuilding it first if any source file changed"""
+    if is_pack_stale(pack_path, texture_files):
+        print(f"Texture sources changed, rebuilding {pack_path}")
+        try:
+            build_texture_pack(pack_path, texture_files)
+        except OSError as e:
+            print(f"Could not write texture pack {pack_path}: {e}")
+            return None
+
+    try:
+        return TexturePack(pack_path)
+    except (OSError, ValueError) as e:
+        print(f"Could not open texture pack {pack_path}: {e}")
+        return None
+
 
 class TextureManager:
-    def __init__(self):
+    def __init__(self, state=None, memory_budget=TEXTURE_MEMORY_BUDGET):
         self.textures = {}
+        self.regions = {}  # UV sub-rectangles of textures that live in an atlas
+        self.state = state if state is not None else GLStateCache()
+        self.pack = None
+
+        # World texture residency: LRU order of loaded world textures and their sizes
+        self.memory_budget = memory_budget
+        self.resident = OrderedDict()
+        self.pinned = set()
+        self.active_world_texture = None
+        self.pending = {}  # name -> future of a prefetch decode
+        self._prefetch_pool = None
+
+        # texture id -> what was uploaded (name, size, levels, format, bytes), for accounting
+        self.allocations = {}
 
     def load_texture(self, filepath):
         """Load a texture from file and return its OpenGL ID"""
         try:
-            img = Image.open(filepath)
-            img_data = np.array(list(img.getdata()), np.uint8)
+            image = decode_image(filepath)
+        except Exception as e:
+            print(f"Error loading texture {filepath}: {e}")
+            return None
+        return self.upload_texture(image, os.path.basename(filepath))
 
-            texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, texture_id)
+    def upload_texture(self, image, name=None):
+        """Upload decoded pixel data (see decode_image) and return its OpenGL ID.
 
+        If the texture would not fit the memory budget it is stored in a 16-bit
+        format and, if that is not enough, uploaded from a smaller mip level.
+        """
+        levels = [image] + image.get('mipmaps', [])
+        base_level, compact = self._fit_to_budget(levels, name)
+        levels = levels[base_level:]
+        internal_format, bytes_per_texel, format_name = INTERNAL_FORMATS[image['mode'], compact]
+
+        texture_id = glGenTextures(1)
+        self.state.bind_texture(texture_id)
+
+        if len(levels) > 1:
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(levels) - 1)
+        else:
             glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+
+        # Rows are tightly packed, which matters for RGB images with odd widths
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        pixel_format = GL_RGBA if image['mode'] == "RGBA" else GL_RGB
+        for level, data in enumerate(levels):
+            glTexImage2D(GL_TEXTURE_2D, level, internal_format, data['width'], data['height'], 0,
+                         pixel_format, GL_UNSIGNED_BYTE, data['data'])
+
+        self.allocations[texture_id] = {
+            'name': name,
+            'width': levels[0]['width'],
+            'height': levels[0]['height'],
+            'source_width': image['width'],
+            'levels': len(levels),
+            'format': format_name,
+            'bytes': texture_bytes(levels, bytes_per_texel),
+        }
+        return texture_id
+
+    def _fit_to_budget(self, levels, name):
+        """Pick (base mip level, compact format) so the texture fits what is left of the budget.
+
+        Full quality is preferred, then the 16-bit format, then dropping mip levels
+        down to MIN_TEXTURE_SIZE. If nothing fits, the smallest option is used.
+        """
+        available = self.memory_budget - self.texture_memory()
+        if texture_bytes(levels) <= available:
+            return 0, False
+
+        candidates = [base_level for base_level, level in enumerate(levels)
+                      if base_level == 0 or max(level['width'], level['height']) >= MIN_TEXTURE_SIZE]
+        for base_level in candidates:
+            if texture_bytes(levels[base_level:], 2) <= available:
+                break
+        else:
+            print(f"Warning: texture {name} does not fit the texture budget even when downscaled")
+
+        if base_level > 0:
+            print(f"Texture {name} downscaled to {levels[base_level]['width']}x"
+                  f"{levels[base_level]['height']} to fit the texture budget")
+        return base_level, True
+
+    def init_all_textures(self, initial_world=None):
+        """Initialize the shared textures and the initial world's platform texture"""
+        for job in self.prepare_shared_textures(shared_texture_files()):
+            self.install_texture(job)
+        if initial_world is not None:
+            self.ensure_world(initial_world)
+
+    def prepare_shared_textures(self, shared_files):
+        """Get pixel data for the session-long textures, ready for install_texture.
+
+        Makes no OpenGL calls, so it can run on a loader thread. Returns a list of
+        {'name', 'image', 'regions'} jobs; 'image' is None if the texture could not
+        be loaded and 'regions' maps the sprites of an atlas to their UV rectangles.
+        """
+        # Fast path: pixel data comes straight from the memory-mapped pack, no decoding
+        self.pack = open_texture_pack()
+        if self.pack is not None:
+            jobs = []
+            atlases = {}
+            for name in shared_files:
+                atlas = self.pack.get_atlas(name) if name in self.pack else None
+                if atlas is not None:
+                    atlas_name, region = atlas
+                    if atlas_name not in atlases:
+                        atlases[atlas_name] = {'name': atlas_name, 'image': self.pack.get_image(atlas_name),
+                                               'regions': {}}
+                        jobs.append(atlases[atlas_name])
+                    atlases[atlas_name]['regions'][name] = region
+                elif name in self.pack:
+                    jobs.append({'name': name, 'image': self.pack.get_image(name), 'regions': {}})
+                elif has_procedural_texture(name):
+                    # Source missing when the pack was built: generate a stand-in in memory
+                    jobs.append({'name': name, 'image': generate_procedural_texture(name), 'regions': {}})
+                else:
+                    jobs.append({'name': name, 'image': None, 'regions': {}})
+            return jobs
+
+        # Decode on worker threads (PIL releases the GIL while decoding)
+        jobs = []
+        sprites = {}
+        for name, result in _decode_in_parallel(shared_files, procedural_fallback=True):
+            if isinstance(result, Exception):
+                print(f"Error loading texture {shared_files[name]}: {result}")
+                jobs.append({'name': name, 'image': None, 'regions': {}})
+            elif name in ATLAS_SPRITES:
+                sprites[name] = result
+            else:
+                jobs.append({'name': name, 'image': result, 'regions': {}})
+
+        for atlas_name, (atlas, regions) in build_sprite_atlas(sprites).items():
+            jobs.append({'name': atlas_name, 'image': atlas, 'regions': regions})
+        return jobs
+
+    def install_texture(self, job):
+        """Upload one job from prepare_shared_textures; must run on the GL thread"""
+        name, image = job['name'], job['image']
+        texture_id = None
+        if image is not None:
+            try:
+                texture_id = self.upload_texture(image, name)
+            except Exception as e:
+                print(f"Error loading texture {name}: {e}")
+
+        if not texture_id:
+            print(f"Warning: Could not load texture {name}")
+            # Create a fallback texture
+            texture_id = self.create_fallback_texture()
 
-            width, height = img.size
-            if img.mode == "RGB":
-                glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, img_data)
-            elif img.mode == "RGBA":
-                glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, img_data)
+        self.textures[name] = texture_id
+        for sprite, region in job['regions'].items():
+            self.textures[sprite] = texture_id
+            self.regions[sprite] = region
 
-            return texture_id
+    def load_world_image(self, name):
+        """Pixel data for a world texture; safe to call from worker threads"""
+        if self.pack is not None and name in self.pack:
+            return self.pack.get_image(name)
+        # Themed worlds without artwork are generated in memory: no disk I/O or decoding
+        return load_texture_source(name, TEXTURE_FILES[name], procedural_fallback=True)
+
+    def prefetch(self, name):
+        """Start loading a world texture in the background; it is uploaded by process_pending_uploads"""
+        if name in self.textures or name in self.pending:
+            return
+        if self._prefetch_pool is None:
+            self._prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="texture-prefetch")
+        self.pending[name] = self._prefetch_pool.submit(self.load_world_image, name)
+
+    def prefetch_world(self, world_type):
+        """Prefetch the platform texture of a world we are about to enter"""
+        self.prefetch(WORLD_TEXTURES[world_type])
+
+    def process_pending_uploads(self, max_uploads=1):
+        """Upload finished prefetches; call once per frame from the GL thread"""
+        if not self.pending:
+            return
+        for name, future in list(self.pending.items()):
+            if max_uploads <= 0:
+                break
+            if future.done():
+                self._finish_world_texture(name)
+                max_uploads -= 1
+
+    def ensure_world(self, world_type):
+        """Make a world's platform texture resident and keep it pinned while the world is active"""
+        self.ensure_loaded(self._pin_world(world_type))
+
+    def install_world_texture(self, world_type, image):
+        """Like ensure_world, with the image already loaded by load_world_image (None on failure)"""
+        name = self._pin_world(world_type)
+        if name not in self.textures:
+            self._install_world_image(name, image)
+
+    def _pin_world(self, world_type):
+        """Pin the platform texture of the active world and return its name"""
+        name = WORLD_TEXTURES[world_type]
+        if self.active_world_texture is not None:
+            self.pinned.discard(self.active_world_texture)
+        self.active_world_texture = name
+        self.pinned.add(name)
+        return name
+
+    def ensure_loaded(self, name):
+        """Load a world texture now if it is not resident yet (waits for a pending prefetch)"""
+        if name in self.textures:
+            if name in self.resident:
+                self.resident.move_to_end(name)
+            return
+        if name not in self.pending:
+            self.prefetch(name)
+        self._finish_world_texture(name)
+
+    def _finish_world_texture(self, name):
+        """Upload the result of a pending world texture load"""
+        future = self.pending.pop(name)
+        try:
+            image = future.result()
         except Exception as e:
-            print(f"Error loading texture {filepath}: {e}")
-            return None
+            print(f"Error loading texture {TEXTURE_FILES[name]}: {e}")
+            image = None
+        self._install_world_image(name, image)
 
-    def init_all_textures(self):
-        """Initialize all game textures"""
-        texture_files = {
-            "desert_platform": "textures/desert_sand.jpg",
-            "ice_platform": "textures/ice_surface.jpg",
-            "forest_platform": "textures/forest_grass.jpg",
-            "coin": "textures/coin.png",
-            "portal": "textures/portal.png",
-            "player": "textures/player.png",
-        }
+    def _install_world_image(self, name, image):
+        """Upload a world texture and account for its memory"""
+        if image is None:
+            print(f"Warning: Could not load texture {name}")
+            self.textures[name] = self.create_fallback_texture()
+            return
+
+        # Make room for the full-quality texture first; upload_texture degrades it only if
+        # evicting unused worlds was not enough
+        self.evict_for(texture_bytes([image] + image['mipmaps']))
+        texture_id = self.upload_texture(image, name)
+        self.textures[name] = texture_id
+        self.resident[name] = self.allocations[texture_id]['bytes']
 
-        for name, filepath in texture_files.items():
-            texture_id = self.load_texture(filepath)
-            if texture_id:
-                self.textures[name] = texture_id
+    def texture_memory(self):
+        """Bytes of GPU memory used by all uploaded textures, including mip levels"""
+        return sum(allocation['bytes'] for allocation in self.allocations.values())
+
+    def memory_report(self):
+        """Lines describing every resident texture and the budget"""
+        lines = []
+        for texture_id, allocation in sorted(self.allocations.items(),
+                                             key=lambda item: -item[1]['bytes']):
+            name = allocation['name'] or f"texture {texture_id}"
+            notes = []
+            if allocation['name'] in self.pinned:
+                notes.append("pinned")
+            elif allocation['name'] in self.resident:
+                notes.append("evictable")
             else:
-                print(f"Warning: Could not load texture {name}")
-                # Create a fallback texture
-                self.textures[name] = self.create_fallback_texture()
+                notes.append("shared")
+            if allocation['width'] < allocation['source_width']:
+                notes.append(f"downscaled from {allocation['source_width']}px")
+            lines.append(f"{name:<18} {allocation['width']:>5}x{allocation['height']:<5} "
+                         f"{allocation['format']:<6} {allocation['levels']:>2} levels "
+                         f"{allocation['bytes'] / (1024 * 1024):7.2f} MB  {', '.join(notes)}")
+        lines.append(f"Total {self.texture_memory() / (1024 * 1024):.2f} MB of "
+                     f"{self.memory_budget / (1024 * 1024):.2f} MB budget")
+        return lines
+
+    def print_memory_report(self):
+        """Print memory_report()"""
+        print("Resident textures:")
+        for line in self.memory_report():
+            print("  " + line)
+
+    def evict_for(self, size):
+        """Delete least recently used, unpinned world textures until size more bytes fit the budget"""
+        for name in list(self.resident):
+            if self.texture_memory() + size <= self.memory_budget:
+                return
+            if name in self.pinned:
+                continue
+            self.unload_texture(name)
+
+    def unload_texture(self, name):
+        """Delete a world texture from the GPU"""
+        texture_id = self.textures.pop(name)
+        self.resident.pop(name, None)
+        self.allocations.pop(texture_id, None)
+        glDeleteTextures([texture_id])
+        self.state.texture_deleted(texture_id)
 
     def create_fallback_texture(self):
         """Create a simple fallback texture when loading fails"""
@@ -65,21 +437,33 @@ class TextureManager:
         ], dtype=np.uint8)
 
         texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
+        self.state.bind_texture(texture_id)
         glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, 2, 2, 0, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
 
+        self.allocations[texture_id] = {
+            'name': "fallback", 'width': 2, 'height': 2, 'source_width': 2,
+            'levels': 1, 'format': "RGBA8", 'bytes': 16,
+        }
         return texture_id
 
     def get_texture(self, name):
         """Get a texture by name"""
         return self.textures.get(name)
 
+    def get_region(self, name):
+        """UV rectangle (u0, v0, u1, v1) of a texture inside the texture it is bound from"""
+        return self.regions.get(name, FULL_REGION)
+
     def bind_texture(self, name):
         """Bind a texture for use"""
         texture_id = self.get_texture(name)
+        if texture_id is None and name in WORLD_TEXTURE_NAMES:
+            # Not prefetched in time: load synchronously rather than draw untextured
+            self.ensure_loaded(name)
+            texture_id = self.get_texture(name)
         if texture_id:
-            glBindTexture(GL_TEXTURE_2D, texture_id)
+            self.state.bind_texture(texture_id)
         else:
             print(f"Warning: Texture '{name}' not found")
\ No newline at end of file
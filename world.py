@@ -51,15 +51,73 @@ class SpeedManager:
         return self.speed_multiplier
 
 
+class RecordPool:
+    """Reusable record dicts, so replacing chunks allocates nothing once the game is running"""
+
+    def __init__(self, keys, size, defaults=None):
+        # Created with all their keys, so filling them in never resizes them. A default
+        # that is an object (an enum) makes the garbage collector track the records from
+        # the start, rather than from when they are first filled in.
+        self.template = dict.fromkeys(keys)
+        if defaults:
+            self.template.update(defaults)
+        self.free = [self.template.copy() for _ in range(size)]
+
+    def take(self):
+        return self.free.pop() if self.free else self.template.copy()
+
+    def put(self, record):
+        self.free.append(record)
+
+    def release(self, records):
+        """Return every record of a list to the pool and empty the list"""
+        self.free.extend(records)
+        records.clear()
+
+
+PLATFORM_KEYS = ('x', 'y', 'z', 'width', 'length')
+COIN_KEYS = ('x', 'y', 'z', 'rotation', 'collected', 'lane')
+PORTAL_KEYS = ('x', 'y', 'z', 'rotation', 'scale', 'target_world')
+LANES = (Lane.LEFT, Lane.CENTER, Lane.RIGHT)
+
+# Worst cases for sizing the pools. Most chunks are live during the first update: the 10
+# initial chunks plus the 11 it generates ahead before any are removed; chunks left behind
+# return their records. Platforms are at least MIN_PLATFORM_LENGTH plus a 1.5 gap long,
+# and each holds up to 3 coins
+MAX_LIVE_CHUNKS = 21
+MAX_PLATFORMS_PER_CHUNK = int(CHUNK_LENGTH // (MIN_PLATFORM_LENGTH + 1.5)) + 2
+
+
+class ChunkPools:
+    """Record pools shared by all chunks of a world"""
+
+    def __init__(self):
+        platforms = MAX_LIVE_CHUNKS * MAX_PLATFORMS_PER_CHUNK
+        self.platforms = RecordPool(PLATFORM_KEYS, platforms)
+        self.coins = RecordPool(COIN_KEYS, platforms * len(LANES), {'lane': Lane.CENTER})
+        self.portals = RecordPool(PORTAL_KEYS, MAX_LIVE_CHUNKS)
+
+    def release(self, chunk):
+        self.platforms.release(chunk.platforms)
+        self.coins.release(chunk.coins)
+        self.portals.release(chunk.portals)
+
+
 class PlatformChunk:
     """Represents a chunk of platforms, coins, and portals"""
 
-    def __init__(self, start_z, chunk_id):
-        self.start_z = start_z
-        self.chunk_id = chunk_id
+    def __init__(self, start_z, chunk_id, pools=None):
+        self.pools = pools if pools is not None else ChunkPools()
         self.platforms = []
         self.coins = []
         self.portals = []
+        self.generate(start_z, chunk_id)
+
+    def generate(self, start_z, chunk_id):
+        """Fill the chunk; a chunk taken from WorldManager's free list is refilled in place"""
+        self.start_z = start_z
+        self.chunk_id = chunk_id
+        self.pools.release(self)
         self.generate_platforms()
         self.generate_coins()
         self.maybe_add_portal()
@@ -75,13 +133,12 @@ class PlatformChunk:
             length = 10.0
             x_offset = 0  # Always centered for 3-lane system
 
-            platform = {
-                'x': x_offset,
-                'y': GROUND_LEVEL,
-                'z': current_z,
-                'width': width,
-                'length': length
-            }
+            platform = self.pools.platforms.take()
+            platform['x'] = x_offset
+            platform['y'] = GROUND_LEVEL
+            platform['z'] = current_z
+            platform['width'] = width
+            platform['length'] = length
             self.platforms.append(platform)
             current_z -= length
 
@@ -95,13 +152,12 @@ class PlatformChunk:
             x_offset = 0
 
             # Create platform
-            platform = {
-                'x': x_offset,
-                'y': GROUND_LEVEL,
-                'z': current_z,
-                'width': width,
-                'length': length
-            }
+            platform = self.pools.platforms.take()
+            platform['x'] = x_offset
+            platform['y'] = GROUND_LEVEL
+            platform['z'] = current_z
+            platform['width'] = width
+            platform['length'] = length
             self.platforms.append(platform)
 
             # Move to next platform position
@@ -125,20 +181,19 @@ class PlatformChunk:
             # Chance of having coins on a platform
             if random.random() < COIN_CHANCE:
                 # Generate coins in lanes
-                for lane in [Lane.LEFT, Lane.CENTER, Lane.RIGHT]:
+                for lane in LANES:
                     # 60% chance for each lane to have a coin
                     if random.random() < 0.6:
                         coin_x = LANE_POSITIONS[lane]
                         coin_z = platform['z'] - random.uniform(1, platform['length'] - 1)
 
-                        coin = {
-                            'x': coin_x,
-                            'y': platform['y'] + 0.5,
-                            'z': coin_z,
-                            'rotation': random.uniform(0, 360),
-                            'collected': False,
-                            'lane': lane  # Track which lane this coin is in
-                        }
+                        coin = self.pools.coins.take()
+                        coin['x'] = coin_x
+                        coin['y'] = platform['y'] + 0.5
+                        coin['z'] = coin_z
+                        coin['rotation'] = random.uniform(0, 360)
+                        coin['collected'] = False
+                        coin['lane'] = lane  # Track which lane this coin is in
                         self.coins.append(coin)
 
     def maybe_add_portal(self):
@@ -152,13 +207,13 @@ class PlatformChunk:
             platform = random.choice(self.platforms)
 
             # Place portal in center lane
-            portal = {
-                'x': LANE_POSITIONS[Lane.CENTER],  # Always in center lane
-                'y': platform['y'] + 1.5,  # Higher up to be more visible
-                'z': platform['z'] - platform['length'] / 2,
-                'rotation': 0,
-                'scale': 1.0
-            }
+            portal = self.pools.portals.take()
+            portal['x'] = LANE_POSITIONS[Lane.CENTER]  # Always in center lane
+            portal['y'] = platform['y'] + 1.5  # Higher up to be more visible
+            portal['z'] = platform['z'] - platform['length'] / 2
+            portal['rotation'] = 0
+            portal['scale'] = 1.0
+            portal['target_world'] = None  # Chosen when the player approaches
             self.portals.append(portal)
 
     def update(self):
@@ -183,9 +238,15 @@ class WorldManager:
         self.chunk_counter = 0
         self.speed_manager = SpeedManager()
 
+        # Chunks left behind are refilled as new chunks ahead; their records come from the pools
+        self.pools = ChunkPools()
+        self.free_chunks = []
+
     def reset(self):
         """Reset world for new game"""
-        self.platform_chunks = []
+        for chunk in self.platform_chunks:
+            self.discard_chunk(chunk)
+        self.platform_chunks.clear()
         self.last_chunk_z = 0
         self.chunk_counter = 0
         self.speed_manager.reset()
@@ -200,11 +261,20 @@ class WorldManager:
             self.last_chunk_z = chunk_start
 
     def generate_chunk(self, start_z):
-        """Generate a new platform chunk"""
-        chunk = PlatformChunk(start_z, self.chunk_counter)
+        """Generate a new platform chunk, reusing a discarded one if there is one"""
+        if self.free_chunks:
+            chunk = self.free_chunks.pop()
+            chunk.generate(start_z, self.chunk_counter)
+        else:
+            chunk = PlatformChunk(start_z, self.chunk_counter, self.pools)
         self.chunk_counter += 1
         return chunk
 
+    def discard_chunk(self, chunk):
+        """Keep a chunk left behind for reuse; its records go back to the pools until then"""
+        self.pools.release(chunk)
+        self.free_chunks.append(chunk)
+
     def update(self, player_z):
         """Update world generation and remove old chunks"""
         # Update speed based on distance traveled
@@ -216,9 +286,19 @@ class WorldManager:
             new_chunk = self.generate_chunk(self.last_chunk_z)
             self.platform_chunks.append(new_chunk)
 
-        # Remove old chunks that are far behind (increased distance)
-        self.platform_chunks = [chunk for chunk in self.platform_chunks
-                                if chunk.start_z > player_z - CHUNK_LENGTH * 5]
+        # Remove chunks that are far behind. The player moves towards -z, so behind
+        # means larger z; render snapshots show chunks starting up to 50 units behind.
+        # Compacted in place so no new list is built each frame.
+        chunks = self.platform_chunks
+        behind = player_z + CHUNK_LENGTH * 2
+        kept = 0
+        for chunk in chunks:
+            if chunk.start_z < behind:
+                chunks[kept] = chunk
+                kept += 1
+            else:
+                self.discard_chunk(chunk)
+        del chunks[kept:]
 
         # Update all chunks
         for chunk in self.platform_chunks:
@@ -238,62 +318,65 @@ class WorldManager:
 
     def check_platform_collision(self, player):
         """Check if player is on a platform"""
-        player_bounds = player.get_bounding_box()
+        # The bounds of Player.get_bounding_box, without building the dict every frame
+        half_size = PLAYER_HALF_SIZE
+        player_min_x = player.x - half_size
+        player_max_x = player.x + half_size
+        player_min_z = player.z - half_size
+        player_max_z = player.z + half_size
+        player_y = player.y + player.jump_height
 
         # Remove edge grace entirely - use exact platform boundaries
         for chunk in self.platform_chunks:
             for platform in chunk.platforms:
-                platform_bounds = {
-                    'min_x': platform['x'] - platform['width'] / 2,
-                    'max_x': platform['x'] + platform['width'] / 2,
-                    'min_z': platform['z'] - platform['length'],  # Exact edge
-                    'max_z': platform['z'],  # Exact edge
-                    'y': platform['y']
-                }
+                half_width = platform['width'] / 2
+                platform_z = platform['z']  # Exact edge; the platform extends towards -z
 
                 # Check if player is above platform (horizontally)
-                if (player_bounds['min_x'] <= platform_bounds['max_x'] and
-                        player_bounds['max_x'] >= platform_bounds['min_x'] and
-                        player_bounds['min_z'] <= platform_bounds['max_z'] and
-                        player_bounds['max_z'] >= platform_bounds['min_z']):
+                if (player_min_x <= platform['x'] + half_width and
+                        player_max_x >= platform['x'] - half_width and
+                        player_min_z <= platform_z and
+                        player_max_z >= platform_z - platform['length']):
 
                     # Check vertical position with standard tolerance
-                    vertical_tolerance = COLLISION_TOLERANCE
-                    if abs(player_bounds['y'] - platform_bounds['y']) < vertical_tolerance:
+                    if abs(player_y - platform['y']) < COLLISION_TOLERANCE:
                         return True
 
         return False
     def check_coin_collection(self, player):
-        """Check for coin collection and return collected coins"""
-        collected_coins = []
-        player_pos = player.get_position()
+        """Check for coin collection and return the number of coins collected"""
+        collected = 0
+        player_x = player.x
+        player_y = player.y + player.jump_height
+        player_z = player.z
 
         for chunk in self.platform_chunks:
             for coin in chunk.coins:
                 if not coin['collected']:
                     # Calculate distance between player and coin
-                    dx = player_pos[0] - coin['x']
-                    dz = player_pos[2] - coin['z']
-                    dy = player_pos[1] - coin['y']
-                    distance = math.sqrt(dx * dx + dy * dy + dz * dz)
+                    dx = player_x - coin['x']
+                    dz = player_z - coin['z']
+                    dy = player_y - coin['y']
 
-                    # If player is close enough, collect the coin
-                    if distance < 0.7:
+                    # If player is close enough (0.7 units), collect the coin
+                    if dx * dx + dy * dy + dz * dz < 0.49:
                         coin['collected'] = True
-                        collected_coins.append(coin)
+                        collected += 1
 
-        return collected_coins
+        return collected
 
     def check_portal_interaction(self, player):
         """Check for portal interaction"""
-        player_pos = player.get_position()
+        player_x = player.x
+        player_y = player.y + player.jump_height
+        player_z = player.z
 
         for chunk in self.platform_chunks:
             for portal in chunk.portals:
                 # Calculate distance between player and portal
-                dx = player_pos[0] - portal['x']
-                dz = player_pos[2] - portal['z']
-                dy = player_pos[1] - portal['y']
+                dx = player_x - portal['x']
+                dz = player_z - portal['z']
+                dy = player_y - portal['y']
                 distance = math.sqrt(dx * dx + dz * dz)
 
                 # Check if player is close enough and at similar height
@@ -302,6 +385,30 @@ class WorldManager:
 
         return None
 
+    def find_portal_ahead(self, player_z, max_distance):
+        """Nearest portal ahead of the player within max_distance, or None"""
+        nearest = None
+        for chunk in self.platform_chunks:
+            for portal in chunk.portals:
+                distance = player_z - portal['z']  # Ahead means smaller z
+                if 0 <= distance <= max_distance and (
+                        nearest is None or portal['z'] > nearest['z']):
+                    nearest = portal
+        return nearest
+
+    def remove_portals_near(self, z, distance):
+        """Remove portals within distance of z, e.g. the one just entered, so it cannot retrigger"""
+        for chunk in self.platform_chunks:
+            portals = chunk.portals
+            kept = 0
+            for portal in portals:
+                if abs(portal['z'] - z) > distance:
+                    portals[kept] = portal
+                    kept += 1
+                else:
+                    self.pools.portals.put(portal)
+            del portals[kept:]
+
     def get_world_color(self):
         """Get current world color"""
         return WORLD_COLORS[self.current_world]